@@ -0,0 +1,47 @@
+"""
+Measure how matching of where conditions scale with number of rows.
+
+Usage::
+
+    python -m benchmarks.where_benchmark [ROW_COUNT ...]
+
+Row counts default to 10k, 100k & 1M, note that 1M rows take a few GB of memory as every cell is loaded.
+"""
+import sys
+import timeit
+
+from openpyxl import Workbook
+
+from cellbase.celltable import Celltable
+
+DEFAULT_ROW_COUNTS = [10000, 100000, 1000000]
+REPEAT = 3
+
+
+def build_celltable(row_count):
+    worksheet = Workbook().active
+    worksheet.append(['id', 'status', 'amount'])
+    for i in range(row_count):
+        worksheet.append([i, 'open' if i % 2 == 0 else 'closed', i % 1000])
+    return Celltable(worksheet)
+
+
+def measure(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT))
+
+
+def main(row_counts):
+    print("%10s %12s %12s %12s %12s" % ("rows", "broad", "broad+cond", "point", "point(index)"))
+    for row_count in row_counts:
+        celltable = build_celltable(row_count)
+        broad = measure(lambda: celltable.row_and_col_where({'status': 'open'}))
+        broad_and_cond = measure(lambda: celltable.row_and_col_where(
+            {'status': 'open', 'amount': lambda value: value < 500}))
+        point = measure(lambda: celltable.row_and_col_where({'id': row_count // 2}))
+        celltable.create_index('id')
+        point_index = measure(lambda: celltable.row_and_col_where({'id': row_count // 2}))
+        print("%10d %11.4fs %11.4fs %11.4fs %11.6fs" % (row_count, broad, broad_and_cond, point, point_index))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS)
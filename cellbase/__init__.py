@@ -1,2 +1,7 @@
+import sys
+
 from cellbase.cellbase import Cellbase
 from cellbase.helper import DAO, Entity, CellFormatter
+from cellbase.predicate import Eq, Ne, Gt, Ge, Lt, Le, Between, In
+if sys.version_info >= (3, 5):  # async def is a SyntaxError before Python 3.5
+    from cellbase.aio import AsyncCellbase, AsyncDAO
@@ -0,0 +1,101 @@
+from itertools import chain
+
+from cellbase.column import numpy
+
+FUNCTIONS = ("count", "sum", "min", "max", "avg")
+
+
+def parse_aggs(aggs):
+    """
+    Flatten aggregations into list of tuple(key, col_name, function), where key is the name of aggregated value in
+    result. Key is column name when column has a single function, else column name suffixed with function, for example,
+    {'amount': ['sum', 'avg']} is keyed by "amount_sum" & "amount_avg".
+
+    :param aggs: dict of column name to function or list of functions, for example, {'amount': 'sum', 'id': 'count'}
+    :type aggs: dict
+    :return: List of tuple(key, col_name, function)
+    :rtype: list
+    :raise ValueError: When function is not one of FUNCTIONS
+    """
+    specs = []
+    for col_name, functions in aggs.items():
+        if isinstance(functions, str):
+            specs.append((col_name, col_name, functions))
+        else:
+            specs.extend(("%s_%s" % (col_name, function), col_name, function) for function in functions)
+    for _, col_name, function in specs:
+        if function not in FUNCTIONS:
+            raise ValueError("Unknown aggregate function %r of %s, expected one of %s" %
+                             (function, col_name, ", ".join(FUNCTIONS)))
+    return specs
+
+
+def reduce_values(function, values):
+    """
+    Aggregate values one by one, where empty cell is excluded
+
+    :param function: One of FUNCTIONS
+    :type function: str
+    :param values: Iterable of values
+    :return: Aggregated value, count is 0 and others are None when there is no value
+    """
+    values = [value for value in values if value is not None]
+    if function == "count":
+        return len(values)
+    if not values:
+        return None
+    if function == "sum":
+        return sum(values)
+    if function == "min":
+        return min(values)
+    if function == "max":
+        return max(values)
+    return sum(values) / len(values)
+
+
+def reduce_array(function, values, codes, group_count, kind):
+    """
+    Aggregate values of numeric column for every group at once with NumPy, where empty cell is NaN
+
+    :param function: One of FUNCTIONS
+    :type function: str
+    :param values: Values of rows
+    :type values: numpy.ndarray
+    :param codes: Group of each row, from 0 to group_count - 1
+    :type codes: numpy.ndarray
+    :param group_count: Number of groups
+    :type group_count: int
+    :param kind: Kind of values, int, float or number, see Column.kind
+    :return: List of aggregated value of each group, as reduce_values
+    :rtype: list
+    """
+    valid = values == values  # Exclude NaN
+    values = values[valid]
+    codes = codes[valid]
+    counts = numpy.bincount(codes, minlength=group_count)
+    if function == "count":
+        return counts.tolist()
+    if function == "min" or function == "max":
+        ufunc, initial = (numpy.minimum, numpy.inf) if function == "min" else (numpy.maximum, -numpy.inf)
+        reduced = numpy.full(group_count, initial)
+        ufunc.at(reduced, codes, values)
+    else:
+        reduced = numpy.bincount(codes, weights=values, minlength=group_count)
+        if function == "avg":
+            return [float(total / count) if count else None for total, count in zip(reduced, counts)]
+    return [kind(value) if count else None for value, count in zip(reduced.tolist(), counts)]
+
+
+def group_positions(groups):
+    """
+    Flatten row indexes of groups into positions in typed array, along with group of each position
+
+    :param groups: List of row indexes of each group
+    :type groups: list
+    :return: tuple(positions, codes) of NumPy arrays, see reduce_array
+    :rtype: tuple
+    """
+    sizes = [len(row_idxs) for row_idxs in groups]
+    positions = numpy.fromiter(chain.from_iterable(groups), dtype=numpy.intp, count=sum(sizes)) - 2
+    codes = numpy.repeat(numpy.arange(len(groups)), sizes)
+    return positions, codes
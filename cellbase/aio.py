@@ -0,0 +1,441 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from cellbase.cellbase import Cellbase
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_BATCH_SIZE = 1000
+
+
+class AsyncRows:
+    """
+    Asynchronous iterator of rows, which are read from a synchronous iterator in batches on executor.
+    For example::
+
+        async for simple in async_dao.iter_query(where):
+            print(simple.name)
+    """
+    def __init__(self, run, rows, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param run: Coroutine function that call the given function on executor, see AsyncCellbase.run
+        :param rows: Function that return synchronous iterator of rows, called on executor
+        :param batch_size: Number of rows to read from iterator at a time
+        :type batch_size: int
+        """
+        self.run = run
+        self.rows = rows
+        self.batch_size = batch_size
+        self.iterator = None
+        self.batch = deque()
+
+    def next_batch(self):
+        if self.iterator is None:
+            self.iterator = iter(self.rows())
+        return list(islice(self.iterator, self.batch_size))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.batch:
+            self.batch.extend(await self.run(self.next_batch))
+            if not self.batch:
+                raise StopAsyncIteration
+        return self.batch.popleft()
+
+
+class AsyncCellbase:
+    """
+    asyncio facade of :class:`Cellbase`, where methods are coroutines that call the same method of Cellbase on a
+    bounded thread pool, so loading, saving, large queries or bulk inserts never block the event loop.
+
+    Every call is made on the pool, as even a small query might wait for lock held by saving, so Cellbase is created
+    as thread-safe. Cellbase that is not thread-safe is only called from a single thread instead.
+    """
+    def __init__(self, cellbase=None, executor=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :param cellbase: Cellbase to call, create thread-safe Cellbase if None
+        :type cellbase: Cellbase
+        :param executor: Executor to call Cellbase on, create thread pool of max_workers threads if None
+        :type executor: concurrent.futures.Executor
+        :param max_workers: Maximum number of calls made at the same time, 1 if cellbase is not thread-safe
+        :type max_workers: int
+        """
+        self.cellbase = Cellbase(thread_safe=True) if cellbase is None else cellbase
+        self.own_executor = executor is None  # Only shutdown executor created by AsyncCellbase
+        if executor is None:
+            max_workers = max_workers if self.cellbase.lock is not None else 1
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor = executor
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Call function on executor
+
+        :param fn: Function to call
+        :return: Return value of function
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def load(self, filename, **kwargs):
+        """
+        See Cellbase.load
+
+        :return: self
+        :rtype: AsyncCellbase
+        """
+        await self.run(self.cellbase.load, filename, **kwargs)
+        return self
+
+    async def close(self):
+        """
+        See Cellbase.close, thread pool created by AsyncCellbase is shutdown as well
+        """
+        await self.run(self.cellbase.close)
+        if self.own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def register(self, on_create):
+        """
+        See Cellbase.register
+        """
+        await self.run(self.cellbase.register, on_create)
+
+    async def transaction(self, fn, *args, **kwargs):
+        """
+        Call function within Cellbase.transaction on executor, so modifications made by the function are rolled back if
+        it raises. Transaction can't be held across awaits, as it is held by the thread it started on, so the function
+        calls Cellbase synchronously instead. For example::
+
+            await async_cellbase.transaction(lambda: async_cellbase.cellbase.delete('Simple', {'id': 1}))
+
+        :param fn: Function to call
+        :return: Return value of function
+        """
+        return await self.run(self.call_in_transaction, fn, *args, **kwargs)
+
+    def call_in_transaction(self, fn, *args, **kwargs):
+        with self.cellbase.transaction():
+            return fn(*args, **kwargs)
+
+    async def remove_empty_cols(self, worksheet_name):
+        """
+        See Cellbase.remove_empty_cols
+        """
+        await self.run(self.cellbase.remove_empty_cols, worksheet_name)
+
+    async def create_index(self, worksheet_name, col_name, ordered=False):
+        """
+        See Cellbase.create_index
+        """
+        await self.run(self.cellbase.create_index, worksheet_name, col_name, ordered=ordered)
+
+    async def drop_index(self, worksheet_name, col_name):
+        """
+        See Cellbase.drop_index
+        """
+        await self.run(self.cellbase.drop_index, worksheet_name, col_name)
+
+    async def create_key_index(self, worksheet_name, key, unique=False):
+        """
+        See Cellbase.create_key_index
+        """
+        await self.run(self.cellbase.create_key_index, worksheet_name, key, unique=unique)
+
+    async def drop_key_index(self, worksheet_name, key):
+        """
+        See Cellbase.drop_key_index
+        """
+        await self.run(self.cellbase.drop_key_index, worksheet_name, key)
+
+    async def explain(self, worksheet_name, where=None):
+        """
+        See Cellbase.explain
+        """
+        return await self.run(self.cellbase.explain, worksheet_name, where)
+
+    async def query(self, worksheet_name, where=None, order_by=None, limit=None, offset=0, select=None):
+        """
+        See Cellbase.query
+        """
+        return await self.run(self.cellbase.query, worksheet_name, where=where, order_by=order_by, limit=limit,
+                              offset=offset, select=select)
+
+    async def query_cache_stats(self):
+        """
+        See Cellbase.query_cache_stats
+        """
+        return await self.run(self.cellbase.query_cache_stats)
+
+    def iter_query(self, worksheet_name, where=None, order_by=None, limit=None, offset=0, select=None,
+                   batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Same as Cellbase.iter_query, but return asynchronous iterator that read rows in batches on executor
+
+        :param batch_size: Number of rows to read at a time
+        :type batch_size: int
+        :return: Asynchronous iterator of dict
+        :rtype: AsyncRows
+        """
+        return AsyncRows(self.run, partial(self.cellbase.iter_query, worksheet_name, where=where, order_by=order_by,
+                                           limit=limit, offset=offset, select=select), batch_size=batch_size)
+
+    async def get_row(self, worksheet_name, row_idx, select=None):
+        """
+        See Cellbase.get_row
+        """
+        return await self.run(self.cellbase.get_row, worksheet_name, row_idx, select=select)
+
+    async def query_values(self, worksheet_name, col_name, where=None, order_by=None, limit=None, offset=0):
+        """
+        See Cellbase.query_values
+        """
+        return await self.run(self.cellbase.query_values, worksheet_name, col_name, where=where, order_by=order_by,
+                              limit=limit, offset=offset)
+
+    async def aggregate(self, worksheet_name, where=None, group_by=None, aggs=None):
+        """
+        See Cellbase.aggregate
+        """
+        return await self.run(self.cellbase.aggregate, worksheet_name, where=where, group_by=group_by, aggs=aggs)
+
+    async def insert(self, worksheet_name, value_in_dict):
+        """
+        See Cellbase.insert
+        """
+        return await self.run(self.cellbase.insert, worksheet_name, value_in_dict)
+
+    async def insert_many(self, worksheet_name, values_in_dicts):
+        """
+        See Cellbase.insert_many, values are read on executor
+        """
+        return await self.run(self.cellbase.insert_many, worksheet_name, values_in_dicts)
+
+    async def update(self, worksheet_name, value_in_dict, where=None):
+        """
+        See Cellbase.update
+        """
+        return await self.run(self.cellbase.update, worksheet_name, value_in_dict, where=where)
+
+    async def update_many(self, worksheet_name, updates):
+        """
+        See Cellbase.update_many, updates are read on executor
+        """
+        return await self.run(self.cellbase.update_many, worksheet_name, updates)
+
+    async def upsert(self, worksheet_name, value_in_dict, key):
+        """
+        See Cellbase.upsert
+        """
+        return await self.run(self.cellbase.upsert, worksheet_name, value_in_dict, key)
+
+    async def upsert_many(self, worksheet_name, values_in_dicts, key):
+        """
+        See Cellbase.upsert_many, values are read on executor
+        """
+        return await self.run(self.cellbase.upsert_many, worksheet_name, values_in_dicts, key)
+
+    async def delete(self, worksheet_name, where=None):
+        """
+        See Cellbase.delete
+        """
+        return await self.run(self.cellbase.delete, worksheet_name, where=where)
+
+    async def traverse(self, worksheet_name, fn, where=None, select=None):
+        """
+        See Cellbase.traverse, fn is called on executor
+        """
+        return await self.run(self.cellbase.traverse, worksheet_name, fn, where=where, select=select)
+
+    async def format(self, worksheet_name, where=None, select=None, **formats):
+        """
+        See Cellbase.format
+        """
+        return await self.run(self.cellbase.format, worksheet_name, where=where, select=select, **formats)
+
+    async def drop(self, worksheet_name):
+        """
+        See Cellbase.drop
+        """
+        await self.run(self.cellbase.drop, worksheet_name)
+
+    async def dirty(self):
+        """
+        See Cellbase.dirty
+        """
+        return await self.run(self.cellbase.dirty)
+
+    async def save(self, incremental=False):
+        """
+        See Cellbase.save
+        """
+        await self.run(self.cellbase.save, incremental=incremental)
+
+    async def save_as(self, filename, overwrite=False, incremental=False):
+        """
+        See Cellbase.save_as
+        """
+        await self.run(self.cellbase.save_as, filename, overwrite=overwrite, incremental=incremental)
+
+    async def save_async(self, filename=None, overwrite=False):
+        """
+        See Cellbase.save_async. Return once snapshot of workbook is taken, instead of waiting for saving to finish
+
+        :return: Future of saving, which can be awaited
+        :rtype: asyncio.Future
+        """
+        saving = await self.run(self.cellbase.save_async, filename=filename, overwrite=overwrite)
+        return asyncio.wrap_future(saving)
+
+
+class AsyncDAO:
+    """
+    asyncio facade of :class:`DAO`, where methods are coroutines that call the same method of DAO on executor of
+    :class:`AsyncCellbase`. For example::
+
+        async_dao = AsyncDAO(SimpleDAO(async_cellbase.cellbase), async_cellbase)
+        simples = await async_dao.query({'id': 1})
+    """
+    def __init__(self, dao, async_cellbase):
+        """
+        :param dao: DAO to call
+        :type dao: DAO
+        :param async_cellbase: AsyncCellbase of the Cellbase that DAO accesses
+        :type async_cellbase: AsyncCellbase
+        """
+        self.dao = dao
+        self.async_cellbase = async_cellbase
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.async_cellbase.run(fn, *args, **kwargs)
+
+    async def create_index(self, col_name, ordered=False):
+        """
+        See DAO.create_index
+        """
+        await self.run(self.dao.create_index, col_name, ordered=ordered)
+
+    async def drop_index(self, col_name):
+        """
+        See DAO.drop_index
+        """
+        await self.run(self.dao.drop_index, col_name)
+
+    async def create_key_index(self, key, unique=False):
+        """
+        See DAO.create_key_index
+        """
+        await self.run(self.dao.create_key_index, key, unique=unique)
+
+    async def drop_key_index(self, key):
+        """
+        See DAO.drop_key_index
+        """
+        await self.run(self.dao.drop_key_index, key)
+
+    async def explain(self, where=None):
+        """
+        See DAO.explain
+        """
+        return await self.run(self.dao.explain, where)
+
+    async def query(self, where=None, order_by=None, limit=None, offset=0, select=None):
+        """
+        See DAO.query
+        """
+        return await self.run(self.dao.query, where=where, order_by=order_by, limit=limit, offset=offset,
+                              select=select)
+
+    def iter_query(self, where=None, order_by=None, limit=None, offset=0, select=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Same as DAO.iter_query, but return asynchronous iterator that read entities in batches on executor
+
+        :param batch_size: Number of entities to read at a time
+        :type batch_size: int
+        :return: Asynchronous iterator of Entity
+        :rtype: AsyncRows
+        """
+        return AsyncRows(self.run, partial(self.dao.iter_query, where=where, order_by=order_by, limit=limit,
+                                           offset=offset, select=select), batch_size=batch_size)
+
+    async def get_row(self, row_idx, select=None):
+        """
+        See DAO.get_row
+        """
+        return await self.run(self.dao.get_row, row_idx, select=select)
+
+    async def query_values(self, col_name, where=None, order_by=None, limit=None, offset=0):
+        """
+        See DAO.query_values
+        """
+        return await self.run(self.dao.query_values, col_name, where=where, order_by=order_by, limit=limit,
+                              offset=offset)
+
+    async def aggregate(self, where=None, group_by=None, aggs=None):
+        """
+        See DAO.aggregate
+        """
+        return await self.run(self.dao.aggregate, where=where, group_by=group_by, aggs=aggs)
+
+    async def insert(self, entity):
+        """
+        See DAO.insert
+        """
+        return await self.run(self.dao.insert, entity)
+
+    async def insert_many(self, entities):
+        """
+        See DAO.insert_many
+        """
+        return await self.run(self.dao.insert_many, entities)
+
+    async def update(self, entity, where=None):
+        """
+        See DAO.update
+        """
+        return await self.run(self.dao.update, entity, where=where)
+
+    async def update_many(self, entities):
+        """
+        See DAO.update_many
+        """
+        return await self.run(self.dao.update_many, entities)
+
+    async def upsert(self, entity, key):
+        """
+        See DAO.upsert
+        """
+        return await self.run(self.dao.upsert, entity, key)
+
+    async def upsert_many(self, entities, key):
+        """
+        See DAO.upsert_many
+        """
+        return await self.run(self.dao.upsert_many, entities, key)
+
+    async def delete(self, where=None):
+        """
+        See DAO.delete
+        """
+        return await self.run(self.dao.delete, where=where)
+
+    async def traverse(self, fn, where=None, select=None):
+        """
+        See DAO.traverse, fn is called on executor
+        """
+        return await self.run(self.dao.traverse, fn, where=where, select=select)
+
+    async def format(self, where=None, select=None, **formats):
+        """
+        See DAO.format
+        """
+        return await self.run(self.dao.format, where=where, select=select, **formats)
+
+    async def drop(self):
+        """
+        See DAO.drop
+        """
+        await self.run(self.dao.drop)
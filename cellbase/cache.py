@@ -0,0 +1,127 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+
+from cellbase.incremental import file_state, write_atomically
+
+MAGIC = b"CELLBASE-CACHE-2"  # Bump version once layout of cache or Column changes
+LENGTH = struct.Struct("<Q")
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(filename):
+    """
+    :return: SHA-1 of content of file in hex
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Cache:
+    """
+    Binary sidecar of workbook, which store columns of every worksheet to load without parsing workbook again.
+
+    Cache file starts with MAGIC, followed by length & pickle of header, then pickle of columns of each worksheet, see
+    ColumnarCelltable.columns. Header records the state & SHA-1 of workbook cached, and the title, state & position of
+    each worksheet. Cache file is memory-mapped, and columns of worksheet are only unpickled on first access.
+    Cache is valid while workbook has the same mtime & size, or the same content when touched.
+
+    .. note:: Cache is unpickled, so only use cache directory that is written by Cellbase
+    """
+    def __init__(self, cache_dir, filename):
+        """
+        :param cache_dir: Directory of cache files
+        :type cache_dir: str
+        :param filename: Path of workbook to cache
+        :type filename: str
+        """
+        path = os.path.abspath(filename)
+        name = "%s-%s.cache" % (os.path.basename(path), hashlib.sha1(path.encode("utf-8")).hexdigest()[:12])
+        self.filename = os.path.join(cache_dir, name)
+        self.workbook_filename = filename
+        self.mmap = None
+        self.sheets = []
+        self.data_start = 0  # Position of the end of header, where columns start
+
+    def open(self):
+        """
+        Open cache file if it is valid for workbook
+
+        :return: List of tuple(title, sheet_state) of worksheets cached, None if cache is missing or outdated
+        :rtype: list
+        """
+        try:
+            with open(self.filename, "rb") as file:
+                cached = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # ValueError for empty file, which can't be mapped
+            return None
+        header_start = len(MAGIC) + LENGTH.size
+        try:
+            if cached[:len(MAGIC)] != MAGIC:
+                raise ValueError("Not a cache file")
+            header_length, = LENGTH.unpack(cached[len(MAGIC):header_start])
+            header = pickle.loads(cached[header_start:header_start + header_length])
+        except (ValueError, struct.error, pickle.UnpicklingError, EOFError):  # Written by other version or truncated
+            cached.close()
+            return None
+        if header["file_state"] != file_state(self.workbook_filename) \
+                and header["digest"] != file_digest(self.workbook_filename):
+            cached.close()
+            return None
+        self.mmap = cached
+        self.sheets = header["sheets"]
+        self.data_start = header_start + header_length
+        return [(title, sheet_state) for title, sheet_state, _, _ in self.sheets]
+
+    def columns(self, sheet_pos):
+        """
+        :param sheet_pos: Position of worksheet in workbook
+        :type sheet_pos: int
+        :return: Columns of worksheet, see ColumnarCelltable.columns
+        :rtype: tuple
+        """
+        _, _, start, length = self.sheets[sheet_pos]
+        start += self.data_start
+        return pickle.loads(self.mmap[start:start + length])
+
+    def write(self, sheets):
+        """
+        Write cache file of workbook, which is written to temporary file then renamed
+
+        :param sheets: List of tuple(title, sheet_state, columns) of every worksheet, see ColumnarCelltable.columns
+        :type sheets: list
+        """
+        state = file_state(self.workbook_filename)
+        digest = file_digest(self.workbook_filename)
+        blobs = [pickle.dumps(columns, protocol=pickle.HIGHEST_PROTOCOL) for _, _, columns in sheets]
+        entries = []
+        position = 0  # Relative to the end of header, as length of header depends on positions
+        for (title, sheet_state, _), blob in zip(sheets, blobs):
+            entries.append((title, sheet_state, position, len(blob)))
+            position += len(blob)
+        header = pickle.dumps({"file_state": state, "digest": digest, "sheets": entries},
+                              protocol=pickle.HIGHEST_PROTOCOL)
+
+        def write(temp_filename):
+            with open(temp_filename, "wb") as file:
+                file.write(MAGIC)
+                file.write(LENGTH.pack(len(header)))
+                file.write(header)
+                for blob in blobs:
+                    file.write(blob)
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        write_atomically(self.filename, write)
+
+    def close(self):
+        """
+        Unmap cache file, columns can't be read afterwards
+        """
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
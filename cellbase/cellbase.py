@@ -1,9 +1,67 @@
 import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial, wraps
 
 from openpyxl import Workbook, load_workbook
 
-from cellbase.helper import CellFormatter
-from cellbase.celltable import Celltable
+from cellbase import incremental, parallel
+from cellbase.cache import Cache
+from cellbase.journal import Journal
+from cellbase.lock import RWLock
+from cellbase.query_cache import QueryCache
+from cellbase.snapshot import copy_workbook
+from cellbase.helper import CellFormatter, DAO
+from cellbase.celltable import Celltable, Celltables, ColumnarCelltable, ReadOnlyCelltable
+from cellbase.predicate import In
+
+
+def build_cached(celltable_class, worksheet, read_columns):
+    """
+    Build Celltable from columns read from cache, see Cellbase.load
+
+    :param celltable_class: ColumnarCelltable or ReadOnlyCelltable
+    :param worksheet: Worksheet of Celltable
+    :type worksheet: openpyxl.worksheet.Worksheet
+    :param read_columns: Function that return columns of worksheet, see ColumnarCelltable.columns
+    :return: Celltable
+    :rtype: ColumnarCelltable
+    """
+    return celltable_class(worksheet, columns=read_columns())
+
+
+def locked(write=False):
+    """
+    Decorate method of Cellbase that access worksheet given as 1st argument, so lock of its Celltable is held while
+    calling when Cellbase is thread-safe, see Cellbase.access
+
+    :param write: Whether to hold the lock exclusively
+    :type write: bool
+    """
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, worksheet_name, *args, **kwargs):
+            if self.lock is None:
+                return method(self, worksheet_name, *args, **kwargs)
+            with self.access(worksheet_name, write=write):
+                return method(self, worksheet_name, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def exclusive(method):
+    """
+    Decorate method of Cellbase that access the whole workbook, so no other method is called at the same time
+    when Cellbase is thread-safe
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.lock is None:
+            return method(self, *args, **kwargs)
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class Cellbase:
@@ -11,14 +69,41 @@ class Cellbase:
     Cellbase is equivalent to :class:`Workbook` which stores :class:`Celltable`
     """
     DEFAULT_FILENAME = 'cellbase.xlsx'
+    JOURNAL_SUFFIX = '-journal'
 
-    def __init__(self):
+    def __init__(self, thread_safe=False, query_cache=0):
+        """
+        :param thread_safe:
+            Whether to lock Celltables accessed, so Cellbase can be shared between threads. Queries of a Celltable run
+            in parallel, while insert/update/delete/traverse/format hold the Celltable exclusively, and
+            load/save/drop hold the whole Cellbase. Celltable accessed directly, for example, cellbase['Simple'], is not
+            locked, see access.
+        :type thread_safe: bool
+        :param query_cache:
+            Maximum number of query results to cache, where query with only equality conditions(plain value, Eq or In)
+            is answered from cache until worksheet modified, see query_cache.QueryCache. No cache if 0
+        :type query_cache: int
+        """
         self.filename = os.path.join(os.getcwd(), Cellbase.DEFAULT_FILENAME)
         self.on_create = {}
         self.workbook = Workbook()
-        self.celltables = {}
+        self.celltables = Celltables()
+        self.read_only = False
+        self.columnar = False
+        self.celltable_class = Celltable
+        self.source_workbook = None  # Workbook kept open to stream values from
+        self.formats_dropped = False  # Whether formats of workbook loaded are not kept, see warn_formats_dropped
+        self.saved = None  # State of file last loaded or saved, see mark_saved
+        self.save_executor = None  # Single thread that save snapshots in order, see save_async
+        self.saving = None  # Future of the latest save_async
+        self.journal = None  # Journal of modifications since saved, see load
+        self.cache = None  # Cache that Celltables are built from, see load
+        self.undo_log = None  # Log to undo modifications of the outermost transaction, see transaction
+        self.lock = RWLock() if thread_safe else None  # Held for read by methods that access a single Celltable
+        self.query_cache = QueryCache(query_cache) if query_cache else None
 
-    def load(self, filename):
+    @exclusive
+    def load(self, filename, read_only=False, columnar=False, journal=False, fsync=0, cache_dir=None, workers=None):
         """
         Load workbook from given filename
 
@@ -26,17 +111,290 @@ class Cellbase:
         Instead, it simply load the data into memory and any changes will only be saved unless save or save_as
         is called.
 
+        When read_only is True, workbook is parsed with the streaming parser of openpyxl and only values are kept,
+        which load faster and take much less memory, but any attempt to modify will raise AssertionError.
+        File stays open for read-only workbook, call close to release it after worksheets accessed.
+
+        When columnar is True, workbook is parsed the same way as read_only, values are kept in compact columns
+        and cells are only created for traverse/format or when saving. Only values & formats applied through Cellbase
+        are saved, other contents of workbook like formats of existing cells, merged cells and column widths are not
+        preserved, which is warned every time workbook is saved.
+
+        Celltable of each worksheet is only built on first access, so worksheets that are never accessed cost nothing.
+
+        When journal is True, every insert/update/delete, values modified by traverse and worksheet created/dropped
+        are appended to a journal next to the workbook(filename + "-journal"), which is replayed on the next load if
+        workbook is not saved afterwards, and started over once workbook is saved to filename. So workbook can be saved
+        rarely without losing modifications to a crash. Formats are not recorded.
+
+        When cache_dir is given for read_only or columnar workbook, values of every worksheet are written to a binary
+        cache file in cache_dir once workbook is parsed, and loaded from the cache instead of parsing workbook again
+        until workbook is modified, see cache.Cache. cache_dir is ignored for other workbook, as all contents of
+        workbook have to be parsed to be saved.
+
+        When workers is greater than 1 for read_only or columnar workbook, worksheets are parsed in up to workers
+        processes at the same time, and every Celltable is built on load instead of on first access. Worth it for
+        workbook with several large worksheets, as every process has to parse shared strings of workbook on its own.
+        workers is ignored for other workbook, as parsed cells & styles are too expensive to send between processes.
+
         :param filename: Path of workbook to load
         :type filename: str
+        :param read_only: Whether to load values only for query
+        :type read_only: bool
+        :param columnar: Whether to keep values in compact columns instead of cells
+        :type columnar: bool
+        :param journal: Whether to record modifications to journal
+        :type journal: bool
+        :param fsync: Minimum seconds between flushing journal to disk, never if None, see journal.Journal
+        :type fsync: float
+        :param cache_dir: Directory of binary cache of values, no cache if None
+        :type cache_dir: str
+        :param workers: Maximum number of processes to parse worksheets, parsed one after another if None
+        :type workers: int
         :return: self
         :rtype: Cellbase
         """
+        self.assert_not_in_transaction()
+        self.close_journal()
+        if self.query_cache is not None:
+            self.query_cache.clear()
         self.filename = filename
-        self.workbook = load_workbook(filename) if os.path.exists(filename) else Workbook()
-        for worksheet in self.workbook.worksheets:
-            self.celltables[worksheet.title] = Celltable(worksheet)
+        self.saved = None
+        self.read_only = read_only
+        self.columnar = columnar and not read_only  # Values of read-only workbook are always kept in columns
+        exists = os.path.exists(filename)
+        self.formats_dropped = self.columnar and exists
+        self.close_cache()
+        if cache_dir is not None and exists and (read_only or columnar):
+            self.cache = Cache(cache_dir, filename)
+        cached_sheets = self.cache.open() if self.cache is not None else None
+        streamed = exists and (read_only or columnar) and cached_sheets is None
+        self.source_workbook = load_workbook(filename, read_only=True) if streamed else None
+        sheets = None  # tuple(title, sheet_state, columns or function that return columns) of worksheets read already
+        if cached_sheets is not None:
+            sheets = [(title, sheet_state, partial(self.cache.columns, sheet_pos))
+                      for sheet_pos, (title, sheet_state) in enumerate(cached_sheets)]
+        elif streamed and workers is not None and workers > 1:
+            sources = [(source.title, source.sheet_state) for source in self.source_workbook.worksheets]
+            self.source_workbook.close()
+            self.source_workbook = None
+            sheets = [(title, sheet_state, columns) for (title, sheet_state), columns in zip(
+                sources, parallel.read_worksheets(filename, [title for title, _ in sources], workers))]
+        if self.columnar:
+            self.celltable_class = ColumnarCelltable
+            self.workbook = Workbook()
+        else:
+            self.celltable_class = ReadOnlyCelltable if read_only else Celltable
+            self.workbook = self.source_workbook or (load_workbook(filename) if exists and sheets is None
+                                                     else Workbook())
+        if sheets is not None:
+            self.workbook.remove(self.workbook.active)
+            for title, sheet_state, columns in sheets:
+                worksheet = self.workbook.create_sheet(title=title)
+                worksheet.sheet_state = sheet_state
+                if callable(columns):
+                    self.celltables.defer(title, partial(build_cached, self.celltable_class, worksheet, columns))
+                else:
+                    self.celltables[title] = self.celltable_class(worksheet, columns=columns)
+        elif self.columnar and self.source_workbook is not None:
+            self.workbook.remove(self.workbook.active)
+            for source in self.source_workbook.worksheets:
+                worksheet = self.workbook.create_sheet(title=source.title)
+                worksheet.sheet_state = source.sheet_state
+                self.celltables.defer(worksheet.title, partial(ColumnarCelltable, worksheet, source))
+        else:
+            for worksheet in self.workbook.worksheets:
+                self.celltables.defer(worksheet.title, partial(self.celltable_class, worksheet))
+        if self.cache is not None and cached_sheets is None:
+            self.cache.write([(worksheet.title, worksheet.sheet_state, self.celltables[worksheet.title].columns())
+                              for worksheet in self.workbook.worksheets])
+        if exists and not read_only:
+            self.mark_saved(filename)
+        if journal:
+            self.assert_writable()
+            journal = Journal(filename + Cellbase.JOURNAL_SUFFIX, fsync=fsync)
+            base = incremental.file_state(filename)
+            self.replay(journal.read(base))  # Before journal attached, as records replayed are kept in journal
+            journal.open(base)
+            self.journal = journal
+            self.celltables.set_journal(journal)
         return self
 
+    @exclusive
+    def close(self):
+        """
+        Release file handle of workbook loaded as read-only or columnar or loaded from cache,
+        Celltable not yet accessed can't be built after closed.
+        Nothing to do for other workbook as it is not kept open, except waiting for saving in background to finish.
+        """
+        if self.source_workbook is not None and hasattr(self.source_workbook, 'close'):
+            self.source_workbook.close()
+        self.close_cache()
+        if self.save_executor is not None:
+            self.save_executor.shutdown(wait=True)
+            self.save_executor = None
+        self.close_journal()
+
+    def close_cache(self):
+        """
+        Unmap cache file, Celltable not yet built from cache can't be built afterwards
+        """
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def close_journal(self):
+        """
+        Stop recording modifications, journal is kept to be replayed on next load
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            self.celltables.set_journal(None)
+
+    def reset_journal(self, filename, start=None):
+        """
+        Start over journal after workbook saved, as modifications recorded are saved
+
+        :param filename: Path of workbook saved, journal is only reset when saved to the file loaded
+        :type filename: str
+        :param start: Offset of records made after the snapshot saved, see save_async
+        :type start: int
+        """
+        if self.journal is not None and os.path.abspath(filename) == os.path.abspath(self.filename):
+            self.journal.reset(incremental.file_state(filename), start=start)
+
+    def replay(self, records):
+        """
+        Apply modifications recorded by journal
+
+        :param records: Records read from journal, see journal.Journal
+        :type records: list
+        """
+        for record in records:
+            worksheet_name, op = record['ws'], record['op']
+            if op == 'create':
+                worksheet = self.workbook.create_sheet(title=worksheet_name)
+                worksheet.append(record['cols'])
+                self.celltables[worksheet.title] = self.celltable_class(worksheet)
+            elif op == 'drop':
+                self.drop(worksheet_name)
+            elif op == 'remove_empty_cols':
+                self.remove_empty_cols(worksheet_name)
+            elif op == 'insert':
+                self.celltables[worksheet_name].insert_many(dict(zip(record['cols'], row)) for row in record['rows'])
+            elif op == 'set':
+                values_by_row = {}
+                for row_idx, col_name, value in record['cells']:
+                    values_by_row.setdefault(row_idx, {})[col_name] = value
+                for row_idx, value_in_dict in values_by_row.items():
+                    self.celltables[worksheet_name].update(value_in_dict, {DAO.COL_ROW_IDX: row_idx})
+            elif op == 'delete':
+                self.celltables[worksheet_name].delete({DAO.COL_ROW_IDX: In(record['row_idxs'])})
+            elif op == 'restore':
+                self.celltables[worksheet_name].restore(record['row_idxs'],
+                                                        [dict(zip(record['cols'], row)) for row in record['rows']])
+            else:
+                raise ValueError("Unknown operation '%s' in journal of %s" % (op, self.filename))
+
+    @contextmanager
+    def access(self, worksheet_name, write=False):
+        """
+        Hold lock of Celltable of worksheet while accessing the Celltable directly, worksheet is created if none.
+        Readers of Celltable share the lock, while writer holds the lock exclusively. Nothing is locked unless
+        Cellbase is thread-safe.
+        For example::
+
+            with cellbase.access('Simple', write=True) as celltable:
+                celltable[2] = {'id': 1, 'name': 'jp1'}
+
+        :param worksheet_name: Name of worksheet to access
+        :type worksheet_name: str
+        :param write: Whether to hold the lock exclusively to modify
+        :type write: bool
+        :return: Context manager of Celltable
+        """
+        if self.lock is None:
+            self.create_if_none(worksheet_name)
+            yield self.celltables[worksheet_name]
+            return
+        while True:
+            with self.lock.read():
+                if worksheet_name in self.celltables:
+                    celltable = self.celltables[worksheet_name]
+                    with celltable.lock.write() if write else celltable.lock.read():
+                        yield celltable
+                    return
+            with self.lock.write():  # Worksheet is created exclusively, then accessed as usual
+                self.create_if_none(worksheet_name)
+
+    def assert_writable(self):
+        """
+        :raise AssertionError: When Cellbase is loaded as read-only
+        """
+        if self.read_only:
+            raise AssertionError("%s is loaded as read-only, load without read_only to modify" % self.filename)
+
+    def assert_not_in_transaction(self):
+        """
+        :raise AssertionError: When in transaction, as only rows modified can be rolled back
+        """
+        if self.undo_log is not None:
+            raise AssertionError("Worksheets can't be loaded, dropped or restructured in transaction")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Roll back every insert/update/delete/traverse made within the block if the block raises, where cost of rollback
+        is proportional to rows modified instead of size of workbook. Otherwise modifications are kept as usual.
+        For example::
+
+            with cellbase.transaction():
+                cellbase.delete('Simple', {'id': 1})
+                cellbase.insert('Simple', {'id': 2, 'name': 'jp2'})  # Row deleted is back if insert raises
+
+        Values are rolled back, rows deleted are put back with their cells and rows after them are moved back down,
+        so formats of rows are kept. Formats applied within the block are not rolled back, and worksheets created are
+        kept. Rollback is journaled as modifications as well. Nested transaction only rolls back its own
+        modifications. Thread-safe Cellbase is held exclusively throughout the transaction.
+
+        :return: Context manager of self
+        """
+        if self.lock is not None:
+            self.lock.acquire_write()
+        outermost = self.undo_log is None
+        if outermost:
+            self.undo_log = []
+            self.celltables.set_undo_log(self.undo_log)
+        start = len(self.undo_log)
+        try:
+            yield self
+        except BaseException:
+            self.rollback(start)
+            raise
+        finally:
+            if outermost:
+                self.undo_log = None
+                self.celltables.set_undo_log(None)
+            if self.lock is not None:
+                self.lock.release_write()
+
+    def rollback(self, start=0):
+        """
+        Undo modifications logged since given position of undo log, in reverse order, see transaction
+
+        :param start: Length of undo log to roll back to
+        :type start: int
+        """
+        self.celltables.set_undo_log(None)  # Undoing is not logged
+        try:
+            while len(self.undo_log) > start:
+                celltable, op, args = self.undo_log.pop()
+                celltable.undo(op, *args)
+        finally:
+            self.celltables.set_undo_log(self.undo_log)
+
+    @exclusive
     def remove_empty_cols(self, worksheet_name):
         """
         Remove 1st row's columns where its value is None. It does not inspect the whole column, so use it with care if
@@ -45,10 +403,16 @@ class Cellbase:
         :param worksheet_name: Name of worksheet to remove empty columns
         :type worksheet_name str
         """
+        self.assert_writable()
+        self.assert_not_in_transaction()
         worksheet = self.workbook[worksheet_name]
         for empty_col in reversed([col_id for col_id in worksheet[1] if col_id.value is None]):
             worksheet.delete_cols(empty_col.col_idx)
+        self.celltables[worksheet_name].mark_dirty()
+        if self.journal is not None:
+            self.journal.record('remove_empty_cols', worksheet_name)
 
+    @exclusive
     def register(self, on_create):
         """
         Register format of worksheet to deal with, only required for newly created worksheet
@@ -70,14 +434,93 @@ class Cellbase:
         :type worksheet_name: str
         """
         if worksheet_name not in self.celltables:
+            self.assert_writable()
             if self.on_create is None:
                 raise ValueError(
                     "Trying to create Celltable '%s' without specifying details in on_create" % worksheet_name)
             worksheet = self.workbook.create_sheet(title=worksheet_name)
             worksheet.append(self.on_create[worksheet_name])
-            self.celltables[worksheet.title] = Celltable(worksheet)
+            self.celltables[worksheet.title] = self.celltable_class(worksheet)
+            if self.journal is not None:
+                self.journal.record('create', worksheet.title, cols=list(self.on_create[worksheet_name]))
+
+    @locked(write=True)
+    def create_index(self, worksheet_name, col_name, ordered=False):
+        """
+        Create hash index on column of worksheet, where equality conditions on the column will be served by the index
+        in query, update, delete, etc.
+        When ordered is True, sorted index is created instead, which serves range predicates(Gt, Between, etc.) and
+        order_by of query as well.
+
+        :param worksheet_name: Name of worksheet to index
+        :type worksheet_name: str
+        :param col_name: Name of column to index
+        :type col_name: str
+        :param ordered: Whether to create sorted index
+        :type ordered: bool
+        """
+        self.create_if_none(worksheet_name)
+        self.celltables[worksheet_name].create_index(col_name, ordered=ordered)
+
+    @locked(write=True)
+    def drop_index(self, worksheet_name, col_name):
+        """
+        Drop index on column of worksheet
+
+        :param worksheet_name: Name of worksheet
+        :type worksheet_name: str
+        :param col_name: Name of indexed column
+        :type col_name: str
+        """
+        self.create_if_none(worksheet_name)
+        self.celltables[worksheet_name].drop_index(col_name)
+
+    @locked(write=True)
+    def create_key_index(self, worksheet_name, key, unique=False):
+        """
+        Create index on key of one or more columns of worksheet, which upsert finds rows with.
+        When unique is True, insert or update of row to key held by another row raises AssertionError.
+
+        :param worksheet_name: Name of worksheet to index
+        :type worksheet_name: str
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :param unique: Whether to refuse insert of duplicate key
+        :type unique: bool
+        """
+        self.create_if_none(worksheet_name)
+        self.celltables[worksheet_name].create_key_index(key, unique=unique)
+
+    @locked(write=True)
+    def drop_key_index(self, worksheet_name, key):
+        """
+        Drop index on key of worksheet
+
+        :param worksheet_name: Name of worksheet
+        :type worksheet_name: str
+        :param key: Column name or list of column names
+        :type key: str or list
+        """
+        self.create_if_none(worksheet_name)
+        self.celltables[worksheet_name].drop_key_index(key)
+
+    @locked()
+    def explain(self, worksheet_name, where=None):
+        """
+        Describe how conditions will be matched when querying worksheet, see Celltable.plan
+
+        :param worksheet_name: Name of worksheet
+        :type worksheet_name: str
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :return: Description of plan, one step per line
+        :rtype: str
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].explain(where)
 
-    def query(self, worksheet_name, where=None):
+    @locked()
+    def query(self, worksheet_name, where=None, order_by=None, limit=None, offset=0, select=None):
         """
         Return data from Celltable with specified worksheet_name, that match the conditions.
         Return all data if no condition given.
@@ -86,6 +529,14 @@ class Cellbase:
         :type worksheet_name: str
         :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
         :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of rows to return, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :param select: Column names to return, all columns if None. row_idx is always returned
+        :type select: list
         :return:
             List of dict that store value corresponding to the column id.
             * row_idx is the default value to return, where it specifies the row index of returned data.
@@ -95,8 +546,123 @@ class Cellbase:
         :rtype: list
         """
         self.create_if_none(worksheet_name)
-        return self.celltables[worksheet_name].query(where=where)
+        celltable = self.celltables[worksheet_name]
+        key = None
+        if self.query_cache is not None:
+            key = QueryCache.key(worksheet_name, where=where, order_by=order_by, limit=limit, offset=offset,
+                                 select=select)
+            rows = self.query_cache.get(key, celltable) if key is not None else None
+            if rows is not None:
+                return rows
+        rows = celltable.query(where=where, order_by=order_by, limit=limit, offset=offset, select=select)
+        if key is not None:
+            self.query_cache.put(key, celltable, rows)
+        return rows
 
+    def query_cache_stats(self):
+        """
+        :return: dict of hits, misses, size(number of results cached) & maxsize of query cache, None if no cache
+        :rtype: dict
+        """
+        return self.query_cache.stats() if self.query_cache is not None else None
+
+    @locked()
+    def iter_query(self, worksheet_name, where=None, order_by=None, limit=None, offset=0, select=None):
+        """
+        Same as query, but yield dict of each row lazily instead of returning list,
+        scanning stops once enough rows found without order_by. See Celltable.iter_query.
+        Rows are read before returning when Cellbase is thread-safe.
+
+        :param worksheet_name: Name of worksheet to query from
+        :type worksheet_name: str
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of rows to yield, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :param select: Column names to yield, all columns if None. row_idx is always yielded
+        :type select: list
+        :return: Iterator of dict that store value corresponding to the column id, including row_idx
+        """
+        self.create_if_none(worksheet_name)
+        rows = self.celltables[worksheet_name].iter_query(where=where, order_by=order_by, limit=limit, offset=offset,
+                                                          select=select)
+        if self.lock is not None:
+            return iter(list(rows))  # Rows can't be read lazily after lock released
+        return rows
+
+    @locked()
+    def get_row(self, worksheet_name, row_idx, select=None):
+        """
+        Return values of a single row from Celltable with specified worksheet_name, looked up directly without
+        matching conditions. Much faster than query with {'row_idx': row_idx}.
+
+        :param worksheet_name: Name of worksheet to get from
+        :type worksheet_name: str
+        :param row_idx: Row index
+        :type row_idx: int
+        :param select: Column names to return, all columns if None. row_idx is always returned
+        :type select: list
+        :return: dict of values corresponding to the column id, or None if row not exists.
+            For example, {"row_idx": 2, "id": 1, "name": "jp1"}
+        :rtype: dict
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].get_row(row_idx, select=select)
+
+    @locked()
+    def query_values(self, worksheet_name, col_name, where=None, order_by=None, limit=None, offset=0):
+        """
+        Return values of a single column from Celltable with specified worksheet_name, that match the conditions.
+        Faster than query as no dict is built for every row.
+
+        :param worksheet_name: Name of worksheet to query from
+        :type worksheet_name: str
+        :param col_name: Name of column to return, or row_idx
+        :type col_name: str
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of values to return, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :return: List of values. For example, [1, 2, 3]
+        :rtype: list
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].query_values(col_name, where=where, order_by=order_by, limit=limit,
+                                                            offset=offset)
+
+    @locked()
+    def aggregate(self, worksheet_name, where=None, group_by=None, aggs=None):
+        """
+        Aggregate values of rows from Celltable with specified worksheet_name, that match the conditions, without
+        building dict for every row. Function is one of count, sum, min, max or avg, and empty cell is excluded.
+
+        :param worksheet_name: Name of worksheet to aggregate
+        :type worksheet_name: str
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param group_by: Column name or list of column names to group rows by, all rows as a single group if None
+        :type group_by: str or list
+        :param aggs: dict of column name to function or list of functions, count rows by row_idx if None.
+            For example, {'amount': 'sum', 'id': 'count'}, or {'amount': ['sum', 'avg']} which is returned as
+            amount_sum & amount_avg
+        :type aggs: dict
+        :return: dict of aggregated values if group_by is None. For example, {'amount': 300, 'id': 2}.
+            Else list of dict of group values & aggregated values in order of group values.
+            For example, [{'region': 'EU', 'amount': 100, 'id': 1}, {'region': 'US', 'amount': 200, 'id': 1}]
+        :rtype: dict or list
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].aggregate(where=where, group_by=group_by, aggs=aggs)
+
+    @locked(write=True)
     def insert(self, worksheet_name, value_in_dict):
         """
         Insert new row to the worksheet
@@ -113,6 +679,23 @@ class Cellbase:
         self.create_if_none(worksheet_name)
         return self.celltables[worksheet_name].insert(value_in_dict)
 
+    @locked(write=True)
+    def insert_many(self, worksheet_name, values_in_dicts):
+        """
+        Insert new rows to the worksheet in a single pass
+
+        :param worksheet_name: Name of worksheet to insert to
+        :type worksheet_name: str
+        :param values_in_dicts:
+            Iterable of dict that describe the rows to insert, where row_idx is not required.
+            For example, [{"id": 1, "name": "jp1"}, {"id": 2, "name": "jp2"}]
+        :return: row_idx of new rows, in order of given values
+        :rtype: list
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].insert_many(values_in_dicts)
+
+    @locked(write=True)
     def update(self, worksheet_name, value_in_dict, where=None):
         """
         Update row(s) that match the condition.
@@ -130,6 +713,57 @@ class Cellbase:
         self.create_if_none(worksheet_name)
         return self.celltables[worksheet_name].update(value_in_dict, where=where)
 
+    @locked(write=True)
+    def update_many(self, worksheet_name, updates):
+        """
+        Update many rows in a single pass, much faster than calling update for each row
+
+        :param worksheet_name: Name of the worksheet to update
+        :type worksheet_name: str
+        :param updates:
+            Iterable of tuple(target, value_in_dict), where target is row index, dict of conditions(see update), or
+            None for row_idx in value_in_dict. For example, [(2, {'name': 'jp'}), ({'id': 1}, {'name': 'jp'})]
+        :return: Number of rows updated
+        :rtype: int
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].update_many(updates)
+
+    @locked(write=True)
+    def upsert(self, worksheet_name, value_in_dict, key):
+        """
+        Update rows holding the key of value_in_dict, or insert it as new row if no row holds the key
+
+        :param worksheet_name: Name of the worksheet to upsert
+        :type worksheet_name: str
+        :param value_in_dict: Dict that describe the row. For example, {"id": 1, "name": "jp1"}
+        :type value_in_dict: dict
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :return: row_idx of row updated or inserted
+        :rtype: int
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].upsert_many([value_in_dict], key)[0]
+
+    @locked(write=True)
+    def upsert_many(self, worksheet_name, values_in_dicts, key):
+        """
+        Upsert rows in a single pass, where rows are found with index on key which is created if not exists,
+        see create_key_index
+
+        :param worksheet_name: Name of the worksheet to upsert
+        :type worksheet_name: str
+        :param values_in_dicts: Iterable of dict that describe the rows
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :return: row_idx of rows updated or inserted, in order of given values
+        :rtype: list
+        """
+        self.create_if_none(worksheet_name)
+        return self.celltables[worksheet_name].upsert_many(values_in_dicts, key)
+
+    @locked(write=True)
     def delete(self, worksheet_name, where=None):
         """
         Delete row(s) that match conditions.
@@ -144,6 +778,7 @@ class Cellbase:
         self.create_if_none(worksheet_name)
         return self.celltables[worksheet_name].delete(where=where)
 
+    @locked(write=True)
     def traverse(self, worksheet_name, fn, where=None, select=None):
         """
         Access cells directly from rows where conditions matched.
@@ -165,6 +800,7 @@ class Cellbase:
         self.create_if_none(worksheet_name)
         return self.celltables[worksheet_name].traverse(fn, where=where, select=select)
 
+    @locked(write=True)
     def format(self, worksheet_name, where=None, select=None,
                formatter=None,
                font=None, fill=None, border=None, number_format=None,
@@ -213,6 +849,7 @@ class Cellbase:
             formatter, where=where, select=select
         )
 
+    @exclusive
     def drop(self, worksheet_name):
         """
         Delete specified worksheet.
@@ -220,34 +857,223 @@ class Cellbase:
         :param worksheet_name: Name of worksheet to delete
         :type worksheet_name: str
         """
-        worksheet_to_drop = self.celltables[worksheet_name].worksheet
+        self.assert_writable()
+        self.assert_not_in_transaction()
+        worksheet_to_drop = self.workbook[worksheet_name]
         # Workbook must contain at least 1 visible sheet
         visible_sheets = [worksheet for worksheet in self.workbook.worksheets
                           if worksheet.sheet_state == 'visible']
         if len(visible_sheets) == 1 and visible_sheets[0] is worksheet_to_drop:
             self.workbook.create_sheet()
         self.workbook.remove(worksheet_to_drop)
-        self.celltables.pop(worksheet_name)
+        del self.celltables[worksheet_name]
+        if self.query_cache is not None:
+            self.query_cache.discard(worksheet_name)
+        if self.journal is not None:
+            self.journal.record('drop', worksheet_name)
+
+    @exclusive
+    def dirty(self):
+        """
+        Find rows modified since loaded or saved, by worksheet
+
+        :return: dict of worksheet name to row indexes modified. For example, {'Simple': {2, 3}}
+        :rtype: dict
+        """
+        return {worksheet_name: set(celltable.dirty_row_idxs)
+                for worksheet_name, celltable in self.celltables.built().items() if celltable.dirty}
+
+    def mark_saved(self, filename):
+        """
+        Remember the state of file that workbook is loaded from or saved to, mark all Celltables as saved and start
+        over journal
+
+        :param filename: Path of file loaded or saved
+        :type filename: str
+        """
+        self.saved = {
+            'filename': filename,
+            'file_state': incremental.file_state(filename),
+            'sheetnames': self.workbook.sheetnames,
+            'style_count': len(self.workbook._cell_styles)
+        }
+        for celltable in self.celltables.built().values():
+            celltable.mark_clean()
+        self.reset_journal(filename)
 
-    def save(self):
+    def save(self, incremental=False):
         """
         Save workbook to the filename specified in open, overwrite if file exist.
+
+        :param incremental: Whether to serialise only worksheets modified, see save_as
+        :type incremental: bool
         """
-        self.save_as(self.filename, overwrite=True)
+        self.save_as(self.filename, overwrite=True, incremental=incremental)
 
-    def save_as(self, filename, overwrite=False):
+    @exclusive
+    def save_as(self, filename, overwrite=False, incremental=False):
         """
         Save workbook to filename. FileExistsError will be raised if file exists and overwrite is False.
 
+        When incremental is True, only worksheets modified since loaded or saved are serialised, while other parts of
+        the file last loaded or saved are copied byte for byte, and strings of worksheets serialised are written inline
+        so the shared strings are kept as they are. Workbook is saved as a whole instead when it can't be
+        saved incrementally: loaded as columnar, file modified outside Cellbase, worksheet created/dropped,
+        modified worksheet has comments/hyperlinks/images/tables, etc.
+        Worksheet modified directly through openpyxl instead of Cellbase is not detected, save it as a whole.
+
         :param filename: Path to save the workbook
         :type filename: str
         :param overwrite: Whether to overwrite if file exists
         :type overwrite: bool
+        :param incremental: Whether to serialise only worksheets modified
+        :type incremental: bool
         :raises FileExitsError: File exists and overwrite is False
+        :raises AssertionError: Cellbase is loaded as read-only
         """
+        self.assert_writable()
         if os.path.exists(filename) and overwrite is False:
             raise FileExistsError("%s already exists, set overwrite=True if this is expected.")
-        self.workbook.save(filename)
+        if self.saving is not None:
+            wait([self.saving])  # Never race with saving in background
+        if incremental and self.save_incrementally(filename):
+            return
+        if not self.columnar:
+            self.workbook.save(filename)
+            self.mark_saved(filename)
+            return
+        self.warn_formats_dropped(filename)
+        # Worksheets only hold cells created on demand, so every Celltable has to write its values
+        celltables = [self.celltables[worksheet_name] for worksheet_name in list(self.celltables)]
+        for celltable in celltables:
+            celltable.flush()
+        try:
+            self.workbook.save(filename)
+        finally:
+            for celltable in celltables:
+                celltable.release()
+        self.mark_saved(filename)
+
+    def warn_formats_dropped(self, filename):
+        """
+        Warn that formats of workbook loaded as columnar are not saved, see load
+
+        :param filename: Path to save the workbook
+        :type filename: str
+        """
+        if self.formats_dropped:
+            warnings.warn("%s is loaded as columnar, formats, merged cells & column widths it had are not saved to %s, "
+                          "load without columnar to keep them" % (self.filename, filename), UserWarning)
+
+    def snapshot(self):
+        """
+        Copy workbook to be saved while Cellbase keeps being modified, see snapshot.copy_workbook
+
+        :return: Copy of workbook
+        :rtype: openpyxl.Workbook
+        """
+        if not self.columnar:
+            return copy_workbook(self.workbook)
+        celltables = [self.celltables[worksheet_name] for worksheet_name in list(self.celltables)]
+        for celltable in celltables:
+            celltable.flush()
+        try:
+            return copy_workbook(self.workbook)
+        finally:
+            for celltable in celltables:
+                celltable.release()
+
+    @exclusive
+    def save_async(self, filename=None, overwrite=False):
+        """
+        Save workbook on a background thread, so Cellbase can be queried & modified while saving.
+
+        Workbook is copied before returning, which takes a fraction of the time to serialise it, then the copy is
+        saved to a temporary file and renamed to filename, so filename is never left half written.
+        Copying is done on the caller's thread, so the caller still pauses for time proportional to the number of cells,
+        roughly a second per million cells, see snapshot.copy_workbook.
+        Saves run one at a time in the order called, and save/save_as wait for saves in background to finish.
+
+        .. note:: openpyxl serialises workbook in Python, so the background thread still competes with the caller for
+            the interpreter(GIL), the caller is only spared from waiting for it
+
+        :param filename: Path to save the workbook, the filename specified in load if None
+        :type filename: str
+        :param overwrite: Whether to overwrite if file exists, always overwrite if filename is None
+        :type overwrite: bool
+        :return: Future of saving, where result() returns filename or raises the error of saving
+        :rtype: concurrent.futures.Future
+        :raises FileExitsError: File exists and overwrite is False
+        :raises AssertionError: Cellbase is loaded as read-only
+        """
+        self.assert_writable()
+        if filename is None:
+            filename, overwrite = self.filename, True
+        if os.path.exists(filename) and overwrite is False:
+            raise FileExistsError("%s already exists, set overwrite=True if this is expected." % filename)
+        if self.columnar:
+            self.warn_formats_dropped(filename)
+        workbook = self.snapshot()
+        dirty = self.dirty()
+        start = self.journal.position() if self.journal is not None else None
+        for celltable in self.celltables.built().values():
+            celltable.mark_clean()  # Rows modified from now on are not in the snapshot
+        if self.save_executor is None:
+            self.save_executor = ThreadPoolExecutor(max_workers=1)
+        self.saving = self.save_executor.submit(self.save_snapshot, workbook, filename, dirty, start)
+        return self.saving
+
+    def save_snapshot(self, workbook, filename, dirty, start=None):
+        """
+        Save snapshot of workbook, see save_async
+
+        :param workbook: Snapshot of workbook
+        :type workbook: openpyxl.Workbook
+        :param filename: Path to save the workbook
+        :type filename: str
+        :param dirty: Rows modified before snapshot taken, to be marked modified again if failed, see dirty
+        :type dirty: dict
+        :param start: Offset of journal when snapshot taken, records after it are kept, see Journal.position
+        :type start: int
+        :return: filename
+        :rtype: str
+        """
+        try:
+            incremental.write_atomically(filename, workbook.save)
+        except BaseException:
+            built = self.celltables.built()
+            for worksheet_name, row_idxs in dirty.items():
+                if worksheet_name in built:
+                    built[worksheet_name].mark_dirty(row_idxs)
+            raise
+        self.saved = {
+            'filename': filename,
+            'file_state': incremental.file_state(filename),
+            'sheetnames': workbook.sheetnames,
+            'style_count': len(workbook._cell_styles)
+        }
+        self.reset_journal(filename, start=start)
+        return filename
+
+    def save_incrementally(self, filename):
+        """
+        Save workbook by serialising only worksheets modified since loaded or saved, see save_as
+
+        :param filename: Path to save the workbook
+        :type filename: str
+        :return: If saved, False if workbook has to be saved as a whole
+        :rtype: bool
+        """
+        saved = self.saved
+        if self.columnar or saved is None or self.workbook.sheetnames != saved['sheetnames'] \
+                or incremental.file_state(saved['filename']) != saved['file_state']:
+            return False
+        worksheets = [celltable.worksheet for celltable in self.celltables.built().values() if celltable.dirty]
+        if not incremental.save_incrementally(self.workbook, worksheets, saved['filename'], filename,
+                                              saved['style_count']):
+            return False
+        self.mark_saved(filename)
+        return True
 
     def __len__(self):
         """
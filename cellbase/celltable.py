@@ -1,12 +1,68 @@
 import collections
+import heapq
+import threading
 import warnings
-from copy import copy
+from collections.abc import MutableMapping
+from itertools import islice
 
+from cellbase.column import Column, kind_of, numpy
 from cellbase.helper import DAO
+from cellbase import aggregation, planner
+from cellbase.index import HashIndex, KeyIndex, SortedIndex, sort_key
+from cellbase.lock import RWLock
+from cellbase.planner import PlanStep
+from cellbase.predicate import In, Predicate, equal_values
 
 
-def set_cell_value(cell, value):
-    cell.value = value
+def parse_order_by(order_by):
+    """
+    Parse order_by into list of tuple(col_name, descending)
+
+    :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+    :return: List of tuple(col_name, descending)
+    :rtype: list
+    """
+    col_names = [order_by] if isinstance(order_by, str) else order_by
+    return [(col_name[1:], True) if col_name.startswith('-') else (col_name, False) for col_name in col_names]
+
+
+def read_columns(worksheet):
+    """
+    Read values of worksheet into columns, where 1st row is column names
+
+    :param worksheet: Worksheet to read from
+    :type worksheet: openpyxl.worksheet.ReadOnlyWorksheet
+    :return: tuple(OrderedDict of column name to column index, dict of column name to :class:`Column`, row count)
+    :rtype: tuple
+    """
+    rows = worksheet.iter_rows()
+    col_ids = next(rows, ())
+    col_idxs = collections.OrderedDict(
+        (col_id.value, col_pos + 1) for col_pos, col_id in enumerate(col_ids) if col_id.value is not None)
+    values = {col_name: [] for col_name in col_idxs}
+    row_count = 0
+    for row in rows:
+        row_count += 1
+        for col_name, col_idx in col_idxs.items():
+            # Trailing empty cells might not be included in row
+            values[col_name].append(row[col_idx - 1].value if col_idx <= len(row) else None)
+    return col_idxs, {col_name: Column(col_values) for col_name, col_values in values.items()}, row_count
+
+
+class Descending:
+    """
+    Reverse order of key, so some keys can be sorted in descending order while others in ascending order
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
 
 
 class Celltable:
@@ -27,18 +83,388 @@ class Celltable:
                 self.cols[col_id.value].append(cell)
                 cells_in_row[col_id.value] = cell
             self.rows[row_idx] = cells_in_row
+        self.max_col_idx = worksheet.max_column
+        self.typed_cols = {}  # Name of column to tuple(version, Column), see typed_col
+        self._init_state()
+
+    def _init_state(self):
+        """
+        Initialise state shared by every kind of Celltable, apart from worksheet, columns & rows
+        """
+        self.indexes = {}
+        self.key_indexes = {}  # Index on key columns by tuple of column names, see create_key_index
+        self.dirty = False  # Whether modified since loaded or saved
+        self.dirty_row_idxs = set()
+        self.version = 0  # Bumped on every modification, see QueryCache
+        self.journal = None  # Journal to record modifications, see Cellbase.load
+        self.undo_log = None  # Log to undo modifications, see Cellbase.transaction
+        self.lock = RWLock()  # Held by thread-safe Cellbase while accessing Celltable, see Cellbase.access
 
     def col_idx_to_col_id(self, col_idx):
         """
         Get column id cell with column index
 
+        .. deprecated:: Celltable no longer looks up columns by index, use col_ids or cols instead
+
         :param col_idx: Column index
         :type col_idx: int
         :return: Column id cell
         :rtype: openpyxl.cell.Cell
         """
+        warnings.warn("Celltable.col_idx_to_col_id is deprecated, use Celltable.col_ids instead",
+                      DeprecationWarning, stacklevel=2)
         return self.worksheet[1][col_idx - 1]
 
+    def value(self, row_idx, col_name):
+        """
+        Get value of cell
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param col_name: Name of column
+        :type col_name: str
+        :return: Value of cell
+        """
+        return self.rows[row_idx][col_name].value
+
+    def col_values(self, col_name):
+        """
+        Iterate through values of column in order of rows
+
+        :param col_name: Name of column
+        :type col_name: str
+        :return: Iterator of tuple(row_idx, value)
+        """
+        return ((cell.row, cell.value) for cell in self.cols[col_name])
+
+    def row_values(self, row_idx, select=None):
+        """
+        Get values of row
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param select: Column names to get, all columns if None
+        :type select: list
+        :return: dict of values corresponding to the column id, including row_idx
+        :rtype: dict
+        """
+        values = {DAO.COL_ROW_IDX: row_idx}
+        if select is not None:
+            row = self.rows[row_idx]
+            for col_name in select:
+                values[col_name] = row[col_name].value
+            return values
+        for key, cell in self.rows[row_idx].items():
+            values[key] = cell.value
+        return values
+
+    def create_index(self, col_name, ordered=False):
+        """
+        Create hash index on column, so equality condition on the column is looked up without scanning the column.
+        When ordered is True, sorted index is created instead, which serves range predicates(Gt, Between, etc.) and
+        order_by of query as well, at the cost of slower insert & update.
+        The index is maintained by insert, update, delete and traverse.
+
+        :param col_name: Name of column to index
+        :type col_name: str
+        :param ordered: Whether to create sorted index
+        :type ordered: bool
+        :return: Index created, or the existing one if column is already indexed with the same kind of index
+        :rtype: HashIndex or SortedIndex
+        :raises KeyError: Column not exists
+        """
+        if col_name not in self.cols:
+            raise KeyError("Column '%s' not exists in Celltable '%s'" % (col_name, self.worksheet.title))
+        index_class = SortedIndex if ordered else HashIndex
+        if not isinstance(self.indexes.get(col_name), index_class):
+            index = index_class(col_name)
+            index.build(self.col_values(col_name))
+            self.indexes[col_name] = index
+        return self.indexes[col_name]
+
+    def drop_index(self, col_name):
+        """
+        Drop index on column if any
+
+        :param col_name: Name of indexed column
+        :type col_name: str
+        """
+        self.indexes.pop(col_name, None)
+
+    def create_key_index(self, key, unique=False):
+        """
+        Create index on key of one or more columns, to find rows by key without scanning, see upsert_many.
+        When unique is True, insert or update of row to key held by another row raises AssertionError.
+        The index is maintained by insert, update, delete and traverse.
+
+        :param key: Column name or list of column names
+        :type key: str or list
+        :param unique: Whether to refuse insert of duplicate key
+        :type unique: bool
+        :return: Index created, or the existing one with unique updated
+        :rtype: KeyIndex
+        :raises KeyError: Column not exists
+        :raises AssertionError: When unique is True and rows already have duplicate key
+        """
+        key = (key,) if isinstance(key, str) else tuple(key)
+        for col_name in key:
+            if col_name not in self.cols:
+                raise KeyError("Column '%s' not exists in Celltable '%s'" % (col_name, self.worksheet.title))
+        index = self.key_indexes.get(key)
+        if index is None:
+            index = KeyIndex(key)
+            index.build((row_idx, self.row_key(row_idx, key)) for row_idx in self.rows)
+        if unique and len(index) != len(self.rows):
+            raise AssertionError("Duplicate key of %s in Celltable '%s'" % (", ".join(key), self.worksheet.title))
+        index.unique = unique
+        self.key_indexes[key] = index
+        return index
+
+    def drop_key_index(self, key):
+        """
+        Drop index on key if any
+
+        :param key: Column name or list of column names
+        :type key: str or list
+        """
+        self.key_indexes.pop((key,) if isinstance(key, str) else tuple(key), None)
+
+    def row_key(self, row_idx, key):
+        """
+        :param row_idx: Row index
+        :type row_idx: int
+        :param key: Column names of key
+        :type key: tuple
+        :return: Values of key columns of row
+        :rtype: tuple
+        """
+        return tuple(self.value(row_idx, col_name) for col_name in key)
+
+    def check_keys(self, values_in_dicts, row_idxs=()):
+        """
+        Make sure rows to insert or update don't duplicate key of any unique key index, see create_key_index
+
+        :param values_in_dicts: Iterable of value of row in dict corresponding to col_names
+        :param row_idxs: Row indexes to update, whose keys are replaced by the given values
+        :type row_idxs: set
+        :return: Given values, as list if checked
+        :raise AssertionError: When key is held by another existing row or another given row
+        """
+        unique_indexes = [index for index in self.key_indexes.values() if index.unique]
+        if not unique_indexes:
+            return values_in_dicts
+        values_in_dicts = list(values_in_dicts)
+        for index in unique_indexes:
+            keys = set()
+            for value_in_dict in values_in_dicts:
+                key = index.key(value_in_dict)
+                if key in keys or any(row_idx not in row_idxs for row_idx in index.lookup(key)):
+                    raise AssertionError("Duplicate key %r of %s in Celltable '%s'" %
+                                         (key, ", ".join(index.col_name), self.worksheet.title))
+                keys.add(key)
+        return values_in_dicts
+
+    def check_updated_keys(self, updates):
+        """
+        Make sure rows to update don't duplicate key of any unique key index, see check_keys
+
+        :param updates: List of tuple(row indexes, value_in_dict), see update_many
+        :type updates: list
+        :raise AssertionError: When key is held by another existing row or another row to update
+        """
+        key_col_names = {col_name for index in self.key_indexes.values() if index.unique for col_name in index.col_name}
+        rows = {}  # Values of key columns after updated by row index
+        for row_idxs, value_in_dict in updates:
+            col_names = [col_name for col_name in key_col_names if col_name in value_in_dict]
+            if not col_names:
+                continue
+            for row_idx in row_idxs:
+                row = rows.get(row_idx)
+                if row is None:
+                    row = rows[row_idx] = self.row_values(row_idx, key_col_names)
+                for col_name in col_names:
+                    row[col_name] = value_in_dict[col_name]
+        if rows:
+            self.check_keys(rows.values(), set(rows))
+
+    def index_for(self, col_name, cond):
+        """
+        Get index that able to serve the condition, only equality condition(plain value, Eq or In) on indexed column
+        is served
+
+        :param col_name: Name of column
+        :type col_name: str
+        :param cond: Condition of column
+        :return: Index or None
+        :rtype: HashIndex
+        """
+        if equal_values(cond) is None:
+            return None
+        return self.indexes.get(col_name)
+
+    def index_row(self, row_idx):
+        """
+        Add row to all indexes
+
+        :param row_idx: Row index
+        :type row_idx: int
+        """
+        for col_name, index in self.indexes.items():
+            index.add(self.value(row_idx, col_name), row_idx)
+        for key, index in self.key_indexes.items():
+            index.add(self.row_key(row_idx, key), row_idx)
+
+    def unindex_row(self, row_idx):
+        """
+        Remove row from all indexes
+
+        :param row_idx: Row index
+        :type row_idx: int
+        """
+        for col_name, index in self.indexes.items():
+            index.remove(self.value(row_idx, col_name), row_idx)
+        for key, index in self.key_indexes.items():
+            index.remove(self.row_key(row_idx, key), row_idx)
+
+    def row_keys(self, row_idx, col_names=None):
+        """
+        Get keys of row in key indexes on any of the columns, to be re-indexed once row modified, see reindex_keys
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param col_names: Names of columns to be modified, all columns if None
+        :return: List of tuple(key index, key of row)
+        :rtype: list
+        """
+        return [(index, self.row_key(row_idx, key)) for key, index in self.key_indexes.items()
+                if col_names is None or any(col_name in col_names for col_name in key)]
+
+    def reindex_keys(self, row_idx, row_keys):
+        """
+        Move row in key indexes whose key of row changed
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param row_keys: Keys of row before modified, see row_keys
+        :type row_keys: list
+        :return: List of tuple(unique key index, key) where row moved to key held by another row, see check_moved_keys
+        :rtype: list
+        """
+        moved = []
+        for index, orig_key in row_keys:
+            key = self.row_key(row_idx, index.col_name)
+            if key != orig_key:
+                index.remove(orig_key, row_idx)
+                if index.unique and index.lookup(key):
+                    moved.append((index, key))
+                index.add(key, row_idx)
+        return moved
+
+    def check_moved_keys(self, moved):
+        """
+        Make sure keys rows moved to by traverse are not held by other rows. Values set by traverse can't be checked
+        before set, so rows are modified as usual, then rolled back only if within transaction, see Cellbase.transaction
+
+        :param moved: Keys rows moved to, see reindex_keys
+        :type moved: list
+        :raise AssertionError: When key of unique key index is held by many rows
+        """
+        for index, key in moved:
+            if len(index.lookup(key)) > 1:
+                raise AssertionError("Duplicate key %r of %s in Celltable '%s'" %
+                                     (key, ", ".join(index.col_name), self.worksheet.title))
+
+    def mark_dirty(self, row_idxs=()):
+        """
+        Mark worksheet as modified, so it will be serialised by incremental save and cached queries are outdated
+
+        :param row_idxs: Row indexes modified
+        """
+        self.version += 1
+        self.dirty = True
+        self.dirty_row_idxs.update(row_idxs)
+
+    def mark_clean(self):
+        """
+        Mark worksheet as saved
+        """
+        self.dirty = False
+        self.dirty_row_idxs.clear()
+
+    def recording(self):
+        """
+        :return: Whether modifications are recorded to journal or undo log, which need values modified
+        :rtype: bool
+        """
+        return self.journal is not None or self.undo_log is not None
+
+    def log_undo(self, op, *args):
+        """
+        Log how to undo modification while in transaction, see undo
+
+        :param op: Kind of modification
+        :type op: str
+        """
+        if self.undo_log is not None:
+            self.undo_log.append((self, op, args))
+
+    def record_insert(self, row_idxs):
+        """
+        Record values of inserted rows to journal, and log to undo, if any
+
+        :param row_idxs: Row indexes inserted
+        :type row_idxs: list
+        """
+        self.log_undo("insert", row_idxs[0], row_idxs[-1])
+        if self.journal is not None:
+            col_names = list(self.cols)
+            rows = [[self.value(row_idx, col_name) for col_name in col_names] for row_idx in row_idxs]
+            self.journal.record("insert", self.worksheet.title, cols=col_names, rows=rows)
+
+    def record_set(self, cells):
+        """
+        Record values of modified cells to journal, and log original values to undo, if any
+
+        :param cells: List of tuple(row_idx, col_name, value, original value)
+        :type cells: list
+        """
+        if not cells:
+            return
+        self.log_undo("set", [(row_idx, col_name, orig_value) for row_idx, col_name, _, orig_value in cells])
+        if self.journal is not None:
+            self.journal.record("set", self.worksheet.title,
+                                cells=[(row_idx, col_name, value) for row_idx, col_name, value, _ in cells])
+
+    def record_delete(self, row_idxs, rows=None, cells=None):
+        """
+        Record deleted rows to journal, and log values & cells of deleted rows to undo, if any
+
+        :param row_idxs: Row indexes deleted, counted before deletion
+        :type row_idxs: list
+        :param rows: Values of deleted rows taken before deletion, required while logging to undo
+        :type rows: list
+        :param cells: Cells of deleted rows taken out of worksheet by tuple(row_idx, col_idx), see shift_cells
+        :type cells: dict
+        """
+        self.log_undo("delete", row_idxs, rows, cells)
+        if self.journal is not None:
+            self.journal.record("delete", self.worksheet.title, row_idxs=list(row_idxs))
+
+    def record_restore(self, row_idxs, rows):
+        """
+        Record values of rows put back to journal, and log to undo, if any
+
+        :param row_idxs: Row indexes put back
+        :type row_idxs: list
+        :param rows: Values of rows put back
+        :type rows: list
+        """
+        self.log_undo("restore", row_idxs)
+        if self.journal is not None:
+            col_names = list(self.cols)
+            self.journal.record("restore", self.worksheet.title, row_idxs=list(row_idxs), cols=col_names,
+                                rows=[[row[col_name] for col_name in col_names] for row in rows])
+
     def safe_append(self, iterable, first_row=False):
         """
         Ensure new row appended on last row by setting worksheet._current_row,
@@ -46,46 +472,129 @@ class Celltable:
 
         .. note:: Set first_row to true to explicitly append to first row as worksheet.max_row always return 1
 
+        .. deprecated:: Celltable no longer appends to worksheet, use insert_many instead
+
         :param iterable: Columns of data to append
         :param first_row: Explicitly append to first row
         :type first_row: bool
         """
+        warnings.warn("Celltable.safe_append is deprecated, use Celltable.insert_many instead",
+                      DeprecationWarning, stacklevel=2)
         orig_current_row = self.worksheet._current_row
         # row_idx = worksheet._current_row + 1, see worksheet.append
         self.worksheet._current_row = self.worksheet.max_row if not first_row else 0
         self.worksheet.append(iterable)
         self.worksheet._current_row = orig_current_row
 
+    def row_idxs_matching(self, col_name, cond, row_idxs=None):
+        """
+        Find the row indexes where a single condition match.
+        When row_idxs is given, only those rows are inspected instead of the whole column.
+
+        :param col_name: Name of column to inspect, or row_idx
+        :type col_name: str
+        :param cond: Value to equal or callable
+        :param row_idxs: Candidate row indexes to inspect
+        :type row_idxs: set
+        :return: Row indexes where condition match
+        :rtype: set
+        """
+        if col_name == DAO.COL_ROW_IDX:
+            values = equal_values(cond)
+            if values is None:
+                return {row_idx for row_idx in (self.rows if row_idxs is None else row_idxs) if cond(row_idx)}
+            # Row index is looked up directly, just like index
+            return {int(row_idx) for row_idx in values
+                    if int(row_idx) in self.rows and (row_idxs is None or int(row_idx) in row_idxs)}
+        index = self.index_for(col_name, cond)
+        if index is not None:
+            matched = index.lookup_any(equal_values(cond))
+            return set(matched) if row_idxs is None else matched & row_idxs
+        index = self.indexes.get(col_name)
+        if isinstance(index, SortedIndex) and isinstance(cond, Predicate) and cond.bounds() is not None:
+            if row_idxs is None:
+                return set(index.between(*cond.bounds()))
+            if index.count_between(*cond.bounds()) <= len(row_idxs):  # Else inspect the fewer candidates instead
+                return set(index.between(*cond.bounds())) & row_idxs
+        # Masking the whole column beats inspecting candidates one by one unless candidates are few
+        many_candidates = row_idxs is None or len(row_idxs) * planner.NUMPY_SPEEDUP >= len(self.rows)
+        if isinstance(cond, Predicate) and many_candidates:
+            matched = self.row_idxs_masked(col_name, cond)
+            if matched is not None:
+                return matched if row_idxs is None else matched & row_idxs
+        if row_idxs is not None:
+            if callable(cond):
+                return {row_idx for row_idx in row_idxs if cond(self.value(row_idx, col_name))}
+            return {row_idx for row_idx in row_idxs if self.value(row_idx, col_name) == cond}
+        if callable(cond):
+            return {row_idx for row_idx, value in self.col_values(col_name) if cond(value)}
+        return {row_idx for row_idx, value in self.col_values(col_name) if value == cond}
+
+    def typed_col(self, col_name):
+        """
+        Get values of numeric column as Column of typed array, which is built from cells once and kept until Celltable
+        modified
+
+        :param col_name: Name of column
+        :type col_name: str
+        :return: Column of typed array, or None if values can't be stored in typed array
+        :rtype: Column
+        """
+        cached = self.typed_cols.get(col_name)
+        if cached is None or cached[0] != self.version:
+            values = [cell.value for cell in self.cols[col_name]]
+            cached = (self.version, Column(values) if kind_of(values) is not None else None)
+            self.typed_cols[col_name] = cached
+        return cached[1]
+
+    def col_array(self, col_name):
+        """
+        Get values of column as NumPy array for vectorized evaluation, where empty cell is NaN
+
+        :param col_name: Name of column
+        :type col_name: str
+        :return: NumPy array, or None if column can't be viewed as NumPy array or NumPy is not installed
+        :rtype: numpy.ndarray
+        """
+        if numpy is None:
+            return None
+        col = self.typed_col(col_name)
+        return None if col is None else col.to_numpy()
+
+    def row_idxs_masked(self, col_name, predicate):
+        """
+        Find the row indexes where predicate match, by evaluating the whole column at once with NumPy
+
+        :param col_name: Name of column to inspect
+        :type col_name: str
+        :param predicate: Predicate to evaluate
+        :type predicate: Predicate
+        :return: Row indexes where predicate match, or None if predicate can't be evaluated with NumPy
+        :rtype: set
+        """
+        values = self.col_array(col_name)
+        if values is None:
+            return None
+        mask = predicate.mask(values)
+        if mask is None:
+            return None
+        return set((mask.nonzero()[0] + 2).tolist())  # +2 as row_idx starts from 2
+
     def row_idxs_where(self, where=None):
         """
         Find the row indexes where any of the conditions match
 
         :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
         :type where: dict
-        :return: Row indexes where conditions match
+        :return: Row indexes where conditions match, in order of rows
         :rtype: list
         """
         if where is None:
             return [row_idx for row_idx in self.rows]
-        row_idxs = []
-        if DAO.COL_ROW_IDX in where:
-            cond = where[DAO.COL_ROW_IDX]
-            if callable(where[DAO.COL_ROW_IDX]):
-                for row_idx in self.rows:
-                    if cond(row_idx):
-                        row_idxs.append(row_idx)
-            else:
-                row_idx = int(cond)
-                if row_idx in self.rows:
-                    row_idxs.append(row_idx)
+        row_idxs = set()
         for col_name, cond in where.items():
-            if col_name == DAO.COL_ROW_IDX:
-                continue
-            for cell in self.cols[col_name]:
-                if cell.row not in row_idxs and cond(cell.value) if callable(cond) else cell.value == cond:
-                    row_idxs.append(cell.row)
-
-        return row_idxs
+            row_idxs |= self.row_idxs_matching(col_name, cond)
+        return sorted(row_idxs)
 
     def col_names_where(self, row_idx, where=None):
         """
@@ -100,51 +609,369 @@ class Celltable:
         """
         if where is None:
             return [col_name for col_name in self.cols]
-        col_names = []
-        for col_name, cond in where.items():
-            if col_name == DAO.COL_ROW_IDX:
-                if cond(row_idx) if callable(cond) else row_idx == int(cond):
-                    col_names.append(col_name)
-                continue
-            cell = self.rows[row_idx][col_name]
-            if cond(cell.value) if callable(cond) else cell.value == cond:
-                col_names.append(col_name)
-        return col_names
+        return [col_name for col_name, cond in where.items() if self.matches(row_idx, col_name, cond)]
+
+    def matches(self, row_idx, col_name, cond):
+        """
+        Check if a single condition match a specific row
+
+        :param row_idx: Row index to inspect
+        :type row_idx: int
+        :param col_name: Name of column to inspect, or row_idx
+        :type col_name: str
+        :param cond: Value to equal or callable
+        :return: If condition match
+        :rtype: bool
+        """
+        if col_name == DAO.COL_ROW_IDX:
+            return cond(row_idx) if callable(cond) else row_idx == int(cond)
+        value = self.value(row_idx, col_name)
+        return cond(value) if callable(cond) else value == cond
+
+    def col_stats(self, col_name):
+        """
+        Cheap statistics of column for query planning, statistics that can't be collected cheaply are None.
+        Distinct count comes from hash index, while min & max come from NumPy array of numeric column.
+
+        :param col_name: Name of column, or row_idx
+        :type col_name: str
+        :return: dict of rows(number of rows), distinct(number of distinct values), min & max
+        :rtype: dict
+        """
+        row_count = len(self.rows)
+        stats = {'rows': row_count, 'distinct': None, 'min': None, 'max': None}
+        if col_name == DAO.COL_ROW_IDX:
+            if row_count:
+                stats.update(distinct=row_count, min=2, max=row_count + 1)
+            return stats
+        index = self.indexes.get(col_name)
+        if isinstance(index, HashIndex):
+            stats['distinct'] = len(index)
+        values = self.col_array(col_name)
+        if values is not None:
+            values = values[values == values]  # Exclude NaN
+            if len(values):
+                stats.update(min=float(values.min()), max=float(values.max()))
+        return stats
+
+    def plan_step(self, col_name, cond):
+        """
+        Decide how to match a single condition and estimate number of rows it matches
+
+        :param col_name: Name of column to inspect, or row_idx
+        :type col_name: str
+        :param cond: Value to equal or callable
+        :return: Step of plan
+        :rtype: PlanStep
+        """
+        if col_name == DAO.COL_ROW_IDX and not callable(cond):
+            return PlanStep(col_name, cond, planner.ROW_IDX, 1)
+        index = self.index_for(col_name, cond)
+        if index is not None:
+            return PlanStep(col_name, cond, planner.INDEX, index.count(set(equal_values(cond))))
+        index = self.indexes.get(col_name)
+        if isinstance(index, SortedIndex) and isinstance(cond, Predicate) and cond.bounds() is not None:
+            return PlanStep(col_name, cond, planner.RANGE, index.count_between(*cond.bounds()))
+        stats = self.col_stats(col_name)
+        if col_name != DAO.COL_ROW_IDX and isinstance(cond, Predicate) and self.col_array(col_name) is not None:
+            return PlanStep(col_name, cond, planner.NUMPY, planner.estimate_rows(cond, stats))
+        return PlanStep(col_name, cond, planner.SCAN, planner.estimate_rows(cond, stats))
+
+    def plan(self, where=None):
+        """
+        Plan the order to match conditions where all conditions must match.
+        Conditions matched at once by row_idx, index or NumPy come first, the most selective one drives the query
+        and the rest narrow the candidates. Then conditions that inspect rows one by one follow, most selective first.
+        Number of rows matched is exact for row_idx & index, and estimated with col_stats for the others.
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :return: Steps in order of execution
+        :rtype: list
+        """
+        if where is None:
+            return []
+        steps = [self.plan_step(col_name, cond) for col_name, cond in where.items()]
+        return sorted(steps, key=lambda step: (not step.is_at_once(), step.estimate))
+
+    def explain(self, where=None):
+        """
+        Describe the plan of query, see plan. For example,
+        "1. index id == 1 (~2 rows)\n2. scan name <lambda> (~50 rows)"
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :return: Description of plan, one step per line
+        :rtype: str
+        """
+        steps = self.plan(where)
+        if not steps:
+            return "1. all rows (~%d rows)" % len(self.rows)
+        return "\n".join("%d. %s" % (i, step) for i, step in enumerate(steps, 1))
 
     def row_and_col_where(self, where=None):
         """
-        Find row indexes where all conditions match by combining row_idx_where and col_names_where
+        Find row indexes where all conditions match.
+        Conditions are matched in order of plan(see plan), rows matched by the first condition become the candidates,
+        and only the candidates are inspected by the rest.
 
         :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
         :type where: dict
-        :return: Row indexes where all conditions match
+        :return: Row indexes where all conditions match, in order of rows, none if where is empty
         :rtype: list
         """
-        row_idxs_where = self.row_idxs_where(where)
         if where is None:
-            return row_idxs_where
-        row_idxs = []
-        for row_idx in row_idxs_where:
-            if len(self.col_names_where(row_idx, where)) == len(where):
-                row_idxs.append(row_idx)
-        return row_idxs
+            return [row_idx for row_idx in self.rows]
+        row_idxs = None
+        for step in self.plan(where):
+            row_idxs = self.row_idxs_matching(step.col_name, step.cond, row_idxs)
+            if not row_idxs:
+                return []
+        return sorted(row_idxs) if row_idxs is not None else []
+
+    def iter_row_and_col_where(self, where=None):
+        """
+        Iterate through row indexes where all conditions match, rows are inspected lazily so the scan stops as soon as
+        iteration stops.
+        Conditions that can be matched at once(see plan) narrow the candidates first, then the rest of the
+        conditions are inspected row by row.
 
-    def query(self, where=None):
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :return: Iterator of row indexes where all conditions match, in order of rows, none if where is empty
+        """
+        if where is None:
+            yield from self.rows
+            return
+        if not where:  # Same as row_and_col_where, no condition to match
+            return
+        row_idxs = None
+        conds = []
+        for step in self.plan(where):
+            if step.is_at_once():
+                row_idxs = self.row_idxs_matching(step.col_name, step.cond, row_idxs)
+                if not row_idxs:
+                    return
+            else:
+                conds.append((step.col_name, step.cond))
+        if row_idxs is not None:
+            row_idxs = sorted(row_idxs)
+        elif conds and conds[0][0] != DAO.COL_ROW_IDX:  # Stream through column of the first condition
+            col_name, cond = conds.pop(0)
+            if callable(cond):
+                row_idxs = (row_idx for row_idx, value in self.col_values(col_name) if cond(value))
+            else:
+                row_idxs = (row_idx for row_idx, value in self.col_values(col_name) if value == cond)
+        else:
+            row_idxs = self.rows
+        if not conds:
+            yield from row_idxs
+            return
+        for row_idx in row_idxs:
+            if all(self.matches(row_idx, col_name, cond) for col_name, cond in conds):
+                yield row_idx
+
+    def sort_row_idxs(self, row_idxs, order_by, limit=None):
+        """
+        Sort row indexes by values of columns, row indexes of same values remain in ascending order.
+        Sorted index is iterated when ordering by single column with sorted index,
+        else only the first limit rows are kept with heap instead of sorting all rows.
+
+        :param row_idxs: Row indexes to sort, all rows if None
+        :type row_idxs: list
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+        :param limit: Maximum number of row indexes to return, all if None
+        :type limit: int
+        :return: Sorted row indexes
+        :rtype: list
+        """
+        orders = parse_order_by(order_by)
+        if len(orders) == 1 and isinstance(self.indexes.get(orders[0][0]), SortedIndex):
+            col_name, descending = orders[0]
+            row_idxs_in_order = self.indexes[col_name].iter_row_idxs(reverse=descending)
+            if row_idxs is not None:
+                row_idxs_matched = set(row_idxs)
+                row_idxs_in_order = (row_idx for row_idx in row_idxs_in_order if row_idx in row_idxs_matched)
+            return list(islice(row_idxs_in_order, limit))
+
+        def key(row_idx):
+            keys = []
+            for col_name, descending in orders:
+                value_key = sort_key(row_idx if col_name == DAO.COL_ROW_IDX else self.value(row_idx, col_name))
+                keys.append(Descending(value_key) if descending else value_key)
+            keys.append(row_idx)
+            return keys
+
+        row_idxs = self.rows if row_idxs is None else row_idxs
+        if limit is None:
+            return sorted(row_idxs, key=key)
+        return heapq.nsmallest(limit, row_idxs, key=key)
+
+    def query(self, where=None, order_by=None, limit=None, offset=0, select=None):
         """
         Query data where conditions match
 
         :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
         :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of rows to return, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :param select: Column names to return, all columns if None. row_idx is always returned
+        :type select: list
         :return: List of rows
         :rtype: list
         """
-        rows_to_return = []
-        for row_idx in self.row_and_col_where(where):
-            values = {DAO.COL_ROW_IDX: row_idx}
-            for key, cell in self.rows[row_idx].items():
-                values[key] = cell.value
-            rows_to_return.append(values)
-        return rows_to_return
+        return list(self.iter_query(where=where, order_by=order_by, limit=limit, offset=offset, select=select))
+
+    def iter_query(self, where=None, order_by=None, limit=None, offset=0, select=None):
+        """
+        Iterate through data where conditions match, rows are only read when iterated.
+        Without order_by, rows are inspected lazily as well, so scanning stops once offset + limit rows are found or
+        iteration stops.
+
+        .. note:: Don't modify Celltable while iterating
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of rows to yield, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :param select: Column names to yield, all columns if None. row_idx is always yielded
+        :type select: list
+        :return: Iterator of rows
+        """
+        for row_idx in self.query_row_idxs(where=where, order_by=order_by, limit=limit, offset=offset):
+            yield self.row_values(row_idx, select)
+
+    def query_values(self, col_name, where=None, order_by=None, limit=None, offset=0):
+        """
+        Query values of a single column where conditions match, without building dict for every row
+
+        :param col_name: Name of column, or row_idx
+        :type col_name: str
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of values to return, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :return: List of values
+        :rtype: list
+        """
+        if col_name not in self.cols and col_name != DAO.COL_ROW_IDX:
+            raise KeyError(col_name)
+        if where is None and order_by is None:  # Slice column directly
+            stop = None if limit is None else offset + limit
+            if col_name == DAO.COL_ROW_IDX:
+                return list(islice(self.rows, offset, stop))
+            return [value for _, value in islice(self.col_values(col_name), offset, stop)]
+        row_idxs = self.query_row_idxs(where=where, order_by=order_by, limit=limit, offset=offset)
+        if col_name == DAO.COL_ROW_IDX:
+            return list(row_idxs)
+        return [self.value(row_idx, col_name) for row_idx in row_idxs]
+
+    def query_row_idxs(self, where=None, order_by=None, limit=None, offset=0):
+        """
+        Find row indexes to query, lazily when order_by is None. See iter_query
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of row indexes, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :return: Iterator of row indexes
+        """
+        stop = None if limit is None else offset + limit
+        if order_by is None:
+            row_idxs = self.iter_row_and_col_where(where)
+        else:
+            row_idxs = self.sort_row_idxs(None if where is None else self.row_and_col_where(where), order_by, stop)
+        return islice(row_idxs, offset, stop)
+
+    def group_row_idxs(self, group_by, row_idxs=None):
+        """
+        Group rows by values of columns, groups of a single column are taken from its hash index
+
+        :param group_by: Column names to group rows by
+        :type group_by: list
+        :param row_idxs: Row indexes to group, all rows if None
+        :type row_idxs: list
+        :return: List of tuple(group values, row indexes of group) in order of group values
+        :rtype: list
+        """
+        groups = {}
+        index = self.indexes.get(group_by[0]) if len(group_by) == 1 else None
+        if isinstance(index, HashIndex):
+            selected = None if row_idxs is None else set(row_idxs)
+            for value, group_row_idxs in index.row_idxs.items():
+                if selected is not None:
+                    group_row_idxs = group_row_idxs & selected
+                if group_row_idxs:
+                    groups[(value,)] = group_row_idxs
+        else:
+            for row_idx in (self.rows if row_idxs is None else row_idxs):
+                key = tuple(self.value(row_idx, col_name) for col_name in group_by)
+                groups.setdefault(key, []).append(row_idx)
+        return sorted(groups.items(), key=lambda group: [sort_key(value) for value in group[0]])
+
+    def aggregate(self, where=None, group_by=None, aggs=None):
+        """
+        Aggregate values of rows where conditions match, as a whole or by groups of rows with the same values.
+        Empty cell is excluded. Numeric column is aggregated over its typed array with NumPy.
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param group_by: Column name or list of column names to group rows by, all rows as a single group if None
+        :type group_by: str or list
+        :param aggs: dict of column name to function or list of functions, where function is one of count, sum, min,
+            max or avg. For example, {'amount': 'sum', 'id': 'count'}. Count rows by row_idx if None
+        :type aggs: dict
+        :return: dict of aggregated values if group_by is None, else list of dict of group values & aggregated values
+            in order of group values
+        :rtype: dict or list
+        """
+        specs = aggregation.parse_aggs(aggs or {DAO.COL_ROW_IDX: "count"})
+        group_by = [] if group_by is None else [group_by] if isinstance(group_by, str) else list(group_by)
+        for col_name in group_by + [col_name for _, col_name, _ in specs]:
+            if col_name not in self.cols and col_name != DAO.COL_ROW_IDX:
+                raise KeyError(col_name)
+        if DAO.COL_ROW_IDX in group_by:
+            raise KeyError("Can't group by %s" % DAO.COL_ROW_IDX)
+        row_idxs = None if where is None else self.row_and_col_where(where)
+        if group_by:
+            groups = self.group_row_idxs(group_by, row_idxs)
+        else:
+            groups = [((), self.rows if row_idxs is None else row_idxs)]
+        results = [dict(zip(group_by, key)) for key, _ in groups]
+        members = [group_row_idxs for _, group_row_idxs in groups]
+        positions = codes = None
+        for key, col_name, function in specs:
+            values = self.col_array(col_name) if col_name != DAO.COL_ROW_IDX else None
+            if values is not None:
+                if positions is None:  # Shared by every numeric column
+                    positions, codes = aggregation.group_positions(members)
+                kind = self.typed_col(col_name).kind
+                aggregated = aggregation.reduce_array(function, values[positions], codes, len(members), kind)
+            elif col_name == DAO.COL_ROW_IDX:
+                aggregated = [aggregation.reduce_values(function, group_row_idxs) for group_row_idxs in members]
+            else:
+                aggregated = [aggregation.reduce_values(function, (self.value(row_idx, col_name)
+                                                                 for row_idx in group_row_idxs))
+                              for group_row_idxs in members]
+            for result, value in zip(results, aggregated):
+                result[key] = value
+        return results if group_by else results[0]
 
     def insert(self, value_in_dict):
         """
@@ -155,35 +982,179 @@ class Celltable:
         :return: New row index
         :rtype: int
         """
-        self.safe_append({col_id.col_idx: value_in_dict[col_id.value] for col_id in self.col_ids})
+        return self.insert_many([value_in_dict])[0]
+
+    def insert_many(self, values_in_dicts):
+        """
+        Insert new rows of data in a single pass.
+        Row indexes are counted from the last row instead of inspecting worksheet after every row appended.
+
+        :param values_in_dicts: Iterable of value of row in dict corresponding to col_names
+        :return: New row indexes, in order of given values
+        :rtype: list
+        :raise KeyError: When any row misses a column, then no row is inserted
+        """
+        values_in_dicts = self.check_keys(values_in_dicts)
+        # Raise KeyError of any row before any cell created, so a failing batch inserts nothing
+        rows_values = [[value_in_dict[col_id.value] for col_id in self.col_ids] for value_in_dict in values_in_dicts]
+        new_row_idxs = []
         new_row_idx = self.worksheet.max_row
-        self.rows[new_row_idx] = {}
-        for col_id in self.col_ids:
-            new_cell = self.worksheet._cells[new_row_idx, col_id.col_idx]
-            self.rows[new_row_idx][col_id.value] = new_cell
-            self.cols[col_id.value].append(new_cell)
-        return new_row_idx
+        for values in rows_values:
+            new_row_idx += 1
+            row = {}
+            for col_id, value in zip(self.col_ids, values):
+                new_cell = self.worksheet.cell(row=new_row_idx, column=col_id.col_idx, value=value)
+                row[col_id.value] = new_cell
+                self.cols[col_id.value].append(new_cell)
+            self.rows[new_row_idx] = row
+            self.index_row(new_row_idx)
+            new_row_idxs.append(new_row_idx)
+        if new_row_idxs:
+            self.mark_dirty(new_row_idxs)
+            self.record_insert(new_row_idxs)
+        return new_row_idxs
 
     def update(self, value_in_dict, where=None):
         """
         Update row(s) where conditions match
 
-        :param value_in_dict:
+        :param value_in_dict: dict of values to set by column name, where row_idx is the row to update if where is None
+        :type value_in_dict: dict
         :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
         :type where: dict
         :return: Number of rows updated
         :rtype: int
         """
-        if where is None:
-            row = self.rows[value_in_dict[DAO.COL_ROW_IDX]]
-            for cell in list(row.values())[1:]:
-                cell.value = value_in_dict[self.col_idx_to_col_id(cell.col_idx).value]
-            return 1
-        return self.traverse(
-            lambda cell: set_cell_value(cell, value_in_dict[self.col_idx_to_col_id(cell.col_idx).value]),
-            where=where,
-            select=[col_id.value for col_id in self.col_ids if col_id.value in value_in_dict]
-        )
+        return self.update_many([(where, value_in_dict)])
+
+    def update_many(self, updates):
+        """
+        Update rows in a single pass, where only the values changed are re-indexed and journaled
+
+        :param updates:
+            Iterable of tuple(target, value_in_dict), where target is row index, dict of conditions(see update), or
+            None for row_idx in value_in_dict. For example, [(2, {'name': 'jp'}), ({'id': 1}, {'name': 'jp'})]
+        :return: Number of rows updated, counted once per update
+        :rtype: int
+        :raise KeyError: When row index doesn't exist
+        :raise AssertionError: When key of unique key index is held by another row, see create_key_index
+        """
+        targets = []  # Rows of every update are found before any row updated
+        for target, value_in_dict in updates:
+            if target is None:
+                target = value_in_dict[DAO.COL_ROW_IDX]
+            if isinstance(target, dict):
+                targets.append((self.row_idxs_where(target), value_in_dict))
+            elif target in self.rows:
+                targets.append(([target], value_in_dict))
+            else:
+                raise KeyError(target)
+        if any(index.unique for index in self.key_indexes.values()):
+            self.check_updated_keys(targets)
+        updated_row_idxs = []
+        changed = [] if self.recording() else None
+        for row_idxs, value_in_dict in targets:
+            col_names = [col_name for col_name in self.cols if col_name in value_in_dict]
+            for row_idx in row_idxs:
+                row_keys = self.row_keys(row_idx, col_names) if self.key_indexes else None
+                for col_name in col_names:
+                    value = value_in_dict[col_name]
+                    orig_value = self.value(row_idx, col_name)
+                    if value == orig_value and type(value) is type(orig_value):
+                        continue
+                    self.set_value(row_idx, col_name, value)
+                    index = self.indexes.get(col_name)
+                    if index is not None:
+                        index.remove(orig_value, row_idx)
+                        index.add(value, row_idx)
+                    if changed is not None:
+                        changed.append((row_idx, col_name, value, orig_value))
+                if row_keys:
+                    self.reindex_keys(row_idx, row_keys)
+            updated_row_idxs.extend(row_idxs)
+        if updated_row_idxs:
+            self.mark_dirty(updated_row_idxs)
+            self.record_set(changed)
+        return len(updated_row_idxs)
+
+    def upsert_many(self, values_in_dicts, key):
+        """
+        Update rows holding the key of values, or insert values as new rows if no row holds the key, in a single pass.
+        Rows are found with index on key, which is created if not exists, see create_key_index.
+        Values of the same key that is not held by any row are merged and inserted once.
+
+        :param values_in_dicts: Iterable of value of row in dict corresponding to col_names
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :return: Row indexes updated or inserted, in order of given values. First row of key if held by many rows
+        :rtype: list
+        """
+        key = (key,) if isinstance(key, str) else tuple(key)
+        index = self.key_indexes.get(key)
+        if index is None:
+            index = self.create_key_index(key)
+        row_idxs = []
+        updates = []
+        to_insert = []
+        pending = {}  # Position in to_insert by key
+        inserted = []  # tuple(position in row_idxs, position in to_insert)
+        for value_in_dict in values_in_dicts:
+            value_key = index.key(value_in_dict)
+            matched_row_idxs = sorted(index.lookup(value_key))
+            if matched_row_idxs:
+                updates.extend((row_idx, value_in_dict) for row_idx in matched_row_idxs)
+                row_idxs.append(matched_row_idxs[0])
+                continue
+            pos = pending.get(value_key)
+            if pos is None:
+                pos = pending[value_key] = len(to_insert)
+                to_insert.append(value_in_dict)
+            else:
+                to_insert[pos] = dict(to_insert[pos])  # Merged as a new dict, given dict is never modified
+                to_insert[pos].update(value_in_dict)
+            inserted.append((len(row_idxs), pos))
+            row_idxs.append(None)
+        if updates:
+            self.update_many(updates)
+        if to_insert:
+            new_row_idxs = self.insert_many(to_insert)
+            for row_pos, pos in inserted:
+                row_idxs[row_pos] = new_row_idxs[pos]
+        return row_idxs
+
+    def set_value(self, row_idx, col_name, value):
+        """
+        Set value of cell, without maintaining indexes
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param col_name: Name of column
+        :type col_name: str
+        :param value: Value to set
+        """
+        self.rows[row_idx][col_name].value = value
+
+    def undo(self, op, *args):
+        """
+        Undo modification logged by log_undo, where modifications are undone in reverse order.
+        Values are restored, along with cells of rows deleted, see restore.
+
+        :param op: Kind of modification, insert, set, delete or restore
+        :type op: str
+        """
+        if op == "insert":  # Rows inserted are always the last rows
+            first_row_idx, last_row_idx = args
+            self.delete({DAO.COL_ROW_IDX: In(range(first_row_idx, last_row_idx + 1))})
+        elif op == "set":
+            cells, = args
+            self.update_many((row_idx, {col_name: value}) for row_idx, col_name, value in reversed(cells))
+        elif op == "delete":
+            self.restore(*args)
+        elif op == "restore":
+            row_idxs, = args
+            self.delete({DAO.COL_ROW_IDX: In(row_idxs)})
+        else:
+            raise ValueError("Unknown operation '%s' to undo" % op)
 
     def delete(self, where=None):
         """
@@ -196,45 +1167,132 @@ class Celltable:
         """
         row_idxs_where = self.row_and_col_where(where)
         affected_row_count = len(row_idxs_where)
-        if affected_row_count is 0:
-            return
-        begin_max_row = self.worksheet.max_row  # max_row before delete
-        # Pop row where condition matched
-        for row_idx in row_idxs_where:
-            self.rows.pop(row_idx)
-        # Fill the gap, by changing key of rows starting from first popped row id
-        first_popped_row_id = min(row_idxs_where)
-        index_range = range(first_popped_row_id, begin_max_row + 1)  # +1 for range exclusive
-        rows_after_first_popped_row = list(self.rows.values())[
-                                      first_popped_row_id - 2:]  # -1 for col_id -1 for 0 indexed list
-        for new_row_idx, row in zip(index_range, rows_after_first_popped_row):
-            for col_id in self.col_ids:
-                row[col_id.value].row = new_row_idx
+        if affected_row_count == 0:
+            return 0
+        deleted_rows = [self.row_values(row_idx) for row_idx in row_idxs_where] if self.undo_log is not None else None
+        row_idxs_to_delete = set(row_idxs_where)
+        first_popped_row_idx = row_idxs_where[0]
+        last_row_idx = next(reversed(self.rows))
+        # Only rows starting from first popped row are touched, rows before it remain as it is
+        row_idxs_to_shift = range(first_popped_row_idx, last_row_idx + 1)  # +1 for range exclusive
+        for row_idx in row_idxs_to_shift:
+            self.unindex_row(row_idx)
+        self.mark_dirty(row_idxs_to_shift)
+        deleted_cells = self.shift_cells(row_idxs_to_shift, row_idxs_to_delete, range(1, self.max_col_idx + 1))
+        # Fill the gap in one pass, by moving every remaining row up to the next available row index.
+        # Rows are popped & put back in ascending order, so rows stay sorted without sorting
+        new_row_idx = first_popped_row_idx
+        for row_idx in row_idxs_to_shift:
+            row = self.rows.pop(row_idx)
+            if row_idx in row_idxs_to_delete:
+                continue
             self.rows[new_row_idx] = row
-        # Pop the last nth rows as changing key of dict may left old entry remains
-        for last_row_idx in [begin_max_row - i for i in range(affected_row_count) if
-                             begin_max_row - i not in row_idxs_where]:
-            self.rows.pop(last_row_idx)
-        # Sort dict by key as changing of
-        # old key to empty(deleted) key may be treated as putting new entry
-        # while delete() highly dependant on the sequence
-        self.rows = collections.OrderedDict(sorted(self.rows.items()))
-        # Update cols as the reference of cell is broken &
-        # coordinate of cells to worksheet as worksheet._cells is not OrderedDict
-        for col_id in self.col_ids:
-            self.cols[col_id.value].clear()
-        self.worksheet._cells.clear()
-        self.safe_append({col_id.col_idx: col_id.value for col_id in self.col_ids}, first_row=True)  # Set col_ids
-        for row_idx in self.rows:
-            for col_id in self.col_ids:
-                copied_cell = copy(self.rows[row_idx][col_id.value])
-                self.worksheet._cells[row_idx, col_id.col_idx] = copied_cell
-                self.cols[col_id.value].append(copied_cell)
+            self.index_row(new_row_idx)
+            new_row_idx += 1
+        # cols are ordered by row, so only the tail after first popped row is replaced
+        for col_name, cells in self.cols.items():
+            cells[first_popped_row_idx - 2:] = [  # -1 for col_id -1 for 0 indexed list
+                self.rows[row_idx][col_name] for row_idx in range(first_popped_row_idx, new_row_idx)]
+        self.record_delete(row_idxs_where, deleted_rows, deleted_cells if self.undo_log is not None else None)
         return affected_row_count
 
+    def restore(self, row_idxs, rows, cells=None):
+        """
+        Put deleted rows back to their row indexes, where rows after them are moved back down, which is the inverse of
+        delete. Only rows starting from the first row put back are touched, and cells moved keep their formats.
+
+        :param row_idxs: Ascending row indexes deleted, counted before deletion
+        :type row_idxs: list
+        :param rows: Values of deleted rows, in dict by column name
+        :type rows: list
+        :param cells: Cells of deleted rows by tuple(row_idx, col_idx), see shift_cells. Cells are created if None
+        :type cells: dict
+        """
+        first_row_idx = row_idxs[0]
+        last_row_idx = next(reversed(self.rows)) if self.rows else 1
+        for row_idx in range(first_row_idx, last_row_idx + 1):  # +1 for range exclusive
+            self.unindex_row(row_idx)
+        row_idxs_to_shift = range(first_row_idx, last_row_idx + len(row_idxs) + 1)
+        self.mark_dirty(row_idxs_to_shift)
+        self.unshift_cells(row_idxs_to_shift, set(row_idxs), range(1, self.max_col_idx + 1), cells)
+        # Rows are popped & put back in ascending order, so rows stay sorted without sorting
+        remaining = iter([self.rows.pop(row_idx) for row_idx in range(first_row_idx, last_row_idx + 1)])
+        deleted = dict(zip(row_idxs, rows))
+        for row_idx in row_idxs_to_shift:
+            values = deleted.get(row_idx)
+            if values is None:
+                self.rows[row_idx] = next(remaining)
+            else:
+                self.rows[row_idx] = {col_id.value: self.worksheet.cell(row=row_idx, column=col_id.col_idx,
+                                                                        value=values[col_id.value])
+                                      for col_id in self.col_ids}
+            self.index_row(row_idx)
+        for col_name, col_cells in self.cols.items():
+            col_cells[first_row_idx - 2:] = [  # -1 for col_id -1 for 0 indexed list
+                self.rows[row_idx][col_name] for row_idx in row_idxs_to_shift]
+        self.record_restore(row_idxs, rows)
+
+    def shift_cells(self, row_idxs_to_shift, row_idxs_to_delete, col_idxs):
+        """
+        Remove cells of deleted rows from worksheet, and move cells of remaining rows up to fill the gap
+
+        :param row_idxs_to_shift: Ascending row indexes starting from first deleted row to last row
+        :type row_idxs_to_shift: range
+        :param row_idxs_to_delete: Row indexes to delete
+        :type row_idxs_to_delete: set
+        :param col_idxs: Column indexes of cells to move, including columns without header
+        :return: Cells of deleted rows removed by tuple(row_idx, col_idx), see unshift_cells
+        :rtype: dict
+        """
+        deleted_cells = {}
+        new_row_idx = row_idxs_to_shift[0]
+        for row_idx in row_idxs_to_shift:
+            for col_idx in col_idxs:
+                cell = self.worksheet._cells.pop((row_idx, col_idx), None)
+                if cell is None:
+                    continue
+                if row_idx in row_idxs_to_delete:
+                    deleted_cells[row_idx, col_idx] = cell
+                    continue
+                cell.row = new_row_idx
+                self.worksheet._cells[new_row_idx, col_idx] = cell
+            if row_idx not in row_idxs_to_delete:
+                new_row_idx += 1
+        return deleted_cells
+
+    def unshift_cells(self, row_idxs_to_shift, row_idxs_deleted, col_idxs, deleted_cells=None):
+        """
+        Move cells of remaining rows back down to their row indexes before deletion, and put cells of deleted rows
+        back to worksheet, which is the inverse of shift_cells
+
+        :param row_idxs_to_shift: Ascending row indexes starting from first deleted row to last row before deletion
+        :type row_idxs_to_shift: range
+        :param row_idxs_deleted: Row indexes deleted
+        :type row_idxs_deleted: set
+        :param col_idxs: Column indexes of cells to move, including columns without header
+        :param deleted_cells: Cells of deleted rows returned by shift_cells
+        :type deleted_cells: dict
+        """
+        cells = self.worksheet._cells
+        new_row_idx = row_idxs_to_shift[-1] - len(row_idxs_deleted)
+        for row_idx in reversed(row_idxs_to_shift):  # From the last row, so no cell is moved onto another one
+            if row_idx in row_idxs_deleted:
+                continue
+            for col_idx in col_idxs:
+                cell = cells.pop((new_row_idx, col_idx), None)
+                if cell is None:
+                    continue
+                cell.row = row_idx
+                cells[row_idx, col_idx] = cell
+            new_row_idx -= 1
+        for (row_idx, col_idx), cell in (deleted_cells or {}).items():
+            cell.row = row_idx
+            cells[row_idx, col_idx] = cell
+
     def traverse(self, fn, where=None, select=None):
         """
-        Access cells directly from rows where condition match
+        Access cells directly from rows where condition match.
+        If fn raises, cells modified so far are still indexed & recorded, so they can be rolled back by transaction
 
         :param fn:
             function(:class:`openpyxl.cell.Cell`) to allow accessing the cell.
@@ -247,18 +1305,44 @@ class Celltable:
         :type select: list
         :return: Number of rows traversed
         :rtype: int
+        :raise AssertionError: When key of unique key index is held by many rows afterwards, see check_moved_keys
         """
         if callable(fn) is False:
             raise TypeError("Expected callable for argument fn(cell)")
         row_idxs_where = self.row_idxs_where(where)
-        for row_idx in row_idxs_where:
-            select = [col_id.value for col_id in self.col_ids] if select is None else select
-            for matched_col_id in [col_id for col_id in self.col_ids if col_id.value in select]:
-                cell = self.rows[row_idx][matched_col_id.value]
-                fn(cell)  # Expect callable to modify cell
-                # Update value to worksheet
-                self.worksheet._cells[row_idx, matched_col_id.col_idx] = cell
-                # No need to update cols as it share same reference with row
+        changed = [] if self.recording() else None
+        moved = []
+        matched_col_ids = [col_id for col_id in self.col_ids if select is None or col_id.value in select]
+        traversed = 0  # Number of rows fn reached, which are recorded even if fn raises
+        try:
+            for row_idx in row_idxs_where:
+                traversed += 1
+                row_keys = self.row_keys(row_idx, select) if self.key_indexes else None
+                try:
+                    for matched_col_id in matched_col_ids:
+                        cell = self.rows[row_idx][matched_col_id.value]
+                        index = self.indexes.get(matched_col_id.value)
+                        orig_value = cell.value
+                        try:
+                            fn(cell)  # Expect callable to modify cell
+                        finally:  # Cell might be modified before fn raises
+                            if cell.value != orig_value:
+                                if index is not None:
+                                    index.remove(orig_value, row_idx)
+                                    index.add(cell.value, row_idx)
+                                if changed is not None:
+                                    changed.append((row_idx, matched_col_id.value, cell.value, orig_value))
+                            # Update value to worksheet
+                            self.worksheet._cells[row_idx, matched_col_id.col_idx] = cell
+                            # No need to update cols as it share same reference with row
+                finally:
+                    if row_keys:
+                        moved.extend(self.reindex_keys(row_idx, row_keys))
+        finally:
+            if traversed:
+                self.mark_dirty(row_idxs_where[:traversed])  # fn might modify value or format, which can't be told
+                self.record_set(changed)  # Only values are recorded
+        self.check_moved_keys(moved)
         return len(row_idxs_where)
 
     def format(self, formatter, where=None, select=None):
@@ -288,6 +1372,19 @@ class Celltable:
         """
         return len(self.rows)
 
+    def get_row(self, row_idx, select=None):
+        """
+        Get values of a single row, looked up directly without matching conditions
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param select: Column names to get, all columns if None
+        :type select: list
+        :return: dict of values corresponding to the column id, including row_idx. None if row not exists
+        :rtype: dict
+        """
+        return self.row_values(row_idx, select=select) if row_idx in self.rows else None
+
     def __getitem__(self, row_idx):
         """
         Get rows with row index
@@ -295,6 +1392,8 @@ class Celltable:
         :param row_idx: Row index or callable
         :return: Rows
         """
+        if isinstance(row_idx, int):  # Looked up directly
+            return [self.row_values(row_idx)] if row_idx in self.rows else []
         return self.query({DAO.COL_ROW_IDX: row_idx})
 
     def __setitem__(self, row_idx, value):
@@ -305,7 +1404,9 @@ class Celltable:
         :param row_idx: Row index or callable
         :raise UserWarning: When row_idx is callable and row_idx is not exists
         """
-        if row_idx in self:
+        if isinstance(row_idx, int) and row_idx in self.rows:
+            self.update_many([(row_idx, value)])
+        elif row_idx in self:
             self.update(value, {DAO.COL_ROW_IDX: row_idx})
         elif not callable(row_idx):
             self.insert(value)
@@ -330,4 +1431,320 @@ class Celltable:
         :return: If row exist
         :rtype: bool
         """
+        if isinstance(row_idx, int):
+            return row_idx in self.rows
         return len(self.row_and_col_where(where={DAO.COL_ROW_IDX: row_idx})) > 0
+
+
+class ColumnarCelltable(Celltable):
+    """
+    Celltable that store values in :class:`Column` per column, instead of holding every :class:`openpyxl.cell.Cell`.
+    Cells are only created in worksheet on demand by traverse/format, or by flush before saving,
+    which means only values & formats applied through Celltable are saved.
+    Rows are always continuous, so value of row is located with row_idx - 2 (-1 for col_id -1 for 0 indexed list).
+    """
+    def __init__(self, worksheet, source=None, columns=None):
+        """
+        :param worksheet: Worksheet to create cells on demand
+        :type worksheet: openpyxl.worksheet.Worksheet
+        :param source: Worksheet to read values from, read from worksheet if None
+        :type source: openpyxl.worksheet.ReadOnlyWorksheet
+        :param columns: Columns already read instead of reading from worksheet, see read_columns
+        :type columns: tuple
+        """
+        self.worksheet = worksheet
+        read_from_worksheet = source is None and columns is None
+        if columns is None:
+            columns = read_columns(worksheet if source is None else source)
+        self.col_idxs, self.cols, row_count = columns
+        self.rows = range(2, row_count + 2)  # +2 as row_idx starts from 2
+        self._init_state()
+        if not read_from_worksheet:  # Worksheet is created empty to hold cells on demand
+            for col_name, col_idx in self.col_idxs.items():
+                worksheet.cell(row=1, column=col_idx, value=col_name)
+
+    def columns(self):
+        """
+        :return: Columns of Celltable that can be passed to constructor, see read_columns
+        :rtype: tuple
+        """
+        return self.col_idxs, self.cols, len(self.rows)
+
+    def value(self, row_idx, col_name):
+        return self.cols[col_name][row_idx - 2]
+
+    def col_values(self, col_name):
+        return zip(self.rows, self.cols[col_name])
+
+    def row_values(self, row_idx, select=None):
+        values = {DAO.COL_ROW_IDX: row_idx}
+        pos = row_idx - 2
+        if select is not None:
+            for col_name in select:
+                values[col_name] = self.cols[col_name][pos]
+            return values
+        for key, col in self.cols.items():
+            values[key] = col[pos]
+        return values
+
+    def typed_col(self, col_name):
+        col = self.cols[col_name]
+        return col if col.is_typed() else None
+
+    def col_array(self, col_name):
+        return self.cols[col_name].to_numpy()
+
+    def set_value(self, row_idx, col_name, value):
+        self.cols[col_name][row_idx - 2] = value
+
+    def cell(self, row_idx, col_name):
+        """
+        Get cell from worksheet with latest value, cell is created if not exist
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param col_name: Name of column
+        :type col_name: str
+        :return: Cell
+        :rtype: openpyxl.cell.Cell
+        """
+        cell = self.worksheet.cell(row=row_idx, column=self.col_idxs[col_name])
+        cell.value = self.value(row_idx, col_name)
+        return cell
+
+    def insert_many(self, values_in_dicts):
+        values_in_dicts = self.check_keys(values_in_dicts)
+        # Raise KeyError of any row before any column changed, so a failing batch inserts nothing
+        rows_values = [[value_in_dict[col_name] for col_name in self.cols] for value_in_dict in values_in_dicts]
+        new_row_idxs = []
+        for values in rows_values:
+            for col, value in zip(self.cols.values(), values):
+                col.append(value)
+            new_row_idx = self.rows.stop
+            self.rows = range(2, new_row_idx + 1)
+            self.index_row(new_row_idx)
+            new_row_idxs.append(new_row_idx)
+        if new_row_idxs:
+            self.mark_dirty(new_row_idxs)
+            self.record_insert(new_row_idxs)
+        return new_row_idxs
+
+    def delete(self, where=None):
+        row_idxs_where = self.row_and_col_where(where)
+        affected_row_count = len(row_idxs_where)
+        if affected_row_count == 0:
+            return 0
+        deleted_rows = [self.row_values(row_idx) for row_idx in row_idxs_where] if self.undo_log is not None else None
+        row_idxs_to_delete = set(row_idxs_where)
+        first_popped_row_idx = row_idxs_where[0]
+        row_idxs_to_shift = range(first_popped_row_idx, self.rows.stop)
+        for row_idx in row_idxs_to_shift:
+            self.unindex_row(row_idx)
+        self.mark_dirty(row_idxs_to_shift)
+        row_idxs_remain = [row_idx for row_idx in row_idxs_to_shift if row_idx not in row_idxs_to_delete]
+        # Columns are ordered by row, so only the tail after first popped row is replaced
+        for col in self.cols.values():
+            values = [col[row_idx - 2] for row_idx in row_idxs_remain]
+            del col[first_popped_row_idx - 2:]
+            col.extend(values)
+        deleted_cells = self.shift_cells(row_idxs_to_shift, row_idxs_to_delete, self.col_idxs.values())
+        self.rows = range(2, self.rows.stop - affected_row_count)
+        for row_idx in range(first_popped_row_idx, self.rows.stop):
+            self.index_row(row_idx)
+        self.record_delete(row_idxs_where, deleted_rows, deleted_cells if self.undo_log is not None else None)
+        return affected_row_count
+
+    def restore(self, row_idxs, rows, cells=None):
+        first_row_idx = row_idxs[0]
+        for row_idx in range(first_row_idx, self.rows.stop):
+            self.unindex_row(row_idx)
+        row_idxs_to_shift = range(first_row_idx, self.rows.stop + len(row_idxs))
+        self.mark_dirty(row_idxs_to_shift)
+        deleted = dict(zip(row_idxs, rows))
+        # Columns are ordered by row, so only the tail after first row put back is replaced
+        for col_name, col in self.cols.items():
+            remaining = iter(col[first_row_idx - 2:])
+            values = [deleted[row_idx][col_name] if row_idx in deleted else next(remaining)
+                      for row_idx in row_idxs_to_shift]
+            del col[first_row_idx - 2:]
+            col.extend(values)
+        self.unshift_cells(row_idxs_to_shift, set(row_idxs), self.col_idxs.values(), cells)
+        self.rows = range(2, row_idxs_to_shift.stop)
+        for row_idx in row_idxs_to_shift:
+            self.index_row(row_idx)
+        self.record_restore(row_idxs, rows)
+
+    def traverse(self, fn, where=None, select=None):
+        if callable(fn) is False:
+            raise TypeError("Expected callable for argument fn(cell)")
+        row_idxs_where = self.row_idxs_where(where)
+        col_names = [col_name for col_name in self.cols if select is None or col_name in select]
+        changed = [] if self.recording() else None
+        moved = []
+        traversed = 0  # Number of rows fn reached, which are recorded even if fn raises
+        try:
+            for row_idx in row_idxs_where:
+                traversed += 1
+                row_keys = self.row_keys(row_idx, col_names) if self.key_indexes else None
+                try:
+                    for col_name in col_names:
+                        cell = self.cell(row_idx, col_name)
+                        orig_value = cell.value
+                        try:
+                            fn(cell)  # Expect callable to modify cell
+                        finally:  # Cell might be modified before fn raises
+                            if cell.value != orig_value:
+                                index = self.indexes.get(col_name)
+                                if index is not None:
+                                    index.remove(orig_value, row_idx)
+                                    index.add(cell.value, row_idx)
+                                self.cols[col_name][row_idx - 2] = cell.value
+                                if changed is not None:
+                                    changed.append((row_idx, col_name, cell.value, orig_value))
+                finally:
+                    if row_keys:
+                        moved.extend(self.reindex_keys(row_idx, row_keys))
+        finally:
+            if traversed:
+                self.mark_dirty(row_idxs_where[:traversed])  # fn might modify value or format, which can't be told
+                self.record_set(changed)  # Only values are recorded
+        self.check_moved_keys(moved)
+        return len(row_idxs_where)
+
+    def flush(self):
+        """
+        Write values to cells of worksheet, cells are created if not exist. Call before saving worksheet.
+        """
+        for col_name, col_idx in self.col_idxs.items():
+            for row_idx, value in zip(self.rows, self.cols[col_name]):
+                self.worksheet.cell(row=row_idx, column=col_idx).value = value
+
+    def release(self):
+        """
+        Remove cells without style from worksheet, as values are kept in columns. Call after saving worksheet.
+        """
+        cells = self.worksheet._cells
+        for coordinate in [coordinate for coordinate, cell in cells.items()
+                           if coordinate[0] > 1 and not cell.has_style]:
+            del cells[coordinate]
+
+
+class ReadOnlyCelltable(ColumnarCelltable):
+    """
+    Celltable that only store values of :class:`openpyxl.worksheet.ReadOnlyWorksheet` in :class:`Column`.
+
+    Any attempt to modify will raise AssertionError.
+    """
+    def assert_writable(self):
+        """
+        :raise AssertionError: Always, as Celltable is read-only
+        """
+        raise AssertionError("Celltable '%s' is read-only, load without read_only to modify" % self.worksheet.title)
+
+    def insert_many(self, values_in_dicts):
+        self.assert_writable()
+
+    def update_many(self, updates):
+        self.assert_writable()
+
+    def delete(self, where=None):
+        self.assert_writable()
+
+    def restore(self, row_idxs, rows, cells=None):
+        self.assert_writable()
+
+    def traverse(self, fn, where=None, select=None):
+        self.assert_writable()
+
+
+class Celltables(MutableMapping):
+    """
+    dict of :class:`Celltable` by worksheet name, where Celltable can be deferred to build on first access.
+    Membership & length are answered from worksheet names, without building any Celltable.
+    """
+    def __init__(self):
+        self.celltables = {}
+        self.pending = collections.OrderedDict()  # Worksheet name to callable that build Celltable
+        self.journal = None  # Journal assigned to every Celltable, see set_journal
+        self.undo_log = None  # Undo log assigned to every Celltable, see set_undo_log
+        self.build_lock = threading.Lock()  # Celltable is built once when accessed by threads at the same time
+
+    def defer(self, worksheet_name, build):
+        """
+        Defer building of Celltable until it is accessed
+
+        :param worksheet_name: Name of worksheet
+        :type worksheet_name: str
+        :param build: Callable that return Celltable
+        """
+        self.celltables.pop(worksheet_name, None)
+        self.pending[worksheet_name] = build
+
+    def set_journal(self, journal):
+        """
+        Record modifications of every Celltable, including those built later, to journal
+
+        :param journal: Journal to record to, stop recording if None
+        :type journal: cellbase.journal.Journal
+        """
+        self.journal = journal
+        for celltable in self.celltables.values():
+            celltable.journal = journal
+
+    def set_undo_log(self, undo_log):
+        """
+        Log how to undo modifications of every Celltable, including those built later, see Cellbase.transaction
+
+        :param undo_log: List to append to, stop logging if None
+        :type undo_log: list
+        """
+        self.undo_log = undo_log
+        for celltable in self.celltables.values():
+            celltable.undo_log = undo_log
+
+    def is_built(self, worksheet_name):
+        """
+        Check if Celltable is built
+
+        :param worksheet_name: Name of worksheet
+        :type worksheet_name: str
+        :return: If Celltable is built
+        :rtype: bool
+        """
+        return worksheet_name in self.celltables
+
+    def built(self):
+        """
+        :return: dict of Celltable built by worksheet name, which are the only Celltables that can be modified
+        :rtype: dict
+        """
+        return dict(self.celltables)
+
+    def __getitem__(self, worksheet_name):
+        if worksheet_name in self.pending:
+            with self.build_lock:
+                if worksheet_name in self.pending:
+                    self[worksheet_name] = self.pending[worksheet_name]()
+        return self.celltables[worksheet_name]
+
+    def __setitem__(self, worksheet_name, celltable):
+        celltable.journal = self.journal
+        celltable.undo_log = self.undo_log
+        self.celltables[worksheet_name] = celltable
+        self.pending.pop(worksheet_name, None)  # After built, so worksheet is always found in one or the other
+
+    def __delitem__(self, worksheet_name):
+        if worksheet_name in self.pending:
+            del self.pending[worksheet_name]
+        else:
+            del self.celltables[worksheet_name]
+
+    def __iter__(self):
+        # Names are copied, as Celltable moves from pending to built when accessed while iterating, see __getitem__
+        yield from list(self.celltables) + list(self.pending)
+
+    def __len__(self):
+        return len(self.celltables) + len(self.pending)
+
+    def __contains__(self, worksheet_name):
+        return worksheet_name in self.celltables or worksheet_name in self.pending
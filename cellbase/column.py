@@ -0,0 +1,162 @@
+import sys
+from array import array
+from collections.abc import MutableSequence
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, only required for vectorized evaluation
+    numpy = None
+
+NULL = float('nan')  # Excel has no NaN, so it is safe to mark empty cell in typed array
+MAX_EXACT_INT = 2 ** 53  # Integer beyond this can't be stored in double without losing precision
+
+
+def number(value):
+    """
+    Kind of column mixing int & float, which read whole value back as int as openpyxl does when workbook reloaded
+
+    :param value: Value stored in typed array
+    :type value: float
+    :return: int if value is whole, else float
+    """
+    return int(value) if value.is_integer() else value
+
+
+def fits(kind, value):
+    """
+    Check if value can be stored in typed array of kind
+
+    :param kind: int, float or number
+    :param value: Value to check
+    :return: If value fits
+    :rtype: bool
+    """
+    if value is None:
+        return True
+    if type(value) is float:
+        return kind is not int
+    if type(value) is int:  # bool is int but not exactly int
+        return kind is not float and -MAX_EXACT_INT <= value <= MAX_EXACT_INT
+    return False
+
+
+def kind_of(values):
+    """
+    Find the kind of typed array that able to store all values
+
+    :param values: Values to inspect
+    :return: int or float when all values are exactly the type or None, number when values mix int & float, else None
+    """
+    kind = None
+    for value in values:
+        if value is None:
+            continue
+        if kind is None:
+            if type(value) not in (int, float):
+                return None
+            kind = type(value)
+        if not fits(kind, value):
+            if not fits(number, value):
+                return None
+            kind = number
+    return kind
+
+
+def intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Column(MutableSequence):
+    """
+    Compact storage of values of column, which only cost 8 bytes per value for numeric column.
+
+    When all values are int or float(None allowed), values are stored in typed array of double where None is marked as
+    NaN, else values are stored in list where strings are interned so repeated strings are stored once.
+    Column mixing int & float reads whole value back as int, see number.
+    Column falls back to list once a value that doesn't fit the typed array is assigned.
+    """
+    def __init__(self, values=()):
+        values = values if isinstance(values, list) else list(values)
+        self.kind = kind_of(values)
+        if self.kind is None:
+            self.values = [intern(value) for value in values]
+        else:
+            self.values = array('d', [NULL if value is None else value for value in values])
+
+    def is_typed(self):
+        """
+        :return: If values are stored in typed array
+        :rtype: bool
+        """
+        return self.kind is not None
+
+    def to_list(self):
+        """
+        Fall back to store values in list
+        """
+        if self.kind is not None:
+            self.values = list(iter(self))
+            self.kind = None
+
+    def to_numpy(self):
+        """
+        View values of typed array as NumPy array without copying, where None is NaN.
+        Don't keep the view, as typed array can't be resized while it is viewed.
+
+        :return: NumPy array, or None if values are not stored in typed array or NumPy is not installed
+        :rtype: numpy.ndarray
+        """
+        if self.kind is None or numpy is None:
+            return None
+        return numpy.frombuffer(self.values, dtype=numpy.float64)
+
+    def prepare(self, value):
+        """
+        Make sure value fits the storage before assigning, and convert value to the form to store
+
+        :param value: Value to assign
+        :return: Value to store
+        """
+        if not self.values and self.kind is None:  # Empty column, decide kind again
+            self.kind = kind_of([value])
+            self.values = [] if self.kind is None else array('d')
+        elif self.kind is not None and not fits(self.kind, value):
+            if fits(number, value):  # int assigned to float column or the other way round
+                self.kind = number
+            else:
+                self.to_list()
+        if self.kind is None:
+            return intern(value)
+        return NULL if value is None else value
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        value = self.values[pos]
+        if self.kind is None:
+            return value
+        return None if value != value else self.kind(value)  # NaN != NaN
+
+    def __setitem__(self, pos, value):
+        value = self.prepare(value)  # Might replace storage, so prepare before accessing values
+        self.values[pos] = value
+
+    def __delitem__(self, pos):
+        del self.values[pos]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        if self.kind is None:
+            return iter(self.values)
+        kind = self.kind
+        return (None if value != value else kind(value) for value in self.values)
+
+    def insert(self, pos, value):
+        value = self.prepare(value)
+        self.values.insert(pos, value)
+
+    def append(self, value):
+        value = self.prepare(value)
+        self.values.append(value)
@@ -28,12 +28,72 @@ class DAO:
         """
         pass
 
-    def query(self, where=None):
+    def create_index(self, col_name, ordered=False):
+        """
+        Create hash index on column, where equality conditions on the column will be served by the index.
+        When ordered is True, sorted index is created instead, which serves range predicates and order_by as well.
+
+        :param col_name: Name of column to index
+        :type col_name: str
+        :param ordered: Whether to create sorted index
+        :type ordered: bool
+        """
+        self.cellbase.create_index(self.worksheet_name(), col_name, ordered=ordered)
+
+    def drop_index(self, col_name):
+        """
+        Drop index on column
+
+        :param col_name: Name of indexed column
+        :type col_name: str
+        """
+        self.cellbase.drop_index(self.worksheet_name(), col_name)
+
+    def create_key_index(self, key, unique=False):
+        """
+        Create index on key of one or more columns, which upsert finds rows with
+
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :param unique: Whether to refuse insert of duplicate key
+        :type unique: bool
+        """
+        self.cellbase.create_key_index(self.worksheet_name(), key, unique=unique)
+
+    def drop_key_index(self, key):
+        """
+        Drop index on key
+
+        :param key: Column name or list of column names
+        :type key: str or list
+        """
+        self.cellbase.drop_key_index(self.worksheet_name(), key)
+
+    def explain(self, where=None):
+        """
+        Describe how conditions will be matched when querying, see Celltable.plan
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :return: Description of plan, one step per line
+        :rtype: str
+        """
+        return self.cellbase.explain(self.worksheet_name(), where)
+
+    def query(self, where=None, order_by=None, limit=None, offset=0, select=None):
         """
         Return data from Cellbase that match conditions, return all if no condition given.
 
         :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
         :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of rows to return, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :param select: Column names to read, all columns if None. Columns not selected are passed to entity as None
+        :type select: list
         :return:
             List of dict that store value corresponding to the column id.
             * row_idx is the default value to return, where it specifies the row index of returned data.
@@ -42,8 +102,97 @@ class DAO:
             For example, [{"row_idx": 2, "id": 1, "name": "jp1"}, {"row_idx": 3, "id": 2, "name": "jp2"}]
         :rtype: list
         """
-        return [self.new_entity().from_dict(value) for value in
-                self.cellbase.query(self.worksheet_name(), where=where)]
+        values_list = self.cellbase.query(self.worksheet_name(), where=where, order_by=order_by, limit=limit,
+                                          offset=offset, select=select)  # Served by query cache if any
+        return list(self.to_entities(values_list, select=select))
+
+    def iter_query(self, where=None, order_by=None, limit=None, offset=0, select=None):
+        """
+        Same as query, but yield entity of each row lazily instead of returning list. See Cellbase.iter_query.
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of rows to yield, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :param select: Column names to read, all columns if None. Columns not selected are passed to entity as None
+        :type select: list
+        :return: Iterator of Entity
+        """
+        values_iter = self.cellbase.iter_query(self.worksheet_name(), where=where, order_by=order_by, limit=limit,
+                                               offset=offset, select=select)
+        return self.to_entities(values_iter, select=select)
+
+    def to_entities(self, values_iter, select=None):
+        """
+        Parse rows queried into entities
+
+        :param values_iter: Iterable of dict of row
+        :param select: Column names queried, all columns if None
+        :type select: list
+        :return: Iterator of Entity
+        """
+        if select is not None:  # Fill columns not selected, so entity can be parsed as usual
+            empty_values = dict.fromkeys(self.celltable.cols)
+
+            def fill(values):
+                filled = dict(empty_values)
+                filled.update(values)
+                return filled
+            values_iter = map(fill, values_iter)
+        return (self.new_entity().from_dict(values) for values in values_iter)
+
+    def get_row(self, row_idx, select=None):
+        """
+        Get entity of a single row, looked up directly without matching conditions
+
+        :param row_idx: Row index
+        :type row_idx: int
+        :param select: Column names to read, all columns if None. Columns not selected are passed to entity as None
+        :type select: list
+        :return: Entity, or None if row not exists
+        :rtype: Entity
+        """
+        values = self.cellbase.get_row(self.worksheet_name(), row_idx, select=select)
+        return next(self.to_entities([values], select=select)) if values is not None else None
+
+    def query_values(self, col_name, where=None, order_by=None, limit=None, offset=0):
+        """
+        Return values of a single column that match conditions, without building entity for every row.
+
+        :param col_name: Name of column to return, or row_idx
+        :type col_name: str
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param order_by: Column name or list of column names, prefix with "-" for descending order. For example, "-id".
+            Rows are in order of row_idx if None
+        :param limit: Maximum number of values to return, all if None
+        :type limit: int
+        :param offset: Number of rows to skip
+        :type offset: int
+        :return: List of values. For example, [1, 2, 3]
+        :rtype: list
+        """
+        return self.cellbase.query_values(self.worksheet_name(), col_name, where=where, order_by=order_by, limit=limit,
+                                          offset=offset)
+
+    def aggregate(self, where=None, group_by=None, aggs=None):
+        """
+        Aggregate values of rows that match conditions, see Cellbase.aggregate
+
+        :param where: dict of columns id to inspect. For example, {'id': 1, 'name': 'jp'}.
+        :type where: dict
+        :param group_by: Column name or list of column names to group rows by, all rows as a single group if None
+        :type group_by: str or list
+        :param aggs: dict of column name to function or list of functions. For example, {'amount': 'sum', 'id': 'count'}
+        :type aggs: dict
+        :return: dict of aggregated values if group_by is None, else list of dict of group values & aggregated values
+        :rtype: dict or list
+        """
+        return self.cellbase.aggregate(self.worksheet_name(), where=where, group_by=group_by, aggs=aggs)
 
     def insert(self, entity):
         """
@@ -56,6 +205,22 @@ class DAO:
         entity.row_idx = self.cellbase.insert(self.worksheet_name(), entity.to_dict())
         return entity
 
+    def insert_many(self, entities):
+        """
+        Insert new rows of data with Entity objects in a single pass, after insertion, row_idx of every entity will be
+        updated as well.
+
+        :param entities: Entity objects to insert
+        :type entities: list
+        :return: Given Entity objects
+        :rtype: list
+        """
+        entities = list(entities)
+        row_idxs = self.cellbase.insert_many(self.worksheet_name(), [entity.to_dict() for entity in entities])
+        for entity, row_idx in zip(entities, row_idxs):
+            entity.row_idx = row_idx
+        return entities
+
     def update(self, entity, where=None):
         """
         Update row(s) of data where conditions match with Entity object
@@ -69,6 +234,45 @@ class DAO:
         """
         return self.cellbase.update(self.worksheet_name(), entity.to_dict(), where=where)
 
+    def update_many(self, entities):
+        """
+        Update rows of entities in a single pass, where each entity is updated to its own row_idx
+
+        :param entities: Iterable of Entity object with row_idx
+        :return: Number of rows updated
+        :rtype: int
+        """
+        return self.cellbase.update_many(self.worksheet_name(), ((None, entity.to_dict()) for entity in entities))
+
+    def upsert(self, entity, key):
+        """
+        Update rows holding the key of entity, or insert entity if no row holds the key, entity.row_idx will be updated
+
+        :param entity: Entity object to upsert
+        :type entity: Entity
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :return: Given Entity object
+        """
+        return self.upsert_many([entity], key)[0]
+
+    def upsert_many(self, entities, key):
+        """
+        Upsert entities in a single pass, row_idx of every entity will be updated as well
+
+        :param entities: Entity objects to upsert
+        :type entities: list
+        :param key: Column name or list of column names. For example, ['id']
+        :type key: str or list
+        :return: Given Entity objects
+        :rtype: list
+        """
+        entities = list(entities)
+        row_idxs = self.cellbase.upsert_many(self.worksheet_name(), [entity.to_dict() for entity in entities], key)
+        for entity, row_idx in zip(entities, row_idxs):
+            entity.row_idx = row_idx
+        return entities
+
     def delete(self, where=None):
         """
         Delete row(s) of data where conditions match
@@ -157,7 +361,8 @@ class DAO:
         """
         :return: Length of rows doesn't include header
         """
-        return len(self.celltable)
+        with self.cellbase.access(self.worksheet_name()) as celltable:
+            return len(celltable)
 
     def __getitem__(self, row_idx):
         """
@@ -169,7 +374,11 @@ class DAO:
             List of entities when row_idx is callable,
             else single entity object or None
         """
-        result = [self.new_entity().from_dict(value) for value in self.celltable[row_idx]]
+        if isinstance(row_idx, int):
+            return self.get_row(row_idx)
+        with self.cellbase.access(self.worksheet_name()) as celltable:
+            values_in_dicts = celltable[row_idx]
+        result = [self.new_entity().from_dict(value) for value in values_in_dicts]
         return result if callable(row_idx) else result[0] if result else None
 
     def __setitem__(self, row_idx, entity):
@@ -182,7 +391,8 @@ class DAO:
         :raise UserWarning: When row_idx is callable and row_idx is not exists
         :type entity: Entity
         """
-        self.celltable[row_idx] = entity.to_dict()
+        with self.cellbase.access(self.worksheet_name(), write=True) as celltable:
+            celltable[row_idx] = entity.to_dict()
 
     def __delitem__(self, row_idx):
         """
@@ -190,7 +400,8 @@ class DAO:
 
         :param row_idx: Row index or callable
         """
-        del self.celltable[row_idx]
+        with self.cellbase.access(self.worksheet_name(), write=True) as celltable:
+            del celltable[row_idx]
 
     def __contains__(self, row_idx):
         """
@@ -200,7 +411,8 @@ class DAO:
         :return: If row exists
         :rtype: bool
         """
-        return self.celltable[row_idx]
+        with self.cellbase.access(self.worksheet_name()) as celltable:
+            return row_idx in celltable
 
 
 class Entity(ABC):
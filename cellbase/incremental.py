@@ -0,0 +1,247 @@
+import copy
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from openpyxl.packaging.manifest import Manifest
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.xml.constants import ARC_CONTENT_TYPES, ARC_STYLE
+from openpyxl.reader.excel import _find_workbook_part
+from openpyxl.xml.functions import fromstring, tostring
+
+try:
+    from openpyxl.reader.workbook import WorkbookParser
+    from openpyxl.worksheet._writer import WorksheetWriter
+except ImportError:  # openpyxl before 2.6
+    from openpyxl.packaging.workbook import WorkbookParser
+    from openpyxl.writer.worksheet import write_worksheet as write_worksheet_xml
+    WorksheetWriter = None
+
+LOCAL_HEADER_SIZE = 30  # Size of fixed part of local file header in zip
+FLAG_DATA_DESCRIPTOR = 0x08  # CRC & sizes follow the data instead of local file header
+INLINE_STRING_CELL = re.compile(br'<c ([^>]*?)t="s"([^>]*)><v>-(\d+)</v></c>')  # Placeholder of InlineStrings
+
+
+def file_state(filename):
+    """
+    State of file to detect modification made outside Cellbase
+
+    :param filename: Path of file
+    :type filename: str
+    :return: tuple(mtime, size), or None if file doesn't exist
+    :rtype: tuple
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def worksheet_parts(archive):
+    """
+    Find the part of each worksheet in archive of workbook
+
+    :param archive: Archive of workbook
+    :type archive: zipfile.ZipFile
+    :return: dict of worksheet title to part name. For example, {'Simple': 'xl/worksheets/sheet1.xml'}
+    :rtype: dict
+    """
+    package = Manifest.from_tree(fromstring(archive.read(ARC_CONTENT_TYPES)))
+    parser = WorkbookParser(archive, _find_workbook_part(package).PartName[1:])
+    parser.parse()
+    return {sheet.name: rel.target for sheet, rel in parser.find_sheets()}
+
+
+class InlineStrings(object):
+    """
+    Stand-in of shared strings of workbook while worksheet serialised on its own, so the shared strings part of
+    source, which other worksheets refer to by index, is kept as it is.
+    Each string is given a negative placeholder index, which is then replaced with the string inline, see inline.
+    """
+
+    def __init__(self):
+        self.strings = []
+
+    def add(self, value):
+        self.strings.append(value)
+        return -len(self.strings)
+
+    def inline(self, xml):
+        """
+        Replace placeholder index of strings in XML of worksheet with inline strings
+
+        :param xml: XML of worksheet serialised with InlineStrings as shared strings
+        :type xml: bytes
+        :return: XML of worksheet, or None if not every placeholder replaced
+        :rtype: bytes
+        """
+        def replace(match):
+            text = escape(self.strings[int(match.group(3)) - 1]).encode("utf-8")
+            return (b'<c ' + match.group(1) + b't="inlineStr"' + match.group(2) +
+                    b'><is><t xml:space="preserve">' + text + b'</t></is></c>')
+
+        xml, count = INLINE_STRING_CELL.subn(replace, xml)
+        return xml if count == len(self.strings) else None
+
+
+def write_worksheet(worksheet):
+    """
+    Serialise worksheet to XML on its own, which is only possible when worksheet doesn't depend on other parts.
+    Strings are written inline instead of to shared strings, see InlineStrings.
+
+    :param worksheet: Worksheet to serialise
+    :type worksheet: openpyxl.worksheet.worksheet.Worksheet
+    :return: XML of worksheet, or None if worksheet has relationships(comments, hyperlinks, images, tables, etc.)
+    :rtype: bytes
+    """
+    if worksheet._images or worksheet._charts or worksheet._pivots or worksheet._tables:
+        return None
+    workbook = worksheet.parent
+    shared_strings = workbook.shared_strings
+    comments = list(worksheet._comments)
+    inline_strings = InlineStrings()
+    workbook.shared_strings = inline_strings
+    try:
+        if WorksheetWriter is not None:
+            writer = WorksheetWriter(worksheet, out=BytesIO())
+            writer.write()
+            rels = writer._rels
+            xml = writer.read()
+        else:
+            xml = write_worksheet_xml(worksheet)
+            rels = worksheet._rels
+        has_comments = len(worksheet._comments) != len(comments)
+    finally:
+        workbook.shared_strings = shared_strings
+        worksheet._comments = comments  # Collected while serialised by openpyxl before 2.6
+    if rels or has_comments or comments or worksheet.legacy_drawing is not None:
+        return None
+    return inline_strings.inline(xml)
+
+
+def write_styles(workbook):
+    """
+    :return: XML of styles of workbook
+    :rtype: bytes
+    """
+    return tostring(write_stylesheet(workbook))
+
+
+def copy_raw(source, target, info):
+    """
+    Copy compressed entry from source archive to target archive byte for byte, without decompressing
+
+    :param source: Archive to copy from
+    :type source: zipfile.ZipFile
+    :param target: Archive opened for writing to copy to
+    :type target: zipfile.ZipFile
+    :param info: Entry of source to copy
+    :type info: zipfile.ZipInfo
+    """
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.fp.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+    data = source.fp.read(info.compress_size)
+    target_info = copy.copy(info)
+    target_info.flag_bits &= ~FLAG_DATA_DESCRIPTOR  # CRC & sizes are known, write them in local file header
+    target_info.extra = b""
+    target_info.header_offset = target.fp.tell()
+    target.fp.write(target_info.FileHeader())
+    target.fp.write(data)
+    target.filelist.append(target_info)
+    target.NameToInfo[target_info.filename] = target_info
+    target.start_dir = target.fp.tell()
+
+
+def write_atomically(filename, write, mode_filename=None):
+    """
+    Write to temporary file then rename it to filename, so filename is never left half written
+
+    :param filename: Path to write to
+    :type filename: str
+    :param write: Callable that write to the given path
+    :param mode_filename: Path to copy permission from if filename doesn't exist, default permission if None
+    :type mode_filename: str
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], dir=dirname)
+    os.close(fd)
+    try:
+        mode_filename = filename if os.path.exists(filename) else mode_filename
+        if mode_filename is not None:
+            shutil.copymode(mode_filename, temp_filename)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_filename, 0o666 & ~umask)
+        write(temp_filename)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+def save_parts(source_filename, filename, parts):
+    """
+    Save archive of workbook with some parts replaced, the other parts are copied byte for byte.
+    Archive is written to temporary file then renamed, so filename is never left half written.
+
+    :param source_filename: Path of workbook to copy from
+    :type source_filename: str
+    :param filename: Path to save to, can be the same as source_filename
+    :type filename: str
+    :param parts: dict of part name to content to replace
+    :type parts: dict
+    """
+    def write(temp_filename):
+        with zipfile.ZipFile(source_filename) as source, \
+                zipfile.ZipFile(temp_filename, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename in parts:
+                    target.writestr(info.filename, parts[info.filename])
+                else:
+                    copy_raw(source, target, info)
+    write_atomically(filename, write, mode_filename=source_filename)
+
+
+def save_incrementally(workbook, worksheets, source_filename, filename, style_count):
+    """
+    Save workbook by serialising only the given worksheets, the other parts are copied from source byte for byte.
+    Styles are serialised as well if new styles are added, which only happens once cells are serialised.
+
+    :param workbook: Workbook to save, which must have the same worksheets as source
+    :type workbook: openpyxl.Workbook
+    :param worksheets: Worksheets modified since source saved
+    :type worksheets: list
+    :param source_filename: Path of workbook saved last time
+    :type source_filename: str
+    :param filename: Path to save to, can be the same as source_filename
+    :type filename: str
+    :param style_count: Number of cell styles when source saved
+    :type style_count: int
+    :return: If saved, False if workbook has to be saved as a whole
+    :rtype: bool
+    """
+    with zipfile.ZipFile(source_filename) as archive:
+        part_names = worksheet_parts(archive)
+        has_styles = ARC_STYLE in archive.NameToInfo
+    parts = {}
+    for worksheet in worksheets:
+        part_name = part_names.get(worksheet.title)
+        xml = write_worksheet(worksheet) if part_name is not None else None
+        if xml is None:
+            return False
+        parts[part_name] = xml
+    if len(workbook._cell_styles) != style_count:
+        if not has_styles:
+            return False
+        parts[ARC_STYLE] = write_styles(workbook)
+    save_parts(source_filename, filename, parts)
+    return True
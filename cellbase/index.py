@@ -0,0 +1,263 @@
+import bisect
+import datetime
+from itertools import groupby
+
+# Rank of types to sort values of different types, where values of same rank are comparable
+TYPE_RANKS = {
+    type(None): 0,
+    bool: 1, int: 1, float: 1,
+    str: 2,
+    datetime.datetime: 3,
+    datetime.date: 4,
+    datetime.time: 5,
+    datetime.timedelta: 6
+}
+UNKNOWN_RANK = len(set(TYPE_RANKS.values()))
+AFTER_ROW_IDXS = float('inf')  # Greater than any row index
+
+
+def sort_key(value):
+    """
+    Key to sort values of different types, where None comes first and then numbers, strings, datetimes, etc.
+
+    :param value: Value of cell
+    :return: Key that is comparable with key of any other value
+    :rtype: tuple
+    """
+    rank = TYPE_RANKS.get(type(value))
+    if rank is None:
+        return UNKNOWN_RANK, type(value).__name__, value
+    return (rank,) if rank == 0 else (rank, value)
+
+
+class HashIndex:
+    """
+    Index that map value of a column to the row indexes holding the value, for equality lookup in constant time
+    """
+    def __init__(self, col_name):
+        self.col_name = col_name
+        self.row_idxs = {}
+
+    def build(self, values):
+        """
+        Build index at once
+
+        :param values: Iterable of tuple(row_idx, value)
+        """
+        self.row_idxs.clear()
+        for row_idx, value in values:
+            self.add(value, row_idx)
+
+    def add(self, value, row_idx):
+        """
+        Add row index under value
+
+        :param value: Value of cell
+        :param row_idx: Row index of cell
+        :type row_idx: int
+        """
+        self.row_idxs.setdefault(value, set()).add(row_idx)
+
+    def remove(self, value, row_idx):
+        """
+        Remove row index from value, value will be removed as well once no row index left
+
+        :param value: Value of cell
+        :param row_idx: Row index of cell
+        :type row_idx: int
+        """
+        row_idxs = self.row_idxs.get(value)
+        if row_idxs is None:
+            return
+        row_idxs.discard(row_idx)
+        if not row_idxs:
+            del self.row_idxs[value]
+
+    def lookup(self, value):
+        """
+        Find row indexes holding value
+
+        :param value: Value to find
+        :return: Row indexes holding value
+        :rtype: set
+        """
+        return self.row_idxs.get(value, set())
+
+    def lookup_any(self, values):
+        """
+        Find row indexes holding any of the values
+
+        :param values: Values to find
+        :return: Row indexes holding any of the values
+        :rtype: set
+        """
+        if len(values) == 1:
+            return self.lookup(values[0])
+        row_idxs = set()
+        for value in values:
+            row_idxs |= self.lookup(value)
+        return row_idxs
+
+    def count(self, values):
+        """
+        Count row indexes holding any of the values without collecting them
+
+        :param values: Distinct values to count
+        :return: Number of row indexes
+        :rtype: int
+        """
+        return sum(len(self.row_idxs.get(value, ())) for value in values)
+
+    def clear(self):
+        self.row_idxs.clear()
+
+    def __len__(self):
+        """
+        :return: Number of distinct values
+        """
+        return len(self.row_idxs)
+
+    def __contains__(self, value):
+        return value in self.row_idxs
+
+
+class SortedIndex:
+    """
+    Index that keep row indexes sorted by value of a column, for range lookup and ordered iteration.
+    Row indexes of same value are sorted in ascending order.
+    """
+    def __init__(self, col_name):
+        self.col_name = col_name
+        self.keys = []  # Sorted list of tuple(sort_key(value), row_idx)
+
+    def build(self, values):
+        """
+        Build index at once, faster than adding values one by one
+
+        :param values: Iterable of tuple(row_idx, value)
+        """
+        self.keys = sorted((sort_key(value), row_idx) for row_idx, value in values)
+
+    def add(self, value, row_idx):
+        bisect.insort(self.keys, (sort_key(value), row_idx))
+
+    def remove(self, value, row_idx):
+        key = (sort_key(value), row_idx)
+        pos = bisect.bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            del self.keys[pos]
+
+    def lookup(self, value):
+        key = sort_key(value)
+        return set(self.between_keys((key,), (key, AFTER_ROW_IDXS)))
+
+    def lookup_any(self, values):
+        row_idxs = set()
+        for value in values:
+            row_idxs |= self.lookup(value)
+        return row_idxs
+
+    def count(self, values):
+        total = 0
+        for value in values:
+            key = sort_key(value)
+            total += self.count_keys((key,), (key, AFTER_ROW_IDXS))
+        return total
+
+    def between(self, low=None, high=None, include_low=True, include_high=True):
+        """
+        Find row indexes where value is within range, in order of value.
+        Only values of the same type as the bounds are included, for example, strings are never included when bounds
+        are numbers as they are not comparable.
+
+        :param low: Lower bound, no lower bound if None
+        :param high: Upper bound, no upper bound if None
+        :param include_low: Whether value equals to low is included
+        :type include_low: bool
+        :param include_high: Whether value equals to high is included
+        :type include_high: bool
+        :return: Row indexes
+        :rtype: list
+        """
+        keys = self.range_keys(low, high, include_low, include_high)
+        return self.between_keys(*keys) if keys is not None else []
+
+    def count_between(self, low=None, high=None, include_low=True, include_high=True):
+        """
+        Count row indexes where value is within range without collecting them, see between
+
+        :return: Number of row indexes
+        :rtype: int
+        """
+        keys = self.range_keys(low, high, include_low, include_high)
+        return self.count_keys(*keys) if keys is not None else 0
+
+    def range_keys(self, low, high, include_low, include_high):
+        """
+        Convert range of values to range of keys, see between
+
+        :return: tuple(low_key, high_key), or None if range is empty as bounds are not comparable
+        :rtype: tuple
+        """
+        rank = sort_key(low if low is not None else high)[0]
+        if low is not None and high is not None and sort_key(high)[0] != rank:
+            return None  # Values of different types are not comparable
+        if low is None:
+            low_key = ((rank,),)
+        else:
+            low_key = (sort_key(low),) if include_low else (sort_key(low), AFTER_ROW_IDXS)
+        if high is None:
+            high_key = ((rank + 1,),)
+        else:
+            high_key = (sort_key(high), AFTER_ROW_IDXS) if include_high else (sort_key(high),)
+        return low_key, high_key
+
+    def between_keys(self, low_key, high_key):
+        return [row_idx for _, row_idx in
+                self.keys[bisect.bisect_left(self.keys, low_key):bisect.bisect_left(self.keys, high_key)]]
+
+    def count_keys(self, low_key, high_key):
+        return max(0, bisect.bisect_left(self.keys, high_key) - bisect.bisect_left(self.keys, low_key))
+
+    def iter_row_idxs(self, reverse=False):
+        """
+        Iterate through row indexes in order of value,
+        row indexes of same value are always in ascending order even when reverse is True
+
+        :param reverse: Whether in descending order of value
+        :type reverse: bool
+        :return: Iterator of row indexes
+        """
+        if not reverse:
+            return (row_idx for _, row_idx in self.keys)
+        return (row_idx for _, keys in groupby(reversed(self.keys), key=lambda key: key[0])
+                for _, row_idx in reversed(list(keys)))
+
+    def clear(self):
+        self.keys.clear()
+
+    def __len__(self):
+        """
+        :return: Number of rows indexed
+        """
+        return len(self.keys)
+
+
+class KeyIndex(HashIndex):
+    """
+    Hash index on key of one or more columns, where key is the tuple of their values, to find rows by key in constant
+    time, see Celltable.upsert_many. When unique, insert or update of row to key held by another row is refused, see
+    Celltable.check_keys.
+    """
+    def __init__(self, col_names, unique=False):
+        super().__init__(tuple(col_names))
+        self.unique = unique
+
+    def key(self, values):
+        """
+        :param values: dict of values by column name
+        :type values: dict
+        :return: Key of values
+        :rtype: tuple
+        """
+        return tuple(values[col_name] for col_name in self.col_name)
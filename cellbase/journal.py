@@ -0,0 +1,195 @@
+import datetime
+import json
+import numbers
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+# Values that JSON can't represent, encoded as {tag: fields} which can't be confused with any cell value
+TEMPORAL_TYPES = (
+    ("$datetime", datetime.datetime, ("year", "month", "day", "hour", "minute", "second", "microsecond")),
+    ("$date", datetime.date, ("year", "month", "day")),
+    ("$time", datetime.time, ("hour", "minute", "second", "microsecond")),
+)
+TAG_TIMEDELTA = "$timedelta"
+
+
+def encode(value):
+    """
+    Encode value that JSON can't represent, see json.dumps
+
+    :param value: Cell value
+    :return: JSON serialisable value
+    :raise TypeError: When value can't be encoded
+    """
+    for tag, kind, fields in TEMPORAL_TYPES:  # datetime is date, so it must be checked first
+        if isinstance(value, kind):
+            return {tag: [getattr(value, field) for field in fields]}
+    if isinstance(value, datetime.timedelta):
+        return {TAG_TIMEDELTA: [value.days, value.seconds, value.microseconds]}
+    if isinstance(value, numbers.Integral):  # For example, numpy.int64
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    raise TypeError("Value of type %s can't be journaled: %r" % (type(value).__name__, value))
+
+
+def header(base):
+    """
+    :param base: State of workbook, see incremental.file_state
+    :return: First line of journal based on the state
+    :rtype: dict
+    """
+    return {"base": list(base) if base is not None else None}
+
+
+def decode(obj):
+    """
+    Decode value encoded by encode, see json.loads
+    """
+    if len(obj) == 1:
+        tag, fields = next(iter(obj.items()))
+        for temporal_tag, kind, _ in TEMPORAL_TYPES:
+            if tag == temporal_tag:
+                return kind(*fields)
+        if tag == TAG_TIMEDELTA:
+            return datetime.timedelta(*fields)
+    return obj
+
+
+class Journal:
+    """
+    Append-only journal of modifications made since workbook saved, so they survive a crash without saving.
+
+    Journal is a JSON lines file, where the 1st line records the state of workbook it is based on, see
+    incremental.file_state, and each following line records a modification by worksheet name. For example::
+
+        {"base": [1539661200000000000, 5213]}
+        {"op": "insert", "ws": "Simple", "cols": ["id", "name"], "rows": [[1, "jp1"]]}
+        {"op": "set", "ws": "Simple", "cells": [[2, "name", "jp"]]}
+        {"op": "delete", "ws": "Simple", "row_idxs": [2]}
+
+    Modifications are recorded as their resulting values instead of conditions, so replaying them always has the same
+    outcome. Records are read back only if workbook is still in the state it is based on, as workbook saved after the
+    journal had already included the modifications.
+    """
+    def __init__(self, filename, fsync=0):
+        """
+        :param filename: Path of journal
+        :type filename: str
+        :param fsync:
+            Minimum seconds between flushing journal to disk, where 0 flush after every record. Records are always
+            written to OS, so they survive crash of process, but might be lost to power failure within the interval.
+            Never flush to disk if None
+        :type fsync: float
+        """
+        self.filename = filename
+        self.fsync = fsync
+        self.file = None
+        self.synced_at = 0
+        self.lock = threading.Lock()  # Journal is reset by background saving, see Cellbase.save_async
+
+    def read(self, base):
+        """
+        Read records of journal based on given state of workbook.
+        Incomplete last line, which is left by crash while writing, is ignored.
+
+        :param base: Current state of workbook, see incremental.file_state
+        :return: List of records, empty if journal doesn't exist or is based on other state
+        :rtype: list
+        """
+        if not os.path.exists(self.filename):
+            return []
+        with open(self.filename, encoding="utf-8") as file:
+            lines = file.read().split("\n")
+        if not lines[0] or json.loads(lines[0]) != header(base):
+            if len(lines) > 2:
+                warnings.warn("%s is ignored as workbook is saved after it, modifications recorded are expected to be "
+                              "saved as well" % self.filename, UserWarning)
+            return []
+        return [json.loads(line, object_hook=decode) for line in lines[1:-1]]  # Last is empty or incomplete
+
+    def open(self, base):
+        """
+        Open journal to append records, journal is started over if it is based on other state of workbook
+
+        :param base: Current state of workbook, see incremental.file_state
+        """
+        first_line = ""
+        if os.path.exists(self.filename):
+            with open(self.filename, encoding="utf-8") as file:
+                first_line = file.readline()
+        if not first_line or json.loads(first_line) != header(base):
+            self.reset(base)
+            return
+        with open(self.filename, "rb") as file:
+            content = file.read()
+        os.truncate(self.filename, content.rfind(b"\n") + 1)  # So records appended start on a new line
+        self.file = open(self.filename, "ab")
+
+    def record(self, op, worksheet_name, **fields):
+        """
+        Append record of modification
+
+        :param op: Kind of modification, see Cellbase.replay
+        :type op: str
+        :param worksheet_name: Name of worksheet modified
+        :type worksheet_name: str
+        :param fields: Details of modification
+        """
+        record = {"op": op, "ws": worksheet_name}
+        record.update(fields)
+        line = json.dumps(record, default=encode, ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            self.file.write(line.encode("utf-8") + b"\n")
+            self.file.flush()
+            if self.fsync is not None and time.monotonic() - self.synced_at >= self.fsync:
+                os.fsync(self.file.fileno())
+                self.synced_at = time.monotonic()
+
+    def position(self):
+        """
+        :return: Offset of next record, which can be kept through reset
+        :rtype: int
+        """
+        with self.lock:
+            self.file.flush()
+            return self.file.tell()
+
+    def reset(self, base, start=None):
+        """
+        Start over journal based on given state of workbook, called after workbook saved.
+        Journal is written to temporary file then renamed, so crash never leaves journal without header.
+
+        :param base: State of workbook saved, see incremental.file_state
+        :param start: Offset of records to keep, see position. Keep nothing if None
+        :type start: int
+        """
+        with self.lock:
+            tail = b""
+            if start is not None and self.file is not None:
+                self.file.flush()
+                with open(self.filename, "rb") as file:
+                    file.seek(start)
+                    tail = file.read()
+            if self.file is not None:
+                self.file.close()
+            fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)))
+            with os.fdopen(fd, "wb") as file:
+                file.write(json.dumps(header(base)).encode("utf-8") + b"\n" + tail)
+                file.flush()
+                if self.fsync is not None:
+                    os.fsync(file.fileno())
+            os.replace(temp_filename, self.filename)
+            self.file = open(self.filename, "ab")
+
+    def close(self):
+        """
+        Close journal file, journal is kept to be replayed when workbook loaded again
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,79 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    Reader/writer lock, where any number of readers or a single writer hold the lock at a time.
+    Waiting writer blocks new readers, so writers are not starved by continuous reads.
+
+    Writer can acquire the lock again for read or write, for example, worksheet dropped while replaying journal on
+    load, but reader can't, and upgrading from read to write deadlocks.
+    """
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0  # Number of readers holding the lock
+        self.writer = None  # Identity of thread holding the lock for write
+        self.depth = 0  # Number of times writer acquired the lock again
+        self.writers_waiting = 0
+
+    def acquire_read(self):
+        with self.condition:
+            if self.writer == threading.get_ident():
+                self.depth += 1
+                return
+            while self.writer is not None or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            if self.writer == threading.get_ident():
+                self.depth -= 1
+                return
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            if self.writer == threading.get_ident():
+                self.depth += 1
+                return
+            self.writers_waiting += 1
+            try:
+                while self.writer is not None or self.readers:
+                    self.condition.wait()
+            finally:
+                self.writers_waiting -= 1
+            self.writer = threading.get_ident()
+
+    def release_write(self):
+        with self.condition:
+            if self.depth:
+                self.depth -= 1
+                return
+            self.writer = None
+            self.condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """
+        Hold the lock shared with other readers
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """
+        Hold the lock exclusively
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
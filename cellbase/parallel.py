@@ -0,0 +1,46 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import load_workbook
+
+from cellbase.celltable import read_columns
+
+
+def read_worksheet(filename, title):
+    """
+    Read columns of a single worksheet, called in worker process
+
+    :param filename: Path of workbook
+    :type filename: str
+    :param title: Title of worksheet to read
+    :type title: str
+    :return: Columns of worksheet, see read_columns
+    :rtype: tuple
+    """
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        return read_columns(workbook[title])
+    finally:
+        workbook.close()
+
+
+def read_worksheets(filename, titles, workers):
+    """
+    Read columns of worksheets in parallel processes, where each process streams XML of its worksheet from workbook
+    on its own, and sends back columns which are pickled compactly, see Column
+
+    :param filename: Path of workbook
+    :type filename: str
+    :param titles: Titles of worksheets to read
+    :type titles: list
+    :param workers: Maximum number of processes, which is limited to number of CPUs
+    :type workers: int
+    :return: Columns of each worksheet, in order of titles
+    :rtype: list
+    """
+    workers = min(workers, len(titles), os.cpu_count() or 1)
+    if workers <= 1:  # Nothing to gain from starting process
+        return [read_worksheet(filename, title) for title in titles]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read_worksheet, filename, title) for title in titles]
+        return [future.result() for future in futures]
@@ -0,0 +1,87 @@
+from collections import namedtuple
+
+from cellbase.predicate import Predicate, Ne, is_number, equal_values
+
+# Methods to match condition, where all but SCAN match the whole column at once
+ROW_IDX = "row_idx"
+INDEX = "index"
+RANGE = "range"
+NUMPY = "numpy"
+SCAN = "scan"
+AT_ONCE = (ROW_IDX, INDEX, RANGE, NUMPY)
+
+# Guessed fraction of rows matched when statistics can't tell
+EQUALITY_SELECTIVITY = 0.1
+RANGE_SELECTIVITY = 0.3
+CALLABLE_SELECTIVITY = 0.5
+# Roughly how many times faster NumPy evaluates a value than Python does
+NUMPY_SPEEDUP = 50
+
+
+class PlanStep(namedtuple("PlanStep", ["col_name", "cond", "method", "estimate"])):
+    """
+    Step of query plan, which match a single condition with method, and estimated to match estimate rows
+    """
+    __slots__ = ()
+
+    def is_at_once(self):
+        """
+        :return: If condition is matched at once instead of inspecting rows one by one
+        :rtype: bool
+        """
+        return self.method in AT_ONCE
+
+    def __str__(self):
+        if isinstance(self.cond, Predicate):
+            cond = repr(self.cond)
+        elif callable(self.cond):
+            cond = getattr(self.cond, "__name__", type(self.cond).__name__)
+        else:
+            cond = "== %r" % (self.cond,)
+        return "%s %s %s (~%d rows)" % (self.method, self.col_name, cond, self.estimate)
+
+
+def estimate_rows(cond, stats):
+    """
+    Estimate number of rows that condition match with statistics of column
+
+    :param cond: Condition of column
+    :param stats: Statistics of column, see Celltable.col_stats
+    :type stats: dict
+    :return: Estimated number of rows
+    :rtype: int
+    """
+    distinct = stats["distinct"]
+    values = equal_values(cond)
+    if values is not None:
+        fraction = len(values) / distinct if distinct else EQUALITY_SELECTIVITY * len(values)
+    elif isinstance(cond, Ne):
+        fraction = 1 - (1 / distinct if distinct else EQUALITY_SELECTIVITY)
+    elif isinstance(cond, Predicate) and cond.bounds() is not None:
+        fraction = range_fraction(cond.bounds(), stats["min"], stats["max"])
+    else:
+        fraction = CALLABLE_SELECTIVITY
+    return int(round(min(fraction, 1) * stats["rows"]))
+
+
+def range_fraction(bounds, min_value, max_value):
+    """
+    Estimate fraction of rows within range, assuming numbers are evenly distributed between min & max
+
+    :param bounds: tuple(low, high, include_low, include_high), see Predicate.bounds
+    :param min_value: Minimum value of column
+    :param max_value: Maximum value of column
+    :return: Fraction of rows
+    :rtype: float
+    """
+    low, high = bounds[:2]
+    values = [value for value in (low, high, min_value, max_value) if value is not None]
+    if min_value is None or not all(is_number(value) for value in values):
+        return RANGE_SELECTIVITY
+    low = min_value if low is None else max(low, min_value)
+    high = max_value if high is None else min(high, max_value)
+    if high < low:
+        return 0
+    if max_value == min_value:
+        return 1
+    return (high - low) / (max_value - min_value)
@@ -0,0 +1,183 @@
+import operator
+from abc import ABC, abstractmethod
+from collections.abc import Hashable
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, predicates are evaluated value by value without it
+    numpy = None
+
+
+def is_number(value):
+    return type(value) in (int, float)
+
+
+def equal_values(cond):
+    """
+    Get values that condition is looking for by equality, so the condition can be served by index
+
+    :param cond: Condition of column
+    :return: Tuple of values, or None if condition is not equality or values are not hashable
+    :rtype: tuple
+    """
+    if isinstance(cond, In):
+        return cond.values if cond.value_set is not None else None
+    if isinstance(cond, Eq):
+        cond = cond.value
+    if callable(cond) or not isinstance(cond, Hashable):
+        return None
+    return cond,
+
+
+class Predicate(ABC):
+    """
+    Condition of column that can be evaluated against the whole column at once with NumPy, for example,
+    {'amount': Gt(100), 'region': In(['EU', 'US'])}.
+
+    Predicate is callable just like lambda, so it works everywhere a callable condition works, and it is evaluated
+    value by value when column is not numeric or NumPy is not installed.
+    """
+    @abstractmethod
+    def __call__(self, value):
+        """
+        Evaluate single value
+
+        :param value: Value of cell
+        :return: If value matches
+        :rtype: bool
+        """
+        pass
+
+    def mask(self, values):
+        """
+        Evaluate values of numeric column with NumPy, where empty cell is NaN
+
+        :param values: Values of column
+        :type values: numpy.ndarray
+        :return: Boolean array of matches, or None if predicate can't be evaluated with NumPy
+        :rtype: numpy.ndarray
+        """
+        return None
+
+    def bounds(self):
+        """
+        Range of values that predicate matches, so predicate can be served by sorted index
+
+        :return: tuple(low, high, include_low, include_high), where low/high is None when unbounded,
+            or None if predicate is not a range
+        :rtype: tuple
+        """
+        return None
+
+
+class Compare(Predicate):
+    """
+    Compare value with operator, where incomparable value(e.g. None > 1) never matches
+    """
+    op = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, value):
+        try:
+            return self.op(value, self.value)
+        except TypeError:
+            return False
+
+    def mask(self, values):
+        if self.value is None and self.op in (operator.eq, operator.ne):
+            return self.op(numpy.isnan(values), True)
+        if not is_number(self.value):
+            return None
+        return self.op(values, self.value)
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.value)
+
+
+class Eq(Compare):
+    op = operator.eq
+
+
+class Ne(Compare):
+    op = operator.ne
+
+
+class Gt(Compare):
+    op = operator.gt
+
+    def bounds(self):
+        return None if self.value is None else (self.value, None, False, True)
+
+
+class Ge(Compare):
+    op = operator.ge
+
+    def bounds(self):
+        return None if self.value is None else (self.value, None, True, True)
+
+
+class Lt(Compare):
+    op = operator.lt
+
+    def bounds(self):
+        return None if self.value is None else (None, self.value, True, False)
+
+
+class Le(Compare):
+    op = operator.le
+
+    def bounds(self):
+        return None if self.value is None else (None, self.value, True, True)
+
+
+class Between(Predicate):
+    """
+    Match value where low <= value <= high
+    """
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __call__(self, value):
+        try:
+            return self.low <= value <= self.high
+        except TypeError:
+            return False
+
+    def mask(self, values):
+        if not is_number(self.low) or not is_number(self.high):
+            return None
+        return (values >= self.low) & (values <= self.high)
+
+    def bounds(self):
+        if self.low is None or self.high is None:
+            return None
+        return self.low, self.high, True, True
+
+    def __repr__(self):
+        return "Between(%r, %r)" % (self.low, self.high)
+
+
+class In(Predicate):
+    """
+    Match value that equals to any of the values
+    """
+    def __init__(self, values):
+        self.values = tuple(values)
+        self.value_set = set(self.values) if all(isinstance(value, Hashable) for value in self.values) else None
+
+    def __call__(self, value):
+        if self.value_set is not None:
+            return value in self.value_set
+        return value in self.values
+
+    def mask(self, values):
+        mask = numpy.isin(values, [value for value in self.values if is_number(value)])
+        if None in self.values:
+            mask |= numpy.isnan(values)
+        return mask
+
+    def __repr__(self):
+        return "In(%r)" % (list(self.values),)
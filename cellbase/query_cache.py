@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from cellbase.predicate import equal_values
+
+
+def canonical_where(where):
+    """
+    Canonicalise conditions into hashable key, where conditions that match the same rows have the same key,
+    for example, {'id': 1, 'name': 'jp'} and {'name': Eq('jp'), 'id': In([1])}
+
+    :param where: dict of columns id to inspect
+    :type where: dict
+    :return: Hashable key, or None if any condition is not equality(plain value, Eq or In) of hashable values
+    :rtype: frozenset
+    """
+    conds = []
+    for col_name, cond in where.items():
+        values = equal_values(cond)
+        if values is None:
+            return None
+        conds.append((col_name, frozenset(values)))
+    return frozenset(conds)
+
+
+class QueryCache:
+    """
+    LRU cache of query results, keyed by worksheet name and canonical conditions, see canonical_where.
+
+    Result is only returned while Celltable is the same one and not modified since cached, as every modification
+    bumps Celltable.version, so modified Celltable never serves stale result without any invalidation by hand.
+    Rows are copied in and out, so rows returned can be modified freely.
+    """
+    def __init__(self, maxsize):
+        """
+        :param maxsize: Maximum number of results to keep, least recently used result is evicted beyond
+        :type maxsize: int
+        """
+        self.maxsize = maxsize
+        self.results = OrderedDict()  # Key to tuple(Celltable, version, rows)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Cache is shared by queries running in parallel, see Cellbase.thread_safe
+
+    @staticmethod
+    def key(worksheet_name, where=None, order_by=None, limit=None, offset=0, select=None):
+        """
+        :return: Key of query, see Cellbase.query. None if query can't be cached
+        :rtype: tuple
+        """
+        where_key = None
+        if where is not None:
+            where_key = canonical_where(where)
+            if where_key is None:
+                return None
+        if isinstance(order_by, list):
+            order_by = tuple(order_by)
+        if select is not None:
+            select = tuple(select)
+        key = (worksheet_name, where_key, order_by, limit, offset, select)
+        return key if isinstance(order_by, Hashable) else None
+
+    def get(self, key, celltable):
+        """
+        :param key: Key of query, see key
+        :type key: tuple
+        :param celltable: Celltable queried
+        :type celltable: Celltable
+        :return: Rows of query, None if not cached or Celltable modified since cached
+        :rtype: list
+        """
+        with self.lock:
+            cached = self.results.get(key)
+            if cached is None or cached[0] is not celltable or cached[1] != celltable.version:
+                self.misses += 1
+                return None
+            self.results.move_to_end(key)
+            self.hits += 1
+        return [dict(row) for row in cached[2]]
+
+    def put(self, key, celltable, rows):
+        """
+        :param key: Key of query, see key
+        :type key: tuple
+        :param celltable: Celltable queried
+        :type celltable: Celltable
+        :param rows: Rows of query
+        :type rows: list
+        """
+        cached = (celltable, celltable.version, tuple(dict(row) for row in rows))
+        with self.lock:
+            self.results[key] = cached
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def discard(self, worksheet_name):
+        """
+        Evict results of worksheet
+
+        :param worksheet_name: Name of worksheet
+        :type worksheet_name: str
+        """
+        with self.lock:
+            for key in [key for key in self.results if key[0] == worksheet_name]:
+                del self.results[key]
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+    def stats(self):
+        """
+        :return: dict of hits, misses, size(number of results cached) & maxsize
+        :rtype: dict
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.results), 'maxsize': self.maxsize}
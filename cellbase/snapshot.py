@@ -0,0 +1,104 @@
+import copy
+import gc
+
+from openpyxl.cell.cell import Cell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils.indexed_list import IndexedList
+
+# Attributes of workbook that grow as cells are styled, copied so styles added afterwards don't leak into snapshot.
+# Attributes missing from the installed version of openpyxl are skipped
+STYLE_ATTRS = ('_fonts', '_alignments', '_borders', '_fills', '_number_formats', '_date_formats', '_timedelta_formats',
+               '_protections', '_cell_styles', '_named_styles', '_differential_styles', '_table_styles')
+# Column of cell is kept as col_idx before openpyxl 2.6, and as column afterwards
+COLUMN_ATTR = 'column' if 'column' in Cell.__slots__ else 'col_idx'
+# Cells can be copied by assigning attributes of known layout
+FAST_COPY = all(attr in Cell.__slots__ for attr in ('row', COLUMN_ATTR, '_value', 'data_type', '_hyperlink', '_comment'))
+
+
+def copy_collection(collection):
+    if isinstance(collection, IndexedList):
+        return IndexedList(collection)  # Shallow copy would share the dict that map value to index
+    return copy.copy(collection)
+
+
+def copy_cell(cell, worksheet):
+    """
+    Copy cell to worksheet, style of cell must be registered before copying, see copy_worksheet
+
+    :param cell: Cell to copy
+    :type cell: openpyxl.cell.Cell
+    :param worksheet: Worksheet that copied cell belongs to
+    :return: Copied cell
+    :rtype: openpyxl.cell.Cell
+    """
+    if type(cell) is Cell and FAST_COPY:  # Several times faster than copy.copy
+        copied = Cell.__new__(Cell)
+        copied.row = cell.row
+        if COLUMN_ATTR == 'column':
+            copied.column = cell.column
+        else:
+            copied.col_idx = cell.col_idx
+        copied._value = cell._value
+        copied.data_type = cell.data_type
+        copied._hyperlink = cell._hyperlink
+        copied._comment = cell._comment
+    else:
+        copied = copy.copy(cell)
+    copied.parent = worksheet
+    # Style is modified in place, so it can't be shared. Cell without style gets default style on demand
+    copied._style = StyleArray(cell._style) if cell.has_style else None
+    return copied
+
+
+def copy_worksheet(worksheet, workbook):
+    """
+    Copy cells of worksheet so they are not affected by later modification, other contents are shared.
+    Styles of cells are registered to workbook of worksheet, so copied cells never register new style.
+
+    :param worksheet: Worksheet to copy
+    :type worksheet: openpyxl.worksheet.worksheet.Worksheet
+    :param workbook: Workbook that copied worksheet belongs to
+    :type workbook: openpyxl.Workbook
+    :return: Copied worksheet
+    :rtype: openpyxl.worksheet.worksheet.Worksheet
+    """
+    copied = copy.copy(worksheet)
+    # Private attribute of parent, which is name-mangled in openpyxl before 2.6
+    setattr(copied, '_parent' if hasattr(worksheet, '_parent') else '_WorkbookChild__parent', workbook)
+    if not hasattr(worksheet, '_cells'):  # Chartsheet
+        return copied
+    cells = {}
+    for coordinate, cell in worksheet._cells.items():
+        if cell.has_style:
+            cell.style_id  # Register style before style tables are copied
+        cells[coordinate] = copy_cell(cell, copied)
+    copied._cells = cells
+    return copied
+
+
+def copy_workbook(workbook):
+    """
+    Take a snapshot of workbook that can be saved on another thread, while workbook keeps being modified.
+    Cells, worksheets & style tables are copied, while other contents like column dimensions are shared, as they are
+    not modified by Cellbase.
+
+    :param workbook: Workbook to copy
+    :type workbook: openpyxl.Workbook
+    :return: Snapshot of workbook
+    :rtype: openpyxl.Workbook
+    """
+    copied = copy.copy(workbook)
+    gc_enabled = gc.isenabled()
+    gc.disable()  # Collection is triggered over and over while copying millions of cells, but nothing to collect
+    try:
+        copied._sheets = [copy_worksheet(worksheet, copied) for worksheet in workbook._sheets]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    for attr in STYLE_ATTRS:  # After worksheets copied, so all styles are registered
+        collection = getattr(workbook, attr, None)
+        if collection is not None:  # Not every version of openpyxl has all of them
+            setattr(copied, attr, copy_collection(collection))
+    copied._pivots = list(workbook._pivots)
+    copied.shared_strings = IndexedList(workbook.shared_strings)
+    return copied
@@ -15,8 +15,9 @@ setup(name='cellbase',
       author_email='imjp0921@gmail.com',
       url='https://github.com/imjp94/cellbase',
       license='MIT',
-      packages=find_packages(exclude=['tests']),
+      packages=find_packages(exclude=['tests', 'benchmarks']),
       install_requires=['openpyxl'],
+      extras_require={'numpy': ['numpy']},
       zip_safe=False,
       include_package_data=True,
       keywords='spreadsheet excel database query abstraction utility',
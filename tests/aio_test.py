@@ -0,0 +1,75 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from cellbase import Cellbase, Gt
+from cellbase.aio import AsyncCellbase, AsyncDAO
+from tests.cellbase_test import Simple, SimpleDAO
+
+
+class AsyncCellbaseTest(unittest.TestCase):
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)  # Loop is only found while running since Python 3.5.3
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def test_async(self):
+        async def use_async(filename):
+            async_cellbase = AsyncCellbase()
+            await async_cellbase.register(SimpleDAO.on_create())
+            async_dao = AsyncDAO(SimpleDAO(async_cellbase.cellbase), async_cellbase)
+            simples = await async_dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(5))
+            self.assertEqual([simple.row_idx for simple in simples], [2, 3, 4, 5, 6])
+            self.assertEqual(await async_dao.delete({SimpleDAO.COL_ID: 0}), 1)
+            queried = await asyncio.gather(*(async_dao.query({SimpleDAO.COL_ID: i}) for i in range(5)))
+            self.assertEqual([[simple.name for simple in simples] for simples in queried],
+                             [[], ["simple1"], ["simple2"], ["simple3"], ["simple4"]])
+            ids = []
+            async for simple in async_dao.iter_query(batch_size=2):
+                ids.append(simple.id)
+            self.assertEqual(ids, [1, 2, 3, 4])
+            ids = []
+            async for values in async_cellbase.iter_query(SimpleDAO.TABLE_NAME, {SimpleDAO.COL_ID: Gt(2)},
+                                                          batch_size=1):
+                ids.append(values["id"])
+            self.assertEqual(ids, [3, 4])
+            await async_cellbase.save_as(filename)
+            await async_cellbase.close()
+            reloaded = await AsyncCellbase().load(filename, read_only=True)
+            self.assertEqual(await reloaded.query_values(SimpleDAO.TABLE_NAME, SimpleDAO.COL_ID), [1, 2, 3, 4])
+            await reloaded.close()
+
+        with tempfile.TemporaryDirectory() as dirname:
+            self.run_async(use_async(os.path.join(dirname, "async.xlsx")))
+
+    def test_async_transaction(self):
+        async def use_async():
+            async_cellbase = AsyncCellbase(Cellbase(thread_safe=True, query_cache=4))
+            await async_cellbase.register({"Other": ["id", None, "value"]})
+            await async_cellbase.insert_many("Other", ({"id": i, "value": i} for i in range(3)))
+            cellbase = async_cellbase.cellbase
+
+            def delete_then_fail():
+                cellbase.delete("Other", {"id": 0})
+                return 1 / 0
+            with self.assertRaises(ZeroDivisionError):
+                await async_cellbase.transaction(delete_then_fail)
+            self.assertEqual(await async_cellbase.transaction(cellbase.delete, "Other", {"id": 1}), 1)
+            self.assertEqual(await async_cellbase.query_values("Other", "id"), [0, 2])
+            for _ in range(2):
+                self.assertEqual(len(await async_cellbase.query("Other", {"id": 2})), 1)
+            self.assertEqual((await async_cellbase.query_cache_stats())['hits'], 1)
+            await async_cellbase.remove_empty_cols("Other")
+            self.assertEqual([col_id.value for col_id in cellbase.workbook["Other"][1]], ["id", "value"])
+            await async_cellbase.close()
+
+        self.run_async(use_async())
+
+
+if __name__ == "__main__":
+    unittest.main()
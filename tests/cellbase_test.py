@@ -1,9 +1,17 @@
+import os
+import tempfile
+import threading
+import time
 import unittest  # TODO: Switch to pytest
+import zipfile
+from datetime import datetime
 
 from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, Protection
 from openpyxl.styles.numbers import FORMAT_TEXT
-from cellbase import Cellbase, DAO, Entity, CellFormatter
+from cellbase import Cellbase, DAO, Entity, CellFormatter, Gt, Le, Lt, Ne, Between, In
+from cellbase import snapshot
 from cellbase.celltable import Celltable
+from cellbase.column import Column, numpy
 
 
 class CellbaseTest(unittest.TestCase):
@@ -19,6 +27,38 @@ class CellbaseTest(unittest.TestCase):
         self.assertTrue(simple.row_idx in self.cellbase.celltables[SimpleDAO.TABLE_NAME])
         self.assertEqual(simple, self.dao.query({DAO.COL_ROW_IDX: lambda row_idx: row_idx > 1})[0])
 
+    def test_insert_many(self):
+        self.dao.create_index(SimpleDAO.COL_ID)
+        simple = self.dao.insert(Simple(id=0, name="simple0"))
+        simples = self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(1, 4))
+        self.assertEqual([simple.row_idx for simple in simples], [3, 4, 5])
+        self.assertEqual([simple] + simples, self.dao.query())
+        self.assertEqual(self.dao.query({SimpleDAO.COL_ID: 2}), [simples[1]])
+        self.assertEqual(self.cellbase.insert_many(SimpleDAO.TABLE_NAME, [{SimpleDAO.COL_ID: 4,
+                                                                          SimpleDAO.COL_NAME: "simple4"}]), [6])
+        self.assertEqual(self.dao.celltable.worksheet.max_row, 6)
+
+    def test_insert_missing_column(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))
+        self.assertRaises(KeyError, self.cellbase.insert, SimpleDAO.TABLE_NAME, {SimpleDAO.COL_ID: 99})
+        celltable = self.cellbase[SimpleDAO.TABLE_NAME]
+        self.assertEqual([len(col) for col in celltable.cols.values()], [3, 3])  # Nothing inserted
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "missing.xlsx")
+            self.cellbase.save_as(filename)
+            columnar = Cellbase().load(filename, columnar=True)
+            for cellbase in (self.cellbase, columnar):  # Batch failing on its second row inserts nothing
+                version = cellbase[SimpleDAO.TABLE_NAME].version
+                self.assertRaises(KeyError, cellbase.insert_many, SimpleDAO.TABLE_NAME,
+                                  [{SimpleDAO.COL_ID: 98, SimpleDAO.COL_NAME: "simple98"}, {SimpleDAO.COL_ID: 99}])
+                self.assertEqual(cellbase.query_values(SimpleDAO.TABLE_NAME, SimpleDAO.COL_ID), [0, 1, 2])
+                self.assertEqual(cellbase[SimpleDAO.TABLE_NAME].version, version)
+            columnar.close()
+        self.assertEqual(celltable.worksheet.max_row, 4)
+        self.assertEqual(self.dao.insert(Simple(id=3, name="simple3")).row_idx, 5)
+        self.assertEqual(self.dao.delete({SimpleDAO.COL_ID: 0}), 1)
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID), [1, 2, 3])
+
     def test_query_all_and_row_idx_lambda(self):
         for i in range(5):
             self.dao.insert(Simple(id=i, name="simple%s" % i))
@@ -40,6 +80,119 @@ class CellbaseTest(unittest.TestCase):
         self.assertEqual(simple_to_update, self.dao.query({DAO.COL_ROW_IDX: simple.row_idx})[0])
         self.assertNotEqual(simple, simple_to_update)
 
+    def test_update_many(self):
+        self.dao.create_index(SimpleDAO.COL_NAME)
+        simples = self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(5))
+        for simple in simples[:3]:
+            simple.id += 10
+            simple.name = "updated"
+        self.assertEqual(self.dao.update_many(simples[:3]), 3)
+        self.assertEqual([simple.id for simple in self.dao.query({SimpleDAO.COL_NAME: "updated"})], [10, 11, 12])
+        updates = [(5, {SimpleDAO.COL_NAME: "row5"}), ({SimpleDAO.COL_ID: 4}, {SimpleDAO.COL_ID: 40})]
+        self.assertEqual(self.cellbase.update_many(SimpleDAO.TABLE_NAME, updates), 2)
+        self.assertEqual(self.dao.query_values(DAO.COL_ROW_IDX, {SimpleDAO.COL_NAME: "row5"}), [5])
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID), [10, 11, 12, 3, 40])
+        self.assertEqual(self.dao.query({SimpleDAO.COL_NAME: "simple4"})[0].row_idx, 6)
+        self.assertRaises(KeyError, self.cellbase.update_many, SimpleDAO.TABLE_NAME, [(100, {SimpleDAO.COL_ID: 1})])
+
+    def test_upsert(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "upsert.xlsx")
+            self.cellbase.save_as(filename)
+            columnar_dao = SimpleDAO(Cellbase().load(filename, columnar=True))
+            for dao in (self.dao, columnar_dao):
+                simples = dao.upsert_many([Simple(id=1, name="updated"), Simple(id=5, name="new"),
+                                           Simple(id=5, name="newer")], key=[SimpleDAO.COL_ID])
+                self.assertEqual([simple.row_idx for simple in simples], [3, 5, 5])
+                self.assertEqual(dao.query_values(SimpleDAO.COL_NAME), ["simple0", "updated", "simple2", "newer"])
+                values = {SimpleDAO.COL_ID: 2, SimpleDAO.COL_NAME: "2"}
+                self.assertEqual(dao.cellbase.upsert(SimpleDAO.TABLE_NAME, values, SimpleDAO.COL_ID), 4)
+                dao.create_key_index(SimpleDAO.COL_ID, unique=True)
+                self.assertRaises(AssertionError, dao.insert, Simple(id=0, name="duplicate"))
+                dao.delete({SimpleDAO.COL_ID: 0})  # Key index follows rows shifted
+                dao.update(Simple(id=6, name="moved"), {SimpleDAO.COL_ID: 5})
+                self.assertRaises(AssertionError, dao.update, Simple(id=1, name="duplicate"), {SimpleDAO.COL_ID: 2})
+                dao.celltable.update_many([(2, {SimpleDAO.COL_ID: 2}), (3, {SimpleDAO.COL_ID: 1})])  # Swapped
+                dao.celltable.update_many([(2, {SimpleDAO.COL_ID: 1}), (3, {SimpleDAO.COL_ID: 2})])
+                with self.assertRaises(AssertionError):
+                    with dao.cellbase.transaction():  # Duplicate is found after traversed, then rolled back
+                        dao.traverse(lambda cell: setattr(cell, "value", 1), {SimpleDAO.COL_ID: 6},
+                                     select=[SimpleDAO.COL_ID])
+                self.assertEqual(dao.query_values(SimpleDAO.COL_ID), [1, 2, 6])
+                self.assertEqual(dao.upsert(Simple(id=6, name="found"), SimpleDAO.COL_ID).row_idx, 4)
+                self.assertEqual(dao.insert(Simple(id=0, name="simple0")).row_idx, 5)
+                self.assertEqual(dao.query_values(SimpleDAO.COL_NAME), ["updated", "2", "found", "simple0"])
+            columnar_dao.cellbase.close()
+
+    def test_transaction(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(6))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "transaction.xlsx")
+            self.cellbase.save_as(filename)
+            columnar_dao = SimpleDAO(Cellbase().load(filename, columnar=True))
+            for dao in (self.dao, columnar_dao):
+                dao.create_index(SimpleDAO.COL_NAME)
+                dao.format(font=Font(name='Arial'))
+                expected = [(simple.row_idx, simple.id, simple.name) for simple in dao.query()]
+                with self.assertRaises(ZeroDivisionError):
+                    with dao.cellbase.transaction():
+                        dao.update(Simple(id=10, name="updated"), {SimpleDAO.COL_ID: 1})
+                        dao.delete({SimpleDAO.COL_ID: In([0, 2, 3])})
+                        dao.insert_many([Simple(id=6, name="simple6"), Simple(id=7, name="simple7")])
+                        dao.traverse(lambda cell: setattr(cell, "value", cell.value * 2), select=[SimpleDAO.COL_ID])
+                        dao.upsert(Simple(id=14, name="upserted"), SimpleDAO.COL_ID)
+                        dao.delete({SimpleDAO.COL_ID: 12})
+                        1 / 0
+                self.assertEqual([(simple.row_idx, simple.id, simple.name) for simple in dao.query()], expected)
+                self.assertEqual(dao.query_values(DAO.COL_ROW_IDX, {SimpleDAO.COL_NAME: "simple4"}), [6])
+                fonts = []
+                dao.traverse(lambda cell: fonts.append(cell.font.name))
+                self.assertEqual(fonts, ["Arial"] * 12)  # Rows put back & moved back down keep their formats
+
+                def mark(cell):
+                    cell.value = "X"
+                    if cell.row == 3:
+                        raise ZeroDivisionError
+                names = dao.query_values(SimpleDAO.COL_NAME)
+                with self.assertRaises(ZeroDivisionError):
+                    with dao.cellbase.transaction():  # Cells modified before fn raises are rolled back
+                        dao.traverse(mark, select=[SimpleDAO.COL_NAME])
+                self.assertEqual(dao.query_values(SimpleDAO.COL_NAME), names)
+                self.assertEqual(dao.query_values(DAO.COL_ROW_IDX, {SimpleDAO.COL_NAME: "X"}), [])
+                self.assertRaises(ZeroDivisionError, dao.traverse, mark, select=[SimpleDAO.COL_NAME])
+                self.assertEqual(dao.query_values(DAO.COL_ROW_IDX, {SimpleDAO.COL_NAME: "X"}), [2, 3])  # Indexed
+                self.assertLessEqual({2, 3}, dao.cellbase.dirty()[SimpleDAO.TABLE_NAME])
+                with dao.cellbase.transaction():
+                    dao.delete({SimpleDAO.COL_ID: 0})
+                    with self.assertRaises(KeyError):
+                        with dao.cellbase.transaction():  # Only inner transaction is rolled back
+                            dao.insert(Simple(id=8, name="simple8"))
+                            dao.cellbase.insert(SimpleDAO.TABLE_NAME, {})
+                    self.assertRaises(AssertionError, dao.drop)
+                self.assertEqual(dao.query_values(SimpleDAO.COL_ID), [1, 2, 3, 4, 5])
+            columnar_dao.cellbase.close()
+
+    def test_query_cache(self):
+        cellbase = Cellbase(query_cache=2).load("../out/not_exist.xlsx")
+        cellbase.register(on_create=SimpleDAO.on_create())
+        dao = SimpleDAO(cellbase)
+        dao.insert_many(Simple(id=i, name="simple%s" % (i % 2)) for i in range(4))
+        self.assertEqual(len(dao.query({SimpleDAO.COL_NAME: "simple0"})), 2)
+        self.assertEqual(len(dao.query({SimpleDAO.COL_NAME: In(["simple0"])})), 2)  # Same key as plain value
+        rows = cellbase.query(SimpleDAO.TABLE_NAME, {SimpleDAO.COL_NAME: "simple0"})
+        rows[0][SimpleDAO.COL_ID] = 100  # Rows returned are copies
+        self.assertEqual(cellbase.query_cache_stats(), {'hits': 2, 'misses': 1, 'size': 1, 'maxsize': 2})
+        self.assertEqual(dao.query_values(SimpleDAO.COL_ID, {SimpleDAO.COL_NAME: "simple0"}), [0, 2])
+        dao.query({SimpleDAO.COL_ID: Gt(1)})  # Not cached
+        dao.update(Simple(id=4, name="simple0"), {SimpleDAO.COL_ID: 1})
+        self.assertEqual([simple.id for simple in dao.query({SimpleDAO.COL_NAME: "simple0"})], [0, 4, 2])
+        dao.query({SimpleDAO.COL_ID: 1})
+        dao.query()
+        self.assertEqual(cellbase.query_cache_stats(), {'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2})
+        dao.drop()
+        self.assertEqual(cellbase.query(SimpleDAO.TABLE_NAME), [])
+
     def test_delete(self):
         simple = Simple(id=4, name="simple_to_delete")
         self.dao.insert(simple)
@@ -47,6 +200,551 @@ class CellbaseTest(unittest.TestCase):
         self.assertEqual(deleted_count, 1)
         self.assertEqual(self.dao.query({DAO.COL_ROW_IDX: simple.row_idx}), [])
 
+    def test_delete_scattered_rows(self):
+        for i in range(6):  # Add row 2, 3, 4, 5, 6, 7
+            self.dao.insert(Simple(id=i, name="simple%s" % i))
+        self.assertEqual(self.dao.delete({SimpleDAO.COL_ID: lambda value: value in (1, 3, 4)}), 3)
+        self.assertEqual(self.dao.delete({SimpleDAO.COL_ID: 1}), 0)
+        simples = self.dao.query()
+        self.assertEqual([(simple.row_idx, simple.id) for simple in simples], [(2, 0), (3, 2), (4, 5)])
+        worksheet = self.dao.celltable.worksheet
+        self.assertEqual(worksheet.max_row, 4)
+        self.assertEqual([row[0].value for row in worksheet.iter_rows(min_row=2)], [0, 2, 5])
+        self.assertEqual([cell.row for cell in self.dao.celltable.cols[SimpleDAO.COL_NAME]], [2, 3, 4])
+        self.assertEqual(self.dao.insert(Simple(id=6, name="simple6")).row_idx, 5)
+
+    def test_index(self):
+        self.dao.create_index(SimpleDAO.COL_ID)
+        for i in range(5):  # Add row 2, 3, 4, 5, 6
+            self.dao.insert(Simple(id=i % 2, name="simple%s" % i))
+        index = self.dao.celltable.indexes[SimpleDAO.COL_ID]
+        self.assertEqual(index.lookup(1), {3, 5})
+        self.assertEqual([simple.row_idx for simple in self.dao.query({SimpleDAO.COL_ID: 0})], [2, 4, 6])
+        self.dao.update(Simple(id=2, name="updated_simple"), {SimpleDAO.COL_ID: 1})
+        self.assertEqual(index.lookup(1), set())
+        self.assertEqual(index.lookup(2), {3, 5})
+        self.assertEqual(self.dao.delete({SimpleDAO.COL_ID: 0}), 3)
+        self.assertEqual(index.lookup(2), {2, 3})  # Renumbered after delete
+        self.assertEqual(len(self.dao.query({SimpleDAO.COL_ID: 2})), 2)
+        self.dao.traverse(lambda cell: setattr(cell, "value", 7), {DAO.COL_ROW_IDX: 3}, select=[SimpleDAO.COL_ID])
+        self.assertEqual(index.lookup(7), {3})
+        self.assertEqual(self.dao.query({SimpleDAO.COL_ID: 7})[0].row_idx, 3)
+
+    def test_query_multiple_conditions(self):
+        for i in range(6):  # Add row 2, 3, 4, 5, 6, 7
+            self.dao.insert(Simple(id=i % 3, name="simple%s" % (i % 2)))
+        simples = self.dao.query({SimpleDAO.COL_ID: 0, SimpleDAO.COL_NAME: "simple0"})
+        self.assertEqual([simple.row_idx for simple in simples], [2])
+        simples = self.dao.query({SimpleDAO.COL_NAME: "simple1", DAO.COL_ROW_IDX: lambda row_idx: row_idx > 3})
+        self.assertEqual([simple.row_idx for simple in simples], [5, 7])
+        self.assertEqual(self.dao.query({SimpleDAO.COL_ID: 0, SimpleDAO.COL_NAME: "not_exist"}), [])
+        # Any of the conditions match
+        self.assertEqual(self.dao.celltable.row_idxs_where({SimpleDAO.COL_ID: 1, SimpleDAO.COL_NAME: "simple0"}),
+                         [2, 3, 4, 6])
+
+    def test_query_empty_where(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))
+        # Empty where matches no row, as opposed to where=None matching all rows
+        self.assertEqual(self.dao.query({}), [])
+        self.assertEqual(list(self.dao.iter_query({})), [])
+        self.assertEqual(self.dao.query({}, order_by=SimpleDAO.COL_ID), [])
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID, {}), [])
+        self.assertEqual(self.cellbase.aggregate(SimpleDAO.TABLE_NAME, where={}), {DAO.COL_ROW_IDX: 0})
+        self.assertEqual(self.dao.delete({}), 0)
+        self.assertEqual(len(self.dao.query()), 3)
+
+    def test_load_read_only(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(5))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "read_only.xlsx")
+            self.cellbase.save_as(filename)
+            cellbase = Cellbase().load(filename, read_only=True)
+            dao = SimpleDAO(cellbase)
+            self.assertEqual(dao.query(), self.dao.query())
+            simples = dao.query({SimpleDAO.COL_ID: lambda value: value > 2, DAO.COL_ROW_IDX: 6})
+            self.assertEqual([(simple.id, simple.name) for simple in simples], [(4, "simple4")])
+            dao.create_index(SimpleDAO.COL_NAME)
+            self.assertEqual(dao.query({SimpleDAO.COL_NAME: "simple1"})[0].row_idx, 3)
+            self.assertEqual(dao[4].id, 2)
+            self.assertEqual(len(dao), 5)
+            with self.assertRaises(AssertionError):
+                dao.insert(Simple(id=5, name="simple5"))
+            with self.assertRaises(AssertionError):
+                dao.update(Simple(id=5, name="simple5"), {SimpleDAO.COL_ID: 1})
+            with self.assertRaises(AssertionError):
+                dao.delete({SimpleDAO.COL_ID: 1})
+            with self.assertRaises(AssertionError):
+                cellbase.save()
+            self.assertEqual(len(dao), 5)
+            cellbase.close()
+
+    def test_load_lazily(self):
+        self.dao.insert(Simple(id=1, name="simple1"))
+        self.cellbase.register({"Other": ["id"]})
+        self.cellbase.insert("Other", {"id": 1})
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "lazy.xlsx")
+            self.cellbase.save_as(filename)
+            cellbase = Cellbase().load(filename)
+            self.assertEqual(len(cellbase), 3)  # Including default worksheet
+            self.assertTrue("Other" in cellbase)
+            self.assertFalse(cellbase.celltables.is_built(SimpleDAO.TABLE_NAME))
+            self.assertEqual(SimpleDAO(cellbase).query()[0].name, "simple1")
+            self.assertTrue(cellbase.celltables.is_built(SimpleDAO.TABLE_NAME))
+            self.assertFalse(cellbase.celltables.is_built("Other"))
+            self.assertEqual(len(dict(cellbase.celltables.items())), 3)  # Built while iterating
+            self.assertTrue(cellbase.celltables.is_built("Other"))
+            cellbase.drop("Other")
+            self.assertFalse("Other" in cellbase)
+            self.assertEqual(len(cellbase), 2)
+
+    def test_deprecated(self):
+        self.dao.insert(Simple(id=0, name="simple0"))
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual(self.dao.celltable.col_idx_to_col_id(2).value, SimpleDAO.COL_NAME)
+        with self.assertWarns(DeprecationWarning):
+            self.dao.celltable.safe_append([1, "simple1"])
+        self.assertEqual(self.dao.celltable.worksheet.cell(row=3, column=2).value, "simple1")
+
+    def test_column(self):
+        ints = Column([1, None, 3])
+        self.assertTrue(ints.is_typed())
+        self.assertEqual(list(ints), [1, None, 3])
+        self.assertIs(type(ints[0]), int)
+        ints.append(4)
+        del ints[1]
+        self.assertEqual(list(ints), [1, 3, 4])
+        ints[0] = "one"  # Fall back to list
+        self.assertFalse(ints.is_typed())
+        self.assertEqual(list(ints), ["one", 3, 4])
+        amounts = Column([1, 2.5, None])  # Mixed int & float
+        self.assertTrue(amounts.is_typed())
+        self.assertEqual(list(amounts), [1, 2.5, None])
+        self.assertIs(type(amounts[0]), int)
+        floats = Column([1.5])
+        floats.append(2)  # int assigned to float column
+        self.assertTrue(floats.is_typed())
+        self.assertEqual(list(floats), [1.5, 2])
+        self.assertFalse(Column([1.5, 2 ** 60]).is_typed())  # Can't be stored in double without losing precision
+        self.assertFalse(Column([True, False]).is_typed())
+        empty = Column()
+        empty.append(1.5)
+        self.assertTrue(empty.is_typed())
+        del empty[:]
+        empty.append("one")  # Kind is decided again once emptied
+        self.assertEqual(list(empty), ["one"])
+
+    def test_load_columnar(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(5))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "columnar.xlsx")
+            self.cellbase.save_as(filename)
+            cellbase = Cellbase().load(filename, columnar=True)
+            cellbase.register(on_create=SimpleDAO.on_create())
+            dao = SimpleDAO(cellbase)
+            self.assertEqual(dao.query(), self.dao.query())
+            self.assertTrue(dao.celltable.cols[SimpleDAO.COL_ID].is_typed())
+            dao.create_index(SimpleDAO.COL_ID)
+            self.assertEqual(dao.insert(Simple(id=5, name="simple5")).row_idx, 7)
+            self.assertEqual(dao.update(Simple(id=10, name="updated"), {SimpleDAO.COL_ID: 1}), 1)
+            self.assertEqual(dao.delete({SimpleDAO.COL_ID: lambda value: value in (0, 2)}), 2)
+            self.assertEqual(dao.query({SimpleDAO.COL_ID: 10})[0].row_idx, 2)
+            font = Font(name='Arial')
+            dao.format({SimpleDAO.COL_ID: 10}, select=[SimpleDAO.COL_NAME], font=font)
+            dao.traverse(lambda cell: setattr(cell, "value", cell.value + 1), {DAO.COL_ROW_IDX: 3},
+                         select=[SimpleDAO.COL_ID])
+            self.assertEqual(dao.query({SimpleDAO.COL_ID: 4})[0].row_idx, 3)
+            expected = [(simple.row_idx, simple.id, simple.name) for simple in dao.query()]
+            self.assertEqual(expected, [(2, 10, "updated"), (3, 4, "simple3"), (4, 4, "simple4"), (5, 5, "simple5")])
+            with self.assertWarns(UserWarning):  # Formats of file loaded are not saved
+                cellbase.save()
+            cellbase.close()
+            reloaded = SimpleDAO(Cellbase().load(filename))
+            self.assertEqual([(simple.row_idx, simple.id, simple.name) for simple in reloaded.query()], expected)
+            reloaded.traverse(lambda cell: self.assertEqual(cell.font.name, font.name), {DAO.COL_ROW_IDX: 2},
+                              select=[SimpleDAO.COL_NAME])
+
+    def test_save_columnar_partly_loaded(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))
+        self.cellbase.register({"Other": ["id"]})
+        self.cellbase.insert("Other", {"id": 1})
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "columnar.xlsx")
+            self.cellbase.save_as(filename)
+            cellbase = Cellbase().load(filename, columnar=True)
+            SimpleDAO(cellbase).update(Simple(id=10, name="updated"), {SimpleDAO.COL_ID: 1})  # Other never accessed
+            with self.assertWarns(UserWarning):
+                cellbase.save()
+            with self.assertWarns(UserWarning):
+                cellbase.save_async(os.path.join(dirname, "async.xlsx")).result()
+            cellbase.close()
+            for saved in ("columnar.xlsx", "async.xlsx"):
+                reloaded = Cellbase().load(os.path.join(dirname, saved))
+                self.assertEqual(reloaded.query_values(SimpleDAO.TABLE_NAME, SimpleDAO.COL_ID), [0, 10, 2])
+                self.assertEqual(reloaded.query_values("Other", "id"), [1])
+
+    def test_predicate(self):
+        self.dao.insert_many(Simple(id=i if i != 3 else None, name="simple%s" % (i % 2)) for i in range(6))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "predicate.xlsx")
+            self.cellbase.save_as(filename)
+            columnar_dao = SimpleDAO(Cellbase().load(filename, columnar=True))
+            for dao in (self.dao, columnar_dao):  # Evaluate value by value & with NumPy
+                self.assertEqual([simple.id for simple in dao.query({SimpleDAO.COL_ID: Gt(2)})], [4, 5])
+                self.assertEqual([simple.id for simple in dao.query({SimpleDAO.COL_ID: Between(1, 4)})], [1, 2, 4])
+                self.assertEqual([simple.id for simple in dao.query({SimpleDAO.COL_ID: In([0, None])})], [0, None])
+                self.assertEqual(len(dao.query({SimpleDAO.COL_ID: Ne(0)})), 5)
+                self.assertEqual([simple.id for simple in dao.query({SimpleDAO.COL_ID: Le(2),
+                                                                     SimpleDAO.COL_NAME: "simple1"})], [1])
+                self.assertEqual([simple.id for simple in dao.query({DAO.COL_ROW_IDX: Gt(6)})], [5])
+                dao.create_index(SimpleDAO.COL_NAME)
+                self.assertEqual(len(dao.query({SimpleDAO.COL_NAME: In(["simple0", "simple1"])})), 6)
+            columnar_dao.cellbase.close()
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_predicate(self):
+        self.cellbase.register({"Order": ["id", "amount"]})
+        self.cellbase.insert_many("Order", ({"id": i, "amount": amount} for i, amount in enumerate([5, 2.5, 10, None])))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "numpy.xlsx")
+            self.cellbase.save_as(filename)
+            columnar = Cellbase().load(filename, columnar=True)
+            for cellbase in (self.cellbase, columnar):  # Mixed int & float column is evaluated with NumPy
+                where = {"amount": Gt(2)}
+                self.assertTrue(cellbase.explain("Order", where).startswith("1. numpy amount Gt(2)"))
+                self.assertEqual(cellbase.query_values("Order", "id", where), [0, 1, 2])
+                self.assertEqual(cellbase.query_values("Order", "id", {"amount": In([2.5, 10])}), [1, 2])
+                cellbase.update("Order", {"amount": 1}, {"id": 2})  # Array is rebuilt once modified
+                self.assertEqual(cellbase.query_values("Order", "id", {"amount": Between(1, 3)}), [1, 2])
+            columnar.close()
+
+    def test_order_by_and_limit(self):
+        names = ["c", "a", "b", "a", None, "c"]
+        self.dao.insert_many(Simple(id=i, name=name) for i, name in enumerate(names))  # Add row 2 to 7
+        for ordered in (False, True):  # Heap & sorted index
+            if ordered:
+                self.dao.create_index(SimpleDAO.COL_NAME, ordered=True)
+            self.assertEqual([simple.id for simple in self.dao.query(order_by=SimpleDAO.COL_NAME)], [4, 1, 3, 2, 0, 5])
+            self.assertEqual([simple.id for simple in self.dao.query(order_by="-" + SimpleDAO.COL_NAME, limit=3)],
+                             [0, 5, 2])
+            self.assertEqual([simple.id for simple in self.dao.query({SimpleDAO.COL_ID: Gt(1)},
+                                                                     order_by="-" + SimpleDAO.COL_NAME)],
+                             [5, 2, 3, 4])
+        self.assertEqual([simple.id for simple in self.dao.query(order_by=[SimpleDAO.COL_NAME, "-" + SimpleDAO.COL_ID],
+                                                                 limit=3)], [4, 3, 1])
+        self.assertEqual([simple.id for simple in self.dao.query(order_by="-row_idx", limit=2)], [5, 4])
+        self.assertEqual(len(self.dao.query(limit=2)), 2)
+
+    def test_iter_query(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % (i % 2)) for i in range(6))  # Add row 2 to 7
+        inspected = []
+
+        def name_of_odd_id(name):
+            inspected.append(name)
+            return name == "simple1"
+        simples = self.dao.iter_query({SimpleDAO.COL_NAME: name_of_odd_id}, limit=1, offset=1)
+        self.assertEqual(inspected, [])  # Nothing is inspected until iterated
+        self.assertEqual([simple.id for simple in simples], [3])
+        self.assertEqual(len(inspected), 4)  # Scanning stopped at row 5
+        self.assertEqual([values[SimpleDAO.COL_ID] for values in
+                          self.cellbase.iter_query(SimpleDAO.TABLE_NAME, {SimpleDAO.COL_ID: Gt(1)}, offset=3)], [5])
+        self.assertEqual([simple.id for simple in self.dao.query(order_by="-" + SimpleDAO.COL_ID, limit=2, offset=2)],
+                         [3, 2])
+        self.assertEqual(self.dao.query(offset=6), [])
+
+    def test_select_and_query_values(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(4))  # Add row 2 to 5
+        self.assertEqual(self.cellbase.query(SimpleDAO.TABLE_NAME, {SimpleDAO.COL_ID: Gt(1)},
+                                             select=[SimpleDAO.COL_ID]),
+                         [{DAO.COL_ROW_IDX: 4, SimpleDAO.COL_ID: 2}, {DAO.COL_ROW_IDX: 5, SimpleDAO.COL_ID: 3}])
+        simple = self.dao.query(select=[SimpleDAO.COL_NAME], limit=1)[0]
+        self.assertEqual((simple.row_idx, simple.id, simple.name), (2, None, "simple0"))
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID), [0, 1, 2, 3])
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_NAME, limit=2, offset=1), ["simple1", "simple2"])
+        self.assertEqual(self.dao.query_values(DAO.COL_ROW_IDX, {SimpleDAO.COL_ID: In([1, 3])}), [3, 5])
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID, order_by="-" + SimpleDAO.COL_ID, limit=2), [3, 2])
+        with self.assertRaises(KeyError):
+            self.dao.query_values("not_exist")
+
+    def test_query_plan(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % (i % 2)) for i in range(10))  # Add row 2 to 11
+
+        def is_odd(name):
+            return name == "simple1"
+        where = {SimpleDAO.COL_NAME: is_odd, SimpleDAO.COL_ID: Between(2, 5)}
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID, where), [3, 5])
+        method = "scan" if numpy is None else "numpy"
+        self.assertEqual(self.dao.explain(where),
+                         "1. %s id Between(2, 5) (~3 rows)\n2. scan name is_odd (~5 rows)" % method)
+        self.dao.create_index(SimpleDAO.COL_NAME)
+        self.dao.create_index(SimpleDAO.COL_ID, ordered=True)
+        plan = self.dao.celltable.plan({SimpleDAO.COL_NAME: "simple0", SimpleDAO.COL_ID: Gt(6), DAO.COL_ROW_IDX: 9})
+        self.assertEqual([(step.method, step.estimate) for step in plan], [("row_idx", 1), ("range", 3), ("index", 5)])
+        where = {SimpleDAO.COL_NAME: "simple1", SimpleDAO.COL_ID: Gt(6)}
+        self.assertEqual(self.dao.query_values(SimpleDAO.COL_ID, where), [7, 9])
+        self.assertEqual(self.dao.celltable.col_stats(DAO.COL_ROW_IDX),
+                         {'rows': 10, 'distinct': 10, 'min': 2, 'max': 11})
+
+    def test_sorted_index(self):
+        self.dao.create_index(SimpleDAO.COL_ID, ordered=True)
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in (5, 1, 4, 2, 3))  # Add row 2 to 6
+        index = self.dao.celltable.indexes[SimpleDAO.COL_ID]
+        self.assertEqual(index.between(2, 4), [5, 6, 4])
+        self.assertEqual(index.between(low=4, include_low=False), [2])
+        self.assertEqual([simple.id for simple in self.dao.query({SimpleDAO.COL_ID: Between(2, 4)})], [4, 2, 3])
+        self.assertEqual([simple.id for simple in self.dao.query({SimpleDAO.COL_ID: Le(2)})], [1, 2])
+        self.assertEqual(self.dao.query({SimpleDAO.COL_ID: 3})[0].row_idx, 6)
+        self.dao.update(Simple(id=0, name="updated"), {SimpleDAO.COL_ID: 5})
+        self.dao.delete({SimpleDAO.COL_ID: 1})
+        self.assertEqual(list(index.iter_row_idxs()), [2, 4, 5, 3])
+        self.assertEqual(self.dao.query(order_by=SimpleDAO.COL_ID, limit=1)[0].name, "updated")
+
+    def test_save_incrementally(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))  # Add row 2 to 4
+        self.cellbase.register({"Other": ["id"]})
+        self.cellbase.insert("Other", {"id": 1})
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "incremental.xlsx")
+            self.cellbase.save_as(filename)
+            cellbase = Cellbase().load(filename)
+            dao = SimpleDAO(cellbase)
+            self.assertEqual(cellbase.dirty(), {})
+            dao.update(Simple(id=10, name="updated"), {SimpleDAO.COL_ID: 1})
+            dao.insert(Simple(id=3, name="simple3"))
+            self.assertEqual(cellbase.dirty(), {SimpleDAO.TABLE_NAME: {3, 5}})
+            with zipfile.ZipFile(filename) as archive:
+                before = {info.filename: (info.CRC, info.compress_size) for info in archive.infolist()}
+            cellbase.save(incremental=True)
+            self.assertEqual(cellbase.dirty(), {})
+            with zipfile.ZipFile(filename) as archive:
+                after = {info.filename: (info.CRC, info.compress_size) for info in archive.infolist()}
+            changed = [part_name for part_name in before if before[part_name] != after[part_name]]
+            self.assertEqual(changed, ["xl/worksheets/sheet2.xml"])  # Only Simple is serialised
+            reloaded = Cellbase().load(filename)
+            self.assertEqual([(simple.id, simple.name) for simple in SimpleDAO(reloaded).query()],
+                             [(0, "simple0"), (10, "updated"), (2, "simple2"), (3, "simple3")])
+            self.assertEqual(reloaded.query_values("Other", "id"), [1])
+            dao.format({SimpleDAO.COL_ID: 10}, font=Font(name='Arial'))  # New style
+            cellbase.save(incremental=True)
+            SimpleDAO(Cellbase().load(filename)).traverse(lambda cell: self.assertEqual(cell.font.name, "Arial"),
+                                                          {DAO.COL_ROW_IDX: 3})
+            cellbase.drop("Other")  # Saved as a whole once worksheets changed
+            cellbase.save(incremental=True)
+            self.assertFalse("Other" in Cellbase().load(filename))
+
+    def test_save_async(self):
+        self.assertTrue(snapshot.FAST_COPY)  # Cells are copied without copy.copy by installed openpyxl
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))  # Add row 2 to 4
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "async.xlsx")
+            saving = self.cellbase.save_async(filename)
+            self.dao.update(Simple(id=10, name="updated"), {SimpleDAO.COL_ID: 1})  # Not in snapshot
+            self.dao.format({SimpleDAO.COL_ID: 0}, font=Font(name='Arial'))
+            self.assertEqual(saving.result(), filename)
+            self.assertEqual(self.cellbase.dirty(), {SimpleDAO.TABLE_NAME: {2, 3}})
+            self.assertEqual(os.listdir(dirname), ["async.xlsx"])  # Temporary file renamed
+            reloaded = SimpleDAO(Cellbase().load(filename))
+            self.assertEqual([(simple.id, simple.name) for simple in reloaded.query()],
+                             [(0, "simple0"), (1, "simple1"), (2, "simple2")])
+            reloaded.traverse(lambda cell: self.assertNotEqual(cell.font.name, "Arial"), {DAO.COL_ROW_IDX: 2})
+            with self.assertRaises(FileExistsError):
+                self.cellbase.save_async(filename)
+            self.cellbase.save_async(filename, overwrite=True)
+            self.cellbase.save_as(filename, overwrite=True)  # Wait for saving in background
+            self.cellbase.close()
+            self.assertEqual([simple.id for simple in SimpleDAO(Cellbase().load(filename)).query()], [0, 10, 2])
+
+    def test_journal(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "journal.xlsx")
+            self.cellbase.save_as(filename)
+            cellbase = Cellbase().load(filename, journal=True)
+            cellbase.register(SimpleDAO.on_create())
+            dao = SimpleDAO(cellbase)
+            dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(4))  # Add row 2 to 5
+            dao.update(Simple(id=10, name="updated"), {SimpleDAO.COL_ID: 1})
+            dao.delete({SimpleDAO.COL_ID: 2})
+            dao.traverse(lambda cell: setattr(cell, "value", datetime(2018, 10, 16, 12)),
+                         {SimpleDAO.COL_ID: 3}, select=[SimpleDAO.COL_NAME])
+            with self.assertRaises(ZeroDivisionError):
+                with cellbase.transaction():  # Rollback is journaled as well
+                    dao.delete({SimpleDAO.COL_ID: 0})
+                    1 / 0
+            expected = [(0, "simple0"), (10, "updated"), (3, datetime(2018, 10, 16, 12))]
+            for columnar in (False, True):  # Crashed without saving, modifications are replayed
+                replayed = SimpleDAO(Cellbase().load(filename, columnar=columnar, journal=True))
+                self.assertEqual([(simple.id, simple.name) for simple in replayed.query()], expected)
+                replayed.cellbase.close()
+            cellbase.save()  # Journal started over, nothing replayed twice
+            dao.insert(Simple(id=4, name="simple4"))
+            reloaded = Cellbase().load(filename, journal=True)
+            self.assertEqual(reloaded.query_values(SimpleDAO.TABLE_NAME, SimpleDAO.COL_ID), [0, 10, 3, 4])
+            reloaded.close()
+            cellbase.close()
+            cellbase = Cellbase().load(filename, journal=True)
+            cellbase.register({"Other": ["id", None, "value"]})
+            cellbase.insert("Other", {"id": 1, "value": 2})
+            cellbase.remove_empty_cols("Other")
+            cellbase.drop(SimpleDAO.TABLE_NAME)
+            cellbase.close()
+            replayed = Cellbase().load(filename, journal=True)  # Worksheet dropped & restructured are replayed
+            self.assertNotIn(SimpleDAO.TABLE_NAME, replayed.workbook.sheetnames)
+            self.assertEqual([col_id.value for col_id in replayed.workbook["Other"][1]], ["id", "value"])
+            replayed.insert("Other", {"id": 2, "value": 3})
+            replayed.close()
+            self.assertEqual(Cellbase().load(filename, journal=True).query_values("Other", "value"), [2, 3])
+
+    def test_load_from_cache(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))  # Add row 2 to 4
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "cached.xlsx")
+            cache_dir = os.path.join(dirname, "cache")
+            self.cellbase.save_as(filename)
+            parsed = Cellbase().load(filename, read_only=True, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            cached = Cellbase().load(filename, read_only=True, cache_dir=cache_dir)
+            self.assertIsNone(cached.source_workbook)  # Workbook not parsed
+            self.assertEqual(cached.query(SimpleDAO.TABLE_NAME), parsed.query(SimpleDAO.TABLE_NAME))
+            self.assertRaises(AssertionError, cached.insert, SimpleDAO.TABLE_NAME, {"id": 3, "name": "simple3"})
+            parsed.close()
+            cached.close()
+            columnar = SimpleDAO(Cellbase().load(filename, columnar=True, cache_dir=cache_dir))
+            self.assertIsNone(columnar.cellbase.source_workbook)
+            columnar.delete({SimpleDAO.COL_ID: 1})
+            columnar.cellbase.save()  # Cache is outdated once workbook modified
+            columnar.cellbase.close()
+            reloaded = Cellbase().load(filename, columnar=True, cache_dir=cache_dir)
+            self.assertIsNotNone(reloaded.source_workbook)
+            self.assertEqual(reloaded.query_values(SimpleDAO.TABLE_NAME, SimpleDAO.COL_ID), [0, 2])
+            reloaded.close()
+
+    def test_thread_safe(self):
+        cellbase = Cellbase(thread_safe=True)
+        cellbase.register(SimpleDAO.on_create())
+        dao = SimpleDAO(cellbase)
+        dao.create_index(SimpleDAO.COL_ID)
+        dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(100))
+        errors = []
+        writing = threading.Event()
+        writing.set()
+
+        def read():
+            try:
+                while writing.is_set():
+                    simples = dao.query({SimpleDAO.COL_ID: Lt(1000)})
+                    self.assertTrue(all(simple.name == "simple%s" % simple.id for simple in simples))
+                    self.assertEqual([simple.row_idx for simple in simples], list(range(2, len(simples) + 2)))
+                    self.assertEqual(len(dao.query_values(SimpleDAO.COL_ID, {SimpleDAO.COL_ID: Lt(1000)})),
+                                     len(simples))
+            except Exception as e:
+                errors.append(e)
+
+        def write(writer):
+            try:
+                for i in range(1000 + writer * 100, 1000 + writer * 100 + 50):  # Rows of each writer are not shared
+                    dao.insert(Simple(id=i, name="simple%s" % i))
+                    dao.update(Simple(id=i - 1000, name="simple%s" % (i - 1000)), {SimpleDAO.COL_ID: i - 1000})
+                    cellbase.traverse(SimpleDAO.TABLE_NAME, lambda cell: None, {SimpleDAO.COL_ID: i})
+                    if i % 2:
+                        dao.delete({SimpleDAO.COL_ID: i})
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(8)]
+        writers = [threading.Thread(target=write, args=(writer,)) for writer in range(4)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(dao.query_values(SimpleDAO.COL_ID, {SimpleDAO.COL_ID: Gt(999)})),
+                         [i for writer in range(4) for i in range(1000 + writer * 100, 1000 + writer * 100 + 50, 2)])
+        self.assertEqual(len(dao), 200)
+        self.assertEqual(dao.query({SimpleDAO.COL_ID: 1001}), [])  # Deleted
+
+    def test_thread_safe_upsert(self):
+        cellbase = Cellbase(thread_safe=True)
+        cellbase.register(SimpleDAO.on_create())
+        cellbase.insert(SimpleDAO.TABLE_NAME, {SimpleDAO.COL_ID: 1, SimpleDAO.COL_NAME: "simple1"})
+        lock = cellbase.lock
+        acquire_read = lock.acquire_read
+        writer = threading.Thread(target=cellbase.dirty, daemon=True)  # Writer of the whole workbook
+
+        def acquire_read_then_queue_writer():  # Writer queued once upsert holds the lock
+            acquire_read()
+            if threading.current_thread() is upserter and writer.ident is None:
+                writer.start()
+                while not lock.writers_waiting:
+                    time.sleep(0.001)
+        lock.acquire_read = acquire_read_then_queue_writer
+        upserter = threading.Thread(target=cellbase.upsert, daemon=True, args=(
+            SimpleDAO.TABLE_NAME, {SimpleDAO.COL_ID: 1, SimpleDAO.COL_NAME: "upserted"}, SimpleDAO.COL_ID))
+        upserter.start()
+        for thread in (upserter, writer):
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())  # Deadlocked
+        self.assertEqual(cellbase.query_values(SimpleDAO.TABLE_NAME, SimpleDAO.COL_NAME), ["upserted"])
+
+    def test_load_in_parallel(self):
+        self.cellbase.register({"Other": ["id", "value"]})
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))
+        self.cellbase.insert_many("Other", ({"id": i, "value": i * 0.5} for i in range(5)))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "parallel.xlsx")
+            self.cellbase.save_as(filename)
+            for read_only in (True, False):
+                expected = Cellbase().load(filename, read_only=read_only, columnar=not read_only)
+                parallel = Cellbase().load(filename, read_only=read_only, columnar=not read_only, workers=2)
+                self.assertTrue(all(parallel.celltables.is_built(name) for name in parallel.workbook.sheetnames))
+                for name in ("Sheet", SimpleDAO.TABLE_NAME, "Other"):
+                    self.assertEqual(parallel.query(name), expected.query(name))
+                expected.close()
+                parallel.close()
+            parallel = Cellbase().load(filename, columnar=True, workers=2)
+            parallel.insert("Other", {"id": 5, "value": 2.5})
+            parallel.save()
+            self.assertEqual(Cellbase().load(filename).query_values("Other", "value"), [0, 0.5, 1, 1.5, 2, 2.5])
+
+    def test_aggregate(self):
+        self.cellbase.register({"Sales": ["region", "amount", "price", "total"]})
+        self.cellbase.insert_many("Sales", ({"region": ["EU", "US", "EU"][i % 3], "amount": i,
+                                            "price": None if i == 4 else i * 0.5,
+                                            "total": i if i % 2 else i + 0.25} for i in range(6)))
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "aggregate.xlsx")
+            self.cellbase.save_as(filename)
+            columnar = Cellbase().load(filename, columnar=True)
+            for cellbase in (self.cellbase, columnar):  # Aggregate value by value & with NumPy
+                self.assertEqual(cellbase.aggregate("Sales"), {DAO.COL_ROW_IDX: 6})
+                self.assertEqual(cellbase.aggregate("Sales", aggs={"amount": ["sum", "min", "max"], "price": "count"}),
+                                 {"amount_sum": 15, "amount_min": 0, "amount_max": 5, "price": 5})
+                self.assertEqual(cellbase.aggregate("Sales", where={"amount": Gt(5)},
+                                                    aggs={"amount": ["count", "avg"]}),
+                                 {"amount_count": 0, "amount_avg": None})
+                expected = [{"region": "EU", "amount": 10, "price": 1.25}, {"region": "US", "amount": 5, "price": 0.5}]
+                self.assertEqual(cellbase.aggregate("Sales", group_by="region", aggs={"amount": "sum", "price": "avg"}),
+                                 expected)
+                cellbase.create_index("Sales", "region")  # Groups from index
+                self.assertEqual(cellbase.aggregate("Sales", group_by=["region"],
+                                                    aggs={"amount": "sum", "price": "avg"}), expected)
+                self.assertEqual(cellbase.aggregate("Sales", where={"amount": Lt(3)}, group_by="region",
+                                                    aggs={"amount": "max"}),
+                                 [{"region": "EU", "amount": 2}, {"region": "US", "amount": 1}])
+                self.assertIsInstance(cellbase.aggregate("Sales", aggs={"amount": "sum"})["amount"], int)
+                # Mixed int & float
+                self.assertEqual(cellbase.aggregate("Sales", aggs={"total": ["sum", "min", "max", "avg"]}),
+                                 {"total_sum": 15.75, "total_min": 0.25, "total_max": 5, "total_avg": 2.625})
+                self.assertEqual(cellbase.aggregate("Sales", group_by="region", aggs={"total": "sum"}),
+                                 [{"region": "EU", "total": 10.5}, {"region": "US", "total": 5.25}])
+                self.assertIsInstance(cellbase.aggregate("Sales", aggs={"total": "max"})["total"], int)
+                self.assertEqual(cellbase.celltables["Sales"].col_array("total") is None, numpy is None)
+                self.assertRaises(ValueError, cellbase.aggregate, "Sales", aggs={"amount": "median"})
+                self.assertRaises(KeyError, cellbase.aggregate, "Sales", group_by="missing")
+            columnar.close()
+
     def test_format(self):
         simple_formatted = Simple(id=5, name="simple_formatted")
         simple_not_formatted = Simple(id=6, name="simple_not_formatted")
@@ -106,6 +804,22 @@ class CellbaseTest(unittest.TestCase):
         del self.dao[lambda row_idx: row_idx > 1]
         self.assertEqual(len(self.dao), 0)
 
+    def test_get_row(self):
+        self.dao.insert_many(Simple(id=i, name="simple%s" % i) for i in range(3))
+        self.assertEqual(self.cellbase.get_row(SimpleDAO.TABLE_NAME, 3),
+                         {DAO.COL_ROW_IDX: 3, SimpleDAO.COL_ID: 1, SimpleDAO.COL_NAME: "simple1"})
+        self.assertEqual(self.cellbase.get_row(SimpleDAO.TABLE_NAME, 5), None)
+        simple = self.dao.get_row(4, select=[SimpleDAO.COL_NAME])
+        self.assertEqual((simple.row_idx, simple.id, simple.name), (4, None, "simple2"))
+        self.assertIs(self.dao.get_row(1), None)  # Header is not a row
+        self.assertIs(4 in self.dao, True)
+        self.assertIs(5 in self.dao, False)
+        celltable = self.cellbase[SimpleDAO.TABLE_NAME]
+        self.assertEqual(celltable[2], [{DAO.COL_ROW_IDX: 2, SimpleDAO.COL_ID: 0, SimpleDAO.COL_NAME: "simple0"}])
+        self.assertEqual(celltable[5], [])
+        celltable[2] = {SimpleDAO.COL_ID: 10, SimpleDAO.COL_NAME: "updated"}
+        self.assertEqual((self.dao[2].id, self.dao[2].name), (10, "updated"))
+
     def test_cellbase_magic_methods(self):
         self.cellbase.create_if_none(SimpleDAO.TABLE_NAME)
         self.assertTrue(len(self.cellbase), 1)  # __len__
@@ -0,0 +1,3 @@
+import sys
+
+collect_ignore = ["aio_test.py"] if sys.version_info < (3, 5) else []  # async def is a SyntaxError before 3.5